@@ -1,6 +1,12 @@
 import streamlit as st
 from database.connection import db  
+from database.live_board import get_live_board, REFRESH_SECONDS
+from database.offline import get_local_replica
+from database.shared_cache import cached
+from components.offline_banner import offline_banner
+from components.search_box import search_box
 import pandas as pd
+from datetime import date
 
 st.set_page_config(
     page_title="Hospital Management System",
@@ -26,46 +32,60 @@ st.markdown("""
 """, unsafe_allow_html=True)
 
 
+def _fetch_statistics():
+    """Cele patru numărători din SQL Server"""
+    # 1. Total pacienți
+    query_pacienti = "SELECT COUNT(*) as total FROM Pacient"
+    df_pacienti = db.fetch_dataframe(query_pacienti)
+    total_pacienti = int(df_pacienti['total'].iloc[0])
+    
+    # 2. Total doctori
+    query_doctori = "SELECT COUNT(*) as total FROM Doctor"
+    df_doctori = db.fetch_dataframe(query_doctori)
+    total_doctori = int(df_doctori['total'].iloc[0])
+    
+    # 3. Programări astăzi
+    query_programari = """
+        SELECT COUNT(*) as total 
+        FROM Programare 
+        WHERE CAST(data_programare AS DATE) = CAST(GETDATE() AS DATE)
+    """
+    df_programari = db.fetch_dataframe(query_programari)
+    programari_astazi = int(df_programari['total'].iloc[0])
+    
+    # 4. Pacienți internați (fără data de externare)
+    query_internati = """
+        SELECT COUNT(*) as total 
+        FROM Pacient 
+        WHERE data_internare IS NOT NULL 
+        AND data_externare IS NULL
+    """
+    df_internati = db.fetch_dataframe(query_internati)
+    pacienti_internati = int(df_internati['total'].iloc[0])
+    
+    return {
+        'total_pacienti': total_pacienti,
+        'total_doctori': total_doctori,
+        'programari_astazi': programari_astazi,
+        'pacienti_internati': pacienti_internati,
+        'success': True
+    }
+
+
 def get_statistics():
     """Funcție care obține statistici REALE din baza de date"""
+    replica = get_local_replica()
+    if replica is not None and replica.offline and replica.available():
+        return dict(replica.statistics(), success=True, offline=True)
     try:
-        # 1. Total pacienți
-        query_pacienti = "SELECT COUNT(*) as total FROM Pacient"
-        df_pacienti = db.fetch_dataframe(query_pacienti)
-        total_pacienti = int(df_pacienti['total'].iloc[0])
-        
-        # 2. Total doctori
-        query_doctori = "SELECT COUNT(*) as total FROM Doctor"
-        df_doctori = db.fetch_dataframe(query_doctori)
-        total_doctori = int(df_doctori['total'].iloc[0])
-        
-        # 3. Programări astăzi
-        query_programari = """
-            SELECT COUNT(*) as total 
-            FROM Programare 
-            WHERE CAST(data_programare AS DATE) = CAST(GETDATE() AS DATE)
-        """
-        df_programari = db.fetch_dataframe(query_programari)
-        programari_astazi = int(df_programari['total'].iloc[0])
-        
-        # 4. Pacienți internați (fără data de externare)
-        query_internati = """
-            SELECT COUNT(*) as total 
-            FROM Pacient 
-            WHERE data_internare IS NOT NULL 
-            AND data_externare IS NULL
-        """
-        df_internati = db.fetch_dataframe(query_internati)
-        pacienti_internati = int(df_internati['total'].iloc[0])
-        
-        return {
-            'total_pacienti': total_pacienti,
-            'total_doctori': total_doctori,
-            'programari_astazi': programari_astazi,
-            'pacienti_internati': pacienti_internati,
-            'success': True
-        }
+        # Calculate o dată per cluster; o scriere în tabelele implicate le invalidează
+        return cached(f"statistici:{date.today()}", _fetch_statistics,
+                      depinde_de=('Pacient', 'Doctor', 'Programare'), ttl=60)
     except Exception as e:
+        if replica is not None and replica.available():
+            # Serverul nu răspunde: cifrele vin din copia locală
+            replica.mark_offline(e)
+            return dict(replica.statistics(), success=True, offline=True)
         st.error(f"❌ Eroare la citirea datelor: {str(e)}")
         return {
             'total_pacienti': 0,
@@ -76,32 +96,30 @@ def get_statistics():
         }
 
 
-def get_recent_appointments():
-    """Obține ultimele 5 programări"""
-    try:
-        query = """
-            SELECT TOP 5
-                p.nume + ' ' + p.prenume as Pacient,
-                d.nume + ' ' + d.prenume as Doctor,
-                s.nume_sectie as Sectie,
-                CONVERT(VARCHAR, pr.data_programare, 103) as Data,
-                CONVERT(VARCHAR(5), pr.ora_programare, 108) as Ora,
-                pr.tip_programare as Tip
-            FROM Programare pr
-            JOIN Pacient p ON pr.id_pacient = p.id_pacient
-            JOIN Doctor d ON pr.id_doctor = d.id_doctor
-            LEFT JOIN Sectie s ON pr.id_sectie = s.id_sectie
-            ORDER BY pr.data_programare DESC, pr.ora_programare DESC
-        """
-        df = db.fetch_dataframe(query)
-        return df
-    except Exception as e:
-        st.warning(f"Nu se pot încărca programările: {str(e)}")
-        return pd.DataFrame()
+@st.fragment(run_every=REFRESH_SECONDS)
+def show_recent_appointments():
+    """Ultimele programări, reîmprospătate automat din poller-ul comun"""
+    snapshot = get_live_board().snapshot()
+    if snapshot['eroare']:
+        st.warning(f"Nu se pot încărca programările: {snapshot['eroare']}")
+    df_programari = snapshot['recente']
+
+    if not df_programari.empty:
+        st.dataframe(
+            df_programari,
+            use_container_width=True,
+            hide_index=True
+        )
+    else:
+        st.info("📭 Nu există programări înregistrate")
 
 
 def get_top_sectii():
     """Obține secțiile cu cei mai mulți pacienți"""
+    replica = get_local_replica()
+    if replica is not None and replica.offline:
+        # Copia locală are doar pacienții activi - clasamentul ar fi înșelător
+        return pd.DataFrame()
     try:
         query = """
             SELECT TOP 5
@@ -112,8 +130,8 @@ def get_top_sectii():
             GROUP BY s.nume_sectie
             ORDER BY COUNT(p.id_pacient) DESC
         """
-        df = db.fetch_dataframe(query)
-        return df
+        return cached("top_sectii", lambda: db.fetch_dataframe(query),
+                      depinde_de=('Pacient', 'Sectie'), ttl=300)
     except Exception as e:
         st.warning(f"Nu se pot încărca secțiile: {str(e)}")
         return pd.DataFrame()
@@ -121,6 +139,7 @@ def get_top_sectii():
 
 def main():
     st.title("🏥 Sistem Management Spital")
+    offline_banner()
     st.markdown("---")
     
     # Sidebar
@@ -166,27 +185,25 @@ def main():
                 value=stats['pacienti_internati']
             )
         
-        st.success("✅ Sistem operațional - Date actualizate")
+        if not stats.get('offline'):
+            st.success("✅ Sistem operațional - Date actualizate")
     else:
         st.error("❌ Nu se pot încărca datele. Verifică conexiunea la baza de date.")
     
     st.markdown("---")
     
+    # ===== CĂUTARE RAPIDĂ (pacienți, doctori, specializări, secții, cauze) =====
+    st.markdown("## 🔍 Căutare Rapidă")
+    search_box("cautare_globala")
+    
+    st.markdown("---")
+    
     # ===== SECȚIUNEA 2: TABELE CU DATE =====
     col_left, col_right = st.columns(2)
     
     with col_left:
         st.markdown("### 📅 Ultimele Programări")
-        df_programari = get_recent_appointments()
-        
-        if not df_programari.empty:
-            st.dataframe(
-                df_programari,
-                use_container_width=True,
-                hide_index=True
-            )
-        else:
-            st.info("📭 Nu există programări înregistrate")
+        show_recent_appointments()
     
     with col_right:
         st.markdown("### 🏥 Secții după număr de pacienți")
@@ -0,0 +1,148 @@
+import os
+import hashlib
+import threading
+from collections import OrderedDict
+import numpy as np
+import pandas as pd
+import streamlit as st
+
+# Câte puncte are cel mult o serie trimisă în browser (~ lățimea graficului în pixeli)
+MAX_POINTS = int(os.getenv('CHART_MAX_POINTS', '1000'))
+# Peste atâtea puncte pe urmă, liniile se desenează cu WebGL (Scattergl)
+WEBGL_POINTS = int(os.getenv('CHART_WEBGL_POINTS', '5000'))
+# Câte figuri păstrăm în memorie (comune tuturor sesiunilor din proces)
+CACHE_SIZE = int(os.getenv('CHART_CACHE_SIZE', '64'))
+
+_figuri = OrderedDict()
+_lock = threading.Lock()
+
+
+def _hash(valoare, h):
+    if isinstance(valoare, (pd.DataFrame, pd.Series)):
+        h.update(repr((type(valoare).__name__, valoare.shape, list(getattr(valoare, 'columns', [])),
+                       str(valoare.dtypes))).encode('utf-8'))
+        h.update(pd.util.hash_pandas_object(valoare, index=True).to_numpy().tobytes())
+    elif isinstance(valoare, np.ndarray):
+        h.update(repr((valoare.shape, str(valoare.dtype))).encode('utf-8'))
+        h.update(np.ascontiguousarray(valoare).tobytes())
+    elif isinstance(valoare, (list, tuple)):
+        h.update(f"{type(valoare).__name__}{len(valoare)}".encode('utf-8'))
+        for element in valoare:
+            _hash(element, h)
+    else:
+        h.update(repr(valoare).encode('utf-8'))
+
+
+def data_hash(*date):
+    """Amprenta conținutului (DataFrame, Series, array, liste, scalari); None dacă nu se poate calcula"""
+    h = hashlib.sha1()
+    try:
+        for valoare in date:
+            _hash(valoare, h)
+    except TypeError:
+        # Ex: celule cu liste/dict - pandas nu le poate hash-ui
+        return None
+    return h.hexdigest()
+
+
+def _lttb(y, n):
+    """Indicii păstrați de Largest-Triangle-Three-Buckets (x = poziția în serie)"""
+    lungime = len(y)
+    if n >= lungime or n < 3:
+        return np.arange(lungime)
+    x = np.arange(lungime, dtype=np.float64)
+    margini = np.linspace(1, lungime - 1, n - 1).astype(np.int64)
+    alese = np.empty(n, dtype=np.int64)
+    alese[0], alese[-1] = 0, lungime - 1
+    a = 0
+    for i in range(n - 2):
+        start, stop = margini[i], margini[i + 1]
+        # Al treilea vârf al triunghiului: media bucket-ului următor (ultimul punct la final)
+        urmator = slice(margini[i + 1], margini[i + 2]) if i + 2 < n - 1 else slice(lungime - 1, lungime)
+        mx, my = x[urmator].mean(), y[urmator].mean()
+        arii = np.abs((x[a] - mx) * (y[start:stop] - y[a]) - (x[a] - x[start:stop]) * (my - y[a]))
+        a = start + int(np.argmax(arii))
+        alese[i + 1] = a
+    return alese
+
+
+def downsample(df, y=None, n=None):
+    """Rândurile păstrate de LTTB pentru o serie de timp cu pas constant.
+
+    y: coloana (sau lista de coloane) după care se aleg punctele; implicit
+    toate coloanele numerice. Cu mai multe coloane (ex: arii suprapuse) se
+    folosește suma lor, ca toate seriile să păstreze aceleași momente.
+    """
+    n = n or MAX_POINTS
+    if len(df) <= n:
+        return df
+    if isinstance(df, pd.Series):
+        valori = df.to_numpy(dtype=np.float64, na_value=0)
+    else:
+        coloane = [y] if isinstance(y, str) else (y or list(df.select_dtypes('number').columns))
+        valori = df[coloane].sum(axis=1).to_numpy(dtype=np.float64, na_value=0)
+    return df.iloc[_lttb(valori, n)]
+
+
+def bucket_sum(df, n=None):
+    """Pentru bare: însumează rânduri consecutive până rămân cel mult n bare.
+
+    Eticheta fiecărei bare e prima valoare din index a grupului.
+    """
+    n = n or MAX_POINTS
+    if len(df) <= n:
+        return df
+    pas = -(-len(df) // n)
+    grupe = np.arange(len(df)) // pas
+    rezultat = df.groupby(grupe).sum()
+    rezultat.index = df.index[::pas]
+    return rezultat
+
+
+def _webgl(fig):
+    """Înlocuiește urmele Scatter mari cu Scattergl (randare WebGL în browser)"""
+    import plotly.graph_objects as go
+    urme = []
+    schimbat = False
+    for urma in fig.data:
+        if urma.type == 'scatter' and not urma.stackgroup and urma.x is not None \
+                and len(urma.x) > WEBGL_POINTS:
+            proprietati = urma.to_plotly_json()
+            proprietati.pop('type', None)
+            # Ce nu există în Scattergl (ex: line.shape='spline') se ignoră
+            urma = go.Scattergl(proprietati, skip_invalid=True)
+            schimbat = True
+        urme.append(urma)
+    if schimbat:
+        fig = go.Figure(data=urme, layout=fig.layout)
+    return fig
+
+
+def figure(nume, construieste, *date):
+    """construieste(*date) memoizat după conținutul datelor.
+
+    date trebuie să conțină tot ce influențează figura (DataFrame-uri,
+    array-uri, titluri, opțiuni). Figura din cache e comună sesiunilor,
+    deci nu se modifică după ce a fost întoarsă.
+    """
+    amprenta = data_hash(*date)
+    cheie = (nume, amprenta)
+    if amprenta is not None:
+        with _lock:
+            fig = _figuri.get(cheie)
+            if fig is not None:
+                _figuri.move_to_end(cheie)
+                return fig
+    fig = _webgl(construieste(*date))
+    if amprenta is not None:
+        with _lock:
+            _figuri[cheie] = fig
+            while len(_figuri) > CACHE_SIZE:
+                _figuri.popitem(last=False)
+    return fig
+
+
+def chart(nume, construieste, *date, **kwargs):
+    """Desenează figura memoizată (st.plotly_chart, pe toată lățimea coloanei)"""
+    kwargs.setdefault('use_container_width', True)
+    st.plotly_chart(figure(nume, construieste, *date), **kwargs)
@@ -0,0 +1,26 @@
+import streamlit as st
+from database.offline import get_local_replica
+
+
+def offline_banner():
+    """Banner „date vechi” cât timp paginile citesc din copia locală.
+
+    Returnează True dacă aplicația e în modul offline.
+    """
+    replica = get_local_replica()
+    if replica is None:
+        return False
+    stare = replica.status()
+    if stare['offline']:
+        if stare['sincronizat'] is not None:
+            text = (f"⚠️ Serverul bazei de date nu răspunde - datele afișate sunt din copia locală, "
+                    f"actualizată la {stare['sincronizat'].strftime('%d.%m.%Y %H:%M')}")
+        else:
+            text = "⚠️ Serverul bazei de date nu răspunde și nu există încă o copie locală"
+        if stare['in_asteptare']:
+            text += f" • {stare['in_asteptare']} programări așteaptă să fie trimise"
+        st.warning(text)
+    elif stare['conflicte']:
+        st.error(f"❗ {stare['conflicte']} programări făcute offline nu au putut fi trimise "
+                 f"(conflict) - vezi 📅 Programări → ➕ Adaugă Programare")
+    return stare['offline']
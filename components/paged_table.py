@@ -0,0 +1,84 @@
+import math
+import streamlit as st
+
+MARIMI_PAGINA = [25, 50, 100, 250]
+
+
+def paged_table(window, key, pozitii=None, columns=None, cautare_in=None,
+                sort_implicit=None, sortare=None, column_config=None, export=None):
+    """Tabel paginat: în browser ajunge doar pagina curentă, nu tot frame-ul.
+
+    window: TableWindow (ținut pe server, per versiune a datelor)
+    key: prefix unic pentru widget-urile tabelului
+    pozitii: subset deja filtrat (ex: FrameFilter.indices); None = toate rândurile
+    columns: coloanele afișate (implicit toate)
+    cautare_in: coloanele în care caută câmpul de căutare (None = fără căutare)
+    sort_implicit: (coloana, crescator) - ordinea inițială; None = ordinea frame-ului
+    sortare: {coloana_afisata: coloana_de_sortare} - ex: 'Data' (text) se sortează după 'data_sort'
+    export: nume de fișier (fără extensie) pentru exportul CSV la cerere
+    Returnează numărul de rânduri după filtrare.
+    """
+    columns = columns or list(window.df.columns)
+
+    col_cautare, col_sort, col_dir, col_marime = st.columns([3, 2, 1, 1])
+    with col_cautare:
+        cautare = st.text_input("🔍 Caută", key=f"{key}_cautare",
+                                placeholder="Caută în tabel") if cautare_in else ""
+    with col_sort:
+        optiuni = ["—"] + columns
+        implicit = optiuni.index(sort_implicit[0]) if sort_implicit else 0
+        sort_by = st.selectbox("Sortează după", optiuni, index=implicit, key=f"{key}_sort")
+    with col_dir:
+        crescator = st.selectbox(
+            "Ordine", ["↑", "↓"],
+            index=0 if not sort_implicit or sort_implicit[1] else 1,
+            key=f"{key}_dir"
+        ) == "↑"
+    with col_marime:
+        marime = st.selectbox("Rânduri", MARIMI_PAGINA, index=1, key=f"{key}_marime")
+
+    criterii = dict(
+        pozitii=pozitii,
+        sort_by=None if sort_by == "—" else (sortare or {}).get(sort_by, sort_by),
+        ascending=crescator,
+        cautare=cautare.strip() or None,
+        coloane_cautare=cautare_in,
+    )
+    toate = window.positions(**criterii)
+    total = len(toate)
+    pagini = max(1, math.ceil(total / marime))
+
+    # La schimbarea filtrelor sau a sortării revenim la prima pagină
+    semnatura = (total, criterii['sort_by'], crescator, criterii['cautare'], marime)
+    if st.session_state.get(f"{key}_semnatura") != semnatura:
+        st.session_state[f"{key}_semnatura"] = semnatura
+        st.session_state[f"{key}_pagina"] = 1
+    pagina = min(st.session_state.get(f"{key}_pagina", 1), pagini)
+    st.session_state[f"{key}_pagina"] = pagina
+
+    bucata = toate[(pagina - 1) * marime:pagina * marime]
+    df_pagina = window.df.iloc[bucata, [window.df.columns.get_loc(c) for c in columns]]
+    st.dataframe(df_pagina, use_container_width=True, hide_index=True, column_config=column_config)
+
+    col_info, col_nav, col_export = st.columns([3, 2, 1])
+    with col_info:
+        if total:
+            st.caption(f"Rândurile {(pagina - 1) * marime + 1}–{(pagina - 1) * marime + len(bucata)} din {total}")
+        else:
+            st.caption("Niciun rând")
+    with col_nav:
+        st.number_input("Pagina", min_value=1, max_value=pagini, step=1,
+                        key=f"{key}_pagina", label_visibility="collapsed")
+    with col_export:
+        # CSV-ul complet se generează doar la cerere, nu la fiecare rerun
+        if export and st.button("📥 CSV", key=f"{key}_export"):
+            df_export = window.df.iloc[toate, [window.df.columns.get_loc(c) for c in columns]]
+            st.download_button(
+                label="⬇️ Descarcă",
+                data=df_export.to_csv(index=False).encode('utf-8'),
+                file_name=f"{export}.csv",
+                mime="text/csv",
+                key=f"{key}_download",
+                on_click="ignore"
+            )
+    return total
@@ -0,0 +1,38 @@
+import time
+import pandas as pd
+import streamlit as st
+from database.search import search, ETICHETE
+
+
+def search_box(key, tipuri=None, label="🔍 Caută", placeholder="Nume, CNP, specializare, secție sau cauza programării"):
+    """Câmp de căutare peste indexul comun (database.search).
+
+    Afișează rezultatele ca tabel și le returnează (listă de dict); [] dacă
+    nu s-a căutat nimic.
+    """
+    text = st.text_input(label, key=key, placeholder=placeholder)
+    if not text.strip():
+        return []
+    try:
+        inceput = time.perf_counter()
+        rezultate = search(text, tipuri)
+        durata = (time.perf_counter() - inceput) * 1000
+    except Exception as e:
+        st.error(f"Căutarea nu este disponibilă: {e}")
+        return []
+
+    if not rezultate:
+        st.warning("❌ Nu s-au găsit rezultate")
+        return []
+    st.caption(f"{len(rezultate)} rezultate în {durata:.0f} ms")
+    st.dataframe(
+        pd.DataFrame({
+            'Tip': [ETICHETE[r['tip']] for r in rezultate],
+            'Rezultat': [r['titlu'] for r in rezultate],
+            'Detalii': [r['detaliu'] for r in rezultate],
+            'ID': [str(r['id']) for r in rezultate],
+        }),
+        use_container_width=True,
+        hide_index=True
+    )
+    return rezultate
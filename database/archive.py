@@ -0,0 +1,237 @@
+import os
+import sys
+import threading
+from datetime import datetime, timedelta
+import pandas as pd
+from database.connection import db
+from database import changes
+from database.shared_cache import get_shared_cache
+
+# Programările și diagnosticele mai vechi de atâtea zile se mută în arhivă
+HORIZON_DAYS = int(os.getenv('ARCHIVE_HORIZON_DAYS', '730'))
+# Câte rânduri se mută într-o tranzacție
+BATCH_SIZE = int(os.getenv('ARCHIVE_BATCH_SIZE', '5000'))
+
+# Coloana cu data diagnosticului din tabelul Diagnostic. Schema inițială nu o
+# are: trebuie adăugată (ex: ALTER TABLE Diagnostic ADD data_diagnostic DATETIME)
+# sau indicată una existentă; vezi diagnostic_date_column
+DATA_DIAGNOSTIC = os.getenv('DIAGNOSTIC_DATE_COLUMN', 'data_diagnostic')
+
+# Ordinea contează: diagnosticele înaintea programărilor (pot referi programări)
+TABELE = {
+    'Diagnostic': {
+        'arhiva': 'Diagnostic_Arhiva',
+        'view': 'Diagnostic_Toate',
+        'data': DATA_DIAGNOSTIC,
+        'cheie': 'id_diagnostic',
+    },
+    'Programare': {
+        'arhiva': 'Programare_Arhiva',
+        'view': 'Programare_Toate',
+        'data': 'data_programare',
+        'cheie': 'id_programare',
+    },
+}
+
+_lock = threading.Lock()
+_archive_exists = None
+_data_diagnostic_ok = None
+
+
+def _schema_ddl(tabela, info):
+    # UNION ALL elimină proprietatea IDENTITY, ca ID-urile să se păstreze la mutare
+    return [
+        f"""
+        IF OBJECT_ID('{info['arhiva']}', 'U') IS NULL
+            SELECT * INTO {info['arhiva']} FROM {tabela} WHERE 1 = 0
+            UNION ALL
+            SELECT * FROM {tabela} WHERE 1 = 0
+        """,
+        f"""
+        IF NOT EXISTS (SELECT 1 FROM sys.indexes WHERE name = 'IX_{info['arhiva']}_data')
+            CREATE INDEX IX_{info['arhiva']}_data ON {info['arhiva']} ({info['data']})
+        """,
+        f"""
+        IF OBJECT_ID('{info['view']}', 'V') IS NULL
+            EXEC('CREATE VIEW {info['view']} AS
+                  SELECT * FROM {tabela}
+                  UNION ALL
+                  SELECT * FROM {info['arhiva']}')
+        """,
+    ]
+
+
+def diagnostic_date_available():
+    """True dacă Diagnostic are coloana DATA_DIAGNOSTIC (verificat o singură dată per proces)"""
+    global _data_diagnostic_ok
+    if _data_diagnostic_ok is None:
+        with _lock:
+            if _data_diagnostic_ok is None:
+                _, data = db.fetch_data("SELECT COL_LENGTH('Diagnostic', ?)", (DATA_DIAGNOSTIC,))
+                _data_diagnostic_ok = data[0][0] is not None
+    return _data_diagnostic_ok
+
+
+def diagnostic_date_column():
+    """Numele coloanei de dată din Diagnostic, pentru arhivare.
+
+    Fără coloană aruncă RuntimeError cu schimbarea de schemă cerută.
+    """
+    if not diagnostic_date_available():
+        raise RuntimeError(
+            f"Tabelul Diagnostic nu are coloana de dată '{DATA_DIAGNOSTIC}'. "
+            f"Adăugați-o (ALTER TABLE Diagnostic ADD {DATA_DIAGNOSTIC} DATETIME) "
+            f"sau setați DIAGNOSTIC_DATE_COLUMN la coloana existentă."
+        )
+    return DATA_DIAGNOSTIC
+
+
+def diagnostic_date_sql(alias, tip='DATE'):
+    """Expresia SQL cu data diagnosticului; NULL dacă schema nu are coloana.
+
+    Cubul și istoricul pacientului funcționează și fără ea: diagnosticele
+    rămân în rapoartele pe tot istoricul, dar nu intră în cele pe intervale.
+    """
+    if not diagnostic_date_available():
+        return f"CAST(NULL AS {tip})"
+    return f"CAST({alias}.{DATA_DIAGNOSTIC} AS {tip})"
+
+
+def ensure_archive_schema():
+    """Creează tabelele de arhivă și view-urile unificate (dacă lipsesc)"""
+    global _archive_exists
+    diagnostic_date_column()
+    for tabela, info in TABELE.items():
+        for ddl in _schema_ddl(tabela, info):
+            db.execute_query(ddl)
+    _archive_exists = True
+
+
+def archive_exists():
+    """True dacă view-urile unificate există (verificat o singură dată per proces)"""
+    global _archive_exists
+    if _archive_exists is None:
+        with _lock:
+            if _archive_exists is None:
+                try:
+                    _, data = db.fetch_data("SELECT OBJECT_ID('Programare_Toate', 'V')")
+                    _archive_exists = data[0][0] is not None
+                except Exception:
+                    _archive_exists = False
+    return _archive_exists
+
+
+def cutoff(horizon_days=HORIZON_DAYS):
+    """Data sub care rândurile pot fi în arhivă"""
+    return (datetime.now() - timedelta(days=horizon_days)).date()
+
+
+def source(tabela, start=None):
+    """Tabelul din care trebuie citit pentru un interval care începe la `start`.
+
+    Dacă intervalul stă în întregime în partiția curentă (sau arhiva nu
+    există), se folosește tabelul curent; altfel view-ul unificat.
+    start=None înseamnă „tot istoricul”.
+    """
+    if start is not None and pd.Timestamp(start).date() >= cutoff():
+        return tabela
+    if not archive_exists():
+        return tabela
+    return TABELE[tabela]['view']
+
+
+def _referinte(tabela):
+    """Filtrul care păstrează rândurile încă referite de chei străine.
+
+    Ex: o programare veche cu un diagnostic încă în tabelul curent nu poate
+    fi ștearsă (FK); rămâne pe loc până se arhivează și diagnosticul.
+    """
+    _, data = db.fetch_data(
+        """
+        SELECT OBJECT_NAME(fkc.parent_object_id),
+               COL_NAME(fkc.parent_object_id, fkc.parent_column_id),
+               COL_NAME(fkc.referenced_object_id, fkc.referenced_column_id)
+        FROM sys.foreign_key_columns fkc
+        WHERE fkc.referenced_object_id = OBJECT_ID(?)
+          AND fkc.parent_object_id <> fkc.referenced_object_id
+        """,
+        (tabela,)
+    )
+    return ''.join(
+        f"\n                  AND NOT EXISTS (SELECT 1 FROM {copil} r WHERE r.{coloana} = t.{referita})"
+        for copil, coloana, referita in data
+    )
+
+
+def _move_batch(tabela, info, limita, batch_size, referinte="", changelog=False):
+    """Mută un lot în arhivă, într-o singură tranzacție. Returnează ID-urile mutate.
+
+    changelog: rezultatul changes.ensure_changelog(), obținut înaintea
+    tranzacției - DDL-ul lui ar aștepta după lacătele ținute de ea.
+    """
+    with db.transaction() as tx:
+        # Copiere + ștergere în aceeași tranzacție: un rând e fie în tabelul curent,
+        # fie în arhivă. Nu folosim DELETE ... OUTPUT fără INTO: SQL Server îl
+        # refuză pe tabele cu triggere (Diagnostic are triggerul ChangeLog).
+        randuri = tx.fetch_all(
+            f"""
+            SET NOCOUNT ON;
+            DECLARE @ids TABLE (id INT PRIMARY KEY);
+            INSERT INTO @ids
+                SELECT TOP (?) t.{info['cheie']} FROM {tabela} t WITH (UPDLOCK, HOLDLOCK)
+                WHERE t.{info['data']} < ?{referinte};
+            INSERT INTO {info['arhiva']}
+                SELECT t.* FROM {tabela} t JOIN @ids i ON t.{info['cheie']} = i.id;
+            DELETE t FROM {tabela} t JOIN @ids i ON t.{info['cheie']} = i.id;
+            SELECT id FROM @ids;
+            """,
+            (int(batch_size), limita)
+        )
+        ids = [int(row[0]) for row in randuri]
+        if ids and changelog:
+            # 'A' = arhivat: listele curente îl scot, cubul și istoricul îl recitesc din view
+            tx.executemany(
+                "INSERT INTO ChangeLog (tabela, id_rand, operatie) VALUES (?, ?, 'A')",
+                [(tabela, i) for i in ids]
+            )
+        if ids:
+            tx.on_commit(lambda: get_shared_cache().invalidate(tabela))
+    return ids
+
+
+def archive_old_data(horizon_days=HORIZON_DAYS, batch_size=BATCH_SIZE, max_batches=None, progres=None):
+    """Mută istoricul mai vechi decât orizontul în arhivă, pe loturi.
+
+    Fiecare lot e o tranzacție separată, deci jobul poate fi oprit și
+    repornit oricând: continuă cu rândurile rămase.
+    Returnează {tabela: numar_randuri_mutate}.
+    """
+    ensure_archive_schema()
+    # O singură dată, în afara loturilor (vezi _move_batch)
+    changelog = changes.ensure_changelog()
+    limita = cutoff(horizon_days)
+    mutate = {}
+    for tabela, info in TABELE.items():
+        mutate[tabela] = 0
+        loturi = 0
+        referinte = _referinte(tabela)
+        while max_batches is None or loturi < max_batches:
+            ids = _move_batch(tabela, info, limita, batch_size, referinte, changelog)
+            if not ids:
+                break
+            mutate[tabela] += len(ids)
+            loturi += 1
+            if progres is not None:
+                progres(tabela, mutate[tabela])
+    return mutate
+
+
+if __name__ == "__main__":
+    # python -m database.archive [zile_orizont]
+    zile = int(sys.argv[1]) if len(sys.argv) > 1 else HORIZON_DAYS
+    rezultat = archive_old_data(
+        horizon_days=zile,
+        progres=lambda tabela, total: print(f"{tabela}: {total} rânduri mutate...")
+    )
+    for tabela, total in rezultat.items():
+        print(f"{tabela}: {total} rânduri arhivate (mai vechi de {cutoff(zile)})")
@@ -0,0 +1,165 @@
+import os
+import asyncio
+from concurrent.futures import ThreadPoolExecutor
+import pandas as pd
+from database.connection import db
+
+# Numărul maxim de conexiuni (și fire) folosite de AsyncDatabase
+POOL_SIZE = int(os.getenv('ASYNC_DB_POOL_SIZE', '10'))
+# Timeout implicit pentru o interogare (secunde)
+QUERY_TIMEOUT = int(os.getenv('ASYNC_DB_TIMEOUT', '30'))
+
+
+def _run_fetch(conn, holder, query, params):
+    cursor = conn.cursor()
+    holder['cursor'] = cursor
+    if params:
+        cursor.execute(query, params)
+    else:
+        cursor.execute(query)
+    columns = [desc[0] for desc in cursor.description]
+    data = cursor.fetchall()
+    cursor.close()
+    return columns, data
+
+
+def _run_execute(conn, holder, query, params, many):
+    cursor = conn.cursor()
+    holder['cursor'] = cursor
+    try:
+        if many:
+            cursor.fast_executemany = True
+            cursor.executemany(query, params)
+        elif params:
+            cursor.execute(query, params)
+        else:
+            cursor.execute(query)
+        rowcount = cursor.rowcount
+        conn.commit()
+        return rowcount
+    except Exception:
+        conn.rollback()
+        raise
+    finally:
+        cursor.close()
+
+
+class AsyncDatabase:
+    """Varianta asyncio a clasei Database, pentru joburi de fundal.
+
+    pyodbc nu are un driver asincron nativ pentru SQL Server (aioodbc
+    folosește tot un pool de fire), așa că fiecare interogare rulează într-un
+    ThreadPoolExecutor limitat la POOL_SIZE, pe o conexiune din pool.
+    La timeout sau anulare se apelează cursor.cancel(), iar conexiunea
+    respectivă este închisă după ce firul se termină.
+    """
+
+    def __init__(self, database=None, pool_size=POOL_SIZE, timeout=QUERY_TIMEOUT):
+        self._db = database or db
+        self.pool_size = pool_size
+        self.timeout = timeout
+        self._executor = ThreadPoolExecutor(max_workers=pool_size, thread_name_prefix="async-db")
+        self._loop = None
+        self._pool = None
+        self._sem = None
+        self._created = 0
+
+    def _bind_loop(self):
+        # Pool-ul asyncio aparține unei singure bucle de evenimente
+        loop = asyncio.get_running_loop()
+        if self._loop is not loop:
+            if self._pool is not None:
+                self._close_idle()
+            self._loop = loop
+            self._pool = asyncio.LifoQueue()
+            self._sem = asyncio.Semaphore(self.pool_size)
+            self._created = 0
+        return loop
+
+    async def _acquire(self, loop):
+        await self._sem.acquire()
+        try:
+            # Semaforul garantează că nu depășim pool_size conexiuni
+            if not self._pool.empty():
+                return self._pool.get_nowait()
+            self._created += 1
+            try:
+                return await loop.run_in_executor(self._executor, self._db.get_connection)
+            except Exception:
+                self._created -= 1
+                raise
+        except BaseException:
+            self._sem.release()
+            raise
+
+    def _release(self, conn):
+        self._pool.put_nowait(conn)
+        self._sem.release()
+
+    def _discard(self, conn):
+        try:
+            conn.close()
+        except Exception:
+            pass
+        self._created -= 1
+        self._sem.release()
+
+    def _close_idle(self):
+        while not self._pool.empty():
+            try:
+                self._pool.get_nowait().close()
+            except Exception:
+                pass
+
+    async def _call(self, functie, *args, timeout=None):
+        loop = self._bind_loop()
+        timeout = self.timeout if timeout is None else timeout
+        conn = await self._acquire(loop)
+        # Timeout și pe server, ca interogarea să nu continue după anulare
+        conn.timeout = int(timeout) if timeout else 0
+        holder = {}
+        future = loop.run_in_executor(self._executor, functie, conn, holder, *args)
+        try:
+            result = await asyncio.wait_for(asyncio.shield(future), timeout)
+        except (asyncio.TimeoutError, asyncio.CancelledError):
+            cursor = holder.get('cursor')
+            if cursor is not None:
+                try:
+                    cursor.cancel()
+                except Exception:
+                    pass
+            # Conexiunea se închide abia după ce firul a terminat cu ea
+            future.add_done_callback(lambda _: self._discard(conn))
+            raise
+        except Exception:
+            self._discard(conn)
+            raise
+        self._release(conn)
+        return result
+
+    async def fetch(self, query, params=None, timeout=None):
+        """SELECT - returnează (coloane, rânduri)"""
+        return await self._call(_run_fetch, query, params, timeout=timeout)
+
+    async def fetch_dataframe(self, query, params=None, timeout=None):
+        """SELECT - returnează pandas DataFrame"""
+        columns, data = await self.fetch(query, params, timeout=timeout)
+        return pd.DataFrame.from_records([tuple(row) for row in data], columns=columns)
+
+    async def execute(self, query, params=None, timeout=None):
+        """INSERT / UPDATE / DELETE - returnează numărul de rânduri afectate"""
+        return await self._call(_run_execute, query, params, False, timeout=timeout)
+
+    async def executemany(self, query, seq_params, timeout=None):
+        """Aceeași comandă pentru o listă de parametri, într-o singură tranzacție"""
+        return await self._call(_run_execute, query, list(seq_params), True, timeout=timeout)
+
+    async def close(self):
+        """Închide conexiunile libere și firele"""
+        if self._pool is not None:
+            self._close_idle()
+        self._executor.shutdown(wait=False)
+
+
+# Instanța globală pentru joburile asincrone
+async_db = AsyncDatabase()
@@ -0,0 +1,176 @@
+import threading
+import numpy as np
+import pandas as pd
+from database.connection import db
+from database import changes
+
+INTERNARI_QUERY = """
+    SELECT
+        p.id_pacient,
+        ISNULL(s.nume_sectie, 'Fără secție') as sectie,
+        CAST(p.data_internare AS DATE) as internare,
+        CAST(p.data_externare AS DATE) as externare
+    FROM Pacient p
+    LEFT JOIN Sectie s ON p.id_sectie = s.id_sectie
+    WHERE p.data_internare IS NOT NULL
+    {filtru}
+"""
+
+
+class CensusEngine:
+    """Recensământul paturilor calculat în memorie din intervalele de internare.
+
+    Fiecare internare e un interval [internare, externare). Ocupația pe zile
+    se obține cu un sweep: +1 în ziua internării, -1 în ziua externării,
+    apoi sumă cumulativă pe fiecare secție - o singură trecere NumPy, fără
+    interogări per zi. Modificările din Pacient (ChangeLog) se aplică
+    incremental.
+    """
+
+    def __init__(self):
+        self._rows = None
+        self._versiune = None
+        self._lock = threading.Lock()
+        self._arrays = None
+
+    # ----- încărcare și actualizare incrementală -----
+
+    def _fetch(self, endpoint, filtru="", params=None):
+        df = db.fetch_dataframe(INTERNARI_QUERY.format(filtru=filtru), params=params, endpoint=endpoint)
+        df['internare'] = pd.to_datetime(df['internare'])
+        df['externare'] = pd.to_datetime(df['externare'])
+        return df.set_index('id_pacient')
+
+    def _build_arrays(self):
+        rows = self._rows
+        sectii, coduri = np.unique(rows['sectie'].to_numpy(dtype=str), return_inverse=True)
+        self._arrays = {
+            'sectii': sectii,
+            'cod': coduri.astype(np.int32),
+            'start': rows['internare'].to_numpy(dtype='datetime64[D]'),
+            'end': rows['externare'].to_numpy(dtype='datetime64[D]'),
+        }
+
+    def sync(self):
+        with self._lock:
+            # Toată sincronizarea citește din aceeași sursă (replică sau primar)
+            endpoint = db.read_endpoint(replica=True)
+            versiune = changes.get_current_version(endpoint) if changes.ensure_changelog() else None
+            if self._rows is None or versiune is None:
+                self._rows = self._fetch(endpoint)
+            elif versiune != self._versiune:
+                ids = changes.get_changes_since(self._versiune, {'Pacient'}, endpoint).get('Pacient', set())
+                if len(ids) > changes.MAX_IDS_INCREMENTAL:
+                    self._rows = self._fetch(endpoint)
+                elif ids:
+                    ids = sorted(ids)
+                    rows = self._rows.drop(index=ids, errors='ignore')
+                    noi = []
+                    for i in range(0, len(ids), changes.IN_CHUNK):
+                        chunk = ids[i:i + changes.IN_CHUNK]
+                        filtru = f"AND p.id_pacient IN ({', '.join('?' * len(chunk))})"
+                        noi.append(self._fetch(endpoint, filtru, tuple(chunk)))
+                    self._rows = pd.concat([rows] + noi)
+                else:
+                    self._versiune = versiune
+                    return
+            else:
+                return
+            self._versiune = versiune
+            self._build_arrays()
+
+    def _date_range(self, start, end):
+        start = np.datetime64(pd.Timestamp(start).date(), 'D')
+        end = np.datetime64(pd.Timestamp(end).date(), 'D')
+        return start, end, int((end - start).astype(int)) + 1
+
+    # ----- interogări -----
+
+    def occupancy(self, start, end):
+        """Ocupația (pacienți internați) pe secție pentru fiecare zi din [start, end].
+
+        Returnează un DataFrame cu zilele pe index și secțiile pe coloane.
+        """
+        self.sync()
+        a = self._arrays
+        start, end, n_zile = self._date_range(start, end)
+        zile = pd.date_range(str(start), periods=n_zile, freq='D')
+        if a is None or len(a['cod']) == 0 or n_zile <= 0:
+            return pd.DataFrame(index=zile)
+
+        # Internările deschise (fără externare) continuă după sfârșitul intervalului
+        sfarsit = np.where(np.isnat(a['end']), end + 1, a['end'])
+        activ = (a['start'] <= end) & (sfarsit > start)
+        cod = a['cod'][activ]
+        i_start = np.clip((a['start'][activ] - start).astype(np.int64), 0, n_zile)
+        i_end = np.clip((sfarsit[activ] - start).astype(np.int64), 0, n_zile)
+
+        delta = np.zeros((len(a['sectii']), n_zile + 1), dtype=np.int64)
+        np.add.at(delta, (cod, i_start), 1)
+        np.add.at(delta, (cod, i_end), -1)
+        ocupatie = np.cumsum(delta[:, :n_zile], axis=1)
+        return pd.DataFrame(ocupatie.T, index=zile, columns=a['sectii'])
+
+    def _count_per_day(self, zile_evenimente, start, end):
+        a = self._arrays
+        start, end, n_zile = self._date_range(start, end)
+        zile = pd.date_range(str(start), periods=n_zile, freq='D')
+        if a is None or len(a['cod']) == 0 or n_zile <= 0:
+            return pd.DataFrame(index=zile)
+        in_interval = ~np.isnat(zile_evenimente) & (zile_evenimente >= start) & (zile_evenimente <= end)
+        idx = (zile_evenimente[in_interval] - start).astype(np.int64)
+        cod = a['cod'][in_interval]
+        n_sectii = len(a['sectii'])
+        # bincount pe indicele combinat (secție, zi)
+        numar = np.bincount(cod * n_zile + idx, minlength=n_sectii * n_zile)
+        return pd.DataFrame(numar.reshape(n_sectii, n_zile).T, index=zile, columns=a['sectii'])
+
+    def admissions(self, start, end):
+        """Număr de internări pe zi și secție"""
+        self.sync()
+        return self._count_per_day(self._arrays['start'] if self._arrays else None, start, end)
+
+    def discharges(self, start, end):
+        """Număr de externări pe zi și secție"""
+        self.sync()
+        return self._count_per_day(self._arrays['end'] if self._arrays else None, start, end)
+
+    def average_length_of_stay(self, start, end):
+        """Durata medie de spitalizare (zile) pe secție, pentru externările din [start, end]"""
+        self.sync()
+        a = self._arrays
+        start, end, _ = self._date_range(start, end)
+        if a is None or len(a['cod']) == 0:
+            return pd.DataFrame(columns=['Sectie', 'Externări', 'Durata Medie (zile)'])
+        externat = ~np.isnat(a['end']) & (a['end'] >= start) & (a['end'] <= end)
+        durate = (a['end'][externat] - a['start'][externat]).astype(np.int64)
+        cod = a['cod'][externat]
+        n_sectii = len(a['sectii'])
+        numar = np.bincount(cod, minlength=n_sectii)
+        suma = np.bincount(cod, weights=durate, minlength=n_sectii)
+        medie = np.divide(suma, numar, out=np.full(n_sectii, np.nan), where=numar > 0)
+        df = pd.DataFrame({
+            'Sectie': a['sectii'],
+            'Externări': numar,
+            'Durata Medie (zile)': np.round(medie, 1)
+        })
+        return df[df['Externări'] > 0].sort_values('Durata Medie (zile)', ascending=False)
+
+    def current_inpatients(self):
+        """Numărul de pacienți internați acum (fără data de externare)"""
+        self.sync()
+        a = self._arrays
+        return int(np.isnat(a['end']).sum()) if a is not None else 0
+
+
+_engine = None
+_engine_lock = threading.Lock()
+
+
+def get_census():
+    """Instanța unică (per proces) a motorului de recensământ"""
+    global _engine
+    with _engine_lock:
+        if _engine is None:
+            _engine = CensusEngine()
+        return _engine
@@ -0,0 +1,320 @@
+import threading
+import pandas as pd
+from database.connection import db
+from database.filters import FrameFilter
+from database.shared_cache import get_shared_cache
+from database import hot_snapshot
+
+# Tabelul jurnal de modificări: fiecare scriere din paginile CRUD adaugă un rând.
+# Marcajul de sincronizare e coloana rv (ROWVERSION), nu IDENTITY: un IDENTITY
+# se alocă la INSERT, deci o tranzacție lungă poate confirma o versiune mai
+# mică decât una deja citită, iar rândul ei ar fi sărit pentru totdeauna.
+CHANGELOG_DDL = """
+    IF OBJECT_ID('ChangeLog', 'U') IS NULL
+    CREATE TABLE ChangeLog (
+        versiune BIGINT IDENTITY(1,1) PRIMARY KEY,
+        tabela VARCHAR(50) NOT NULL,
+        id_rand INT NOT NULL,
+        operatie CHAR(1) NOT NULL,
+        data_modificare DATETIME NOT NULL DEFAULT GETDATE(),
+        rv ROWVERSION
+    );
+    IF COL_LENGTH('ChangeLog', 'rv') IS NULL
+        EXEC('ALTER TABLE ChangeLog ADD rv ROWVERSION');
+    IF NOT EXISTS (SELECT 1 FROM sys.indexes
+                   WHERE name = 'IX_ChangeLog_rv' AND object_id = OBJECT_ID('ChangeLog'))
+        EXEC('CREATE INDEX IX_ChangeLog_rv ON ChangeLog (rv) INCLUDE (tabela, id_rand)');
+"""
+
+# Diagnosticele se scriu din afara aplicației (nu trec prin track), deci
+# modificările lor ajung în ChangeLog printr-un trigger
+DIAGNOSTIC_TRIGGER_DDL = """
+    IF OBJECT_ID('TR_Diagnostic_ChangeLog', 'TR') IS NULL
+    EXEC('CREATE TRIGGER TR_Diagnostic_ChangeLog ON Diagnostic
+          AFTER INSERT, UPDATE, DELETE AS
+          BEGIN
+              SET NOCOUNT ON;
+              INSERT INTO ChangeLog (tabela, id_rand, operatie)
+              SELECT ''Diagnostic'', i.id_diagnostic,
+                     CASE WHEN EXISTS (SELECT 1 FROM deleted) THEN ''U'' ELSE ''I'' END
+              FROM inserted i
+              UNION ALL
+              SELECT ''Diagnostic'', d.id_diagnostic, ''D''
+              FROM deleted d
+              WHERE NOT EXISTS (SELECT 1 FROM inserted i WHERE i.id_diagnostic = d.id_diagnostic)
+          END')
+"""
+
+# Toate rândurile cu rv sub MIN_ACTIVE_ROWVERSION() sunt confirmate; cele
+# peste pot aparține unor tranzacții încă deschise
+CURRENT_VERSION_QUERY = "SELECT CAST(MIN_ACTIVE_ROWVERSION() AS BIGINT) - 1"
+
+# Peste acest număr de ID-uri modificate reîncărcăm tot tabelul
+MAX_IDS_INCREMENTAL = 2000
+# SQL Server acceptă maxim 2100 de parametri pe comandă
+IN_CHUNK = 500
+
+_lock = threading.Lock()
+_changelog_ok = None
+_diagnostic_trigger_ok = False
+_frames = {}
+
+
+def _permission_denied(eroare):
+    """Eroarea 262 / 1088 (fără drept de CREATE / ALTER): nu se rezolvă reîncercând"""
+    args = getattr(eroare, 'args', ())
+    return bool(args) and args[0] == '42000' and ('(262)' in str(args[-1]) or '(1088)' in str(args[-1]))
+
+
+def ensure_changelog():
+    """Creează tabelul ChangeLog dacă nu există. Returnează False dacă nu e disponibil.
+
+    Doar lipsa drepturilor se reține pentru tot procesul; o eroare de
+    conexiune se propagă, iar următorul apel încearcă din nou.
+    """
+    global _changelog_ok, _diagnostic_trigger_ok
+    if _changelog_ok is None:
+        with _lock:
+            if _changelog_ok is None:
+                try:
+                    db.execute_query(CHANGELOG_DDL)
+                except Exception as e:
+                    if not _permission_denied(e):
+                        raise
+                    # Fără drept de CREATE TABLE: paginile vor reîncărca totul
+                    _changelog_ok = False
+                    return _changelog_ok
+                try:
+                    db.execute_query(DIAGNOSTIC_TRIGGER_DDL)
+                    _diagnostic_trigger_ok = True
+                except Exception as e:
+                    if not _permission_denied(e):
+                        raise
+                    # Fără trigger, cubul și istoricul văd doar diagnosticele noi (după id)
+                _changelog_ok = True
+    return _changelog_ok
+
+
+def diagnostics_tracked():
+    """True dacă toate scrierile în Diagnostic ajung în ChangeLog (prin trigger)"""
+    return ensure_changelog() and _diagnostic_trigger_ok
+
+
+def track(tx, query, params, tabela, operatie, id_rand=None):
+    """O scriere + rândul ei din ChangeLog, în tranzacția tx (db.transaction).
+
+    operatie: 'I' (insert), 'U' (update), 'D' (delete).
+    Pentru INSERT, id_rand se citește cu SCOPE_IDENTITY() dacă nu e dat.
+    Cache-ul comun se invalidează după COMMIT. Returnează id-ul rândului modificat.
+    """
+    if operatie == 'I' and id_rand is None:
+        id_rand = tx.insert(query, params)
+    else:
+        tx.execute(query, params)
+    tx.on_commit(lambda: get_shared_cache().invalidate(tabela))
+    if not ensure_changelog() or id_rand is None:
+        return id_rand
+    tx.execute(
+        "INSERT INTO ChangeLog (tabela, id_rand, operatie) VALUES (?, ?, ?)",
+        (tabela, int(id_rand), operatie)
+    )
+    return id_rand
+
+
+def execute_tracked(query, params, tabela, operatie, id_rand=None):
+    """INSERT / UPDATE / DELETE + rândul din ChangeLog, în aceeași tranzacție.
+
+    Pentru mai multe scrieri legate, folosiți track() în db.transaction().
+    Returnează id-ul rândului modificat.
+    """
+    with db.transaction() as tx:
+        return track(tx, query, params, tabela, operatie, id_rand)
+
+
+def get_current_version(endpoint=None):
+    """Marcajul ChangeLog: cel mai mare rv sub care nu mai poate apărea niciun rând.
+
+    Nu e MAX(rv): un rând cu rv mai mic poate fi încă într-o tranzacție
+    neconfirmată. Un marcaj citit înaintea datelor garantează că
+    get_changes_since(marcaj) aduce tot ce nu era vizibil la citire.
+    """
+    _, data = db.fetch_data(CURRENT_VERSION_QUERY, endpoint=endpoint)
+    return int(data[0][0])
+
+
+def get_changes_since(versiune, tabele=None, endpoint=None):
+    """Rândurile modificate după un marcaj (get_current_version): {tabela: set(id_rand)}"""
+    query = """
+        SELECT DISTINCT tabela, id_rand
+        FROM ChangeLog
+        WHERE rv > CAST(CAST(? AS BIGINT) AS BINARY(8))
+    """
+    _, data = db.fetch_data(query, (int(versiune),), endpoint=endpoint)
+    modificari = {}
+    for tabela, id_rand in data:
+        if tabele is None or tabela in tabele:
+            modificari.setdefault(tabela, set()).add(int(id_rand))
+    return modificari
+
+
+class TrackedFrame:
+    """DataFrame ținut în memorie și actualizat doar cu rândurile modificate.
+
+    query trebuie să conțină marcajul {filtru} în locul clauzei WHERE;
+    la încărcarea completă filtrul e gol, la actualizare devine
+    "WHERE <coloana> IN (?, ?, ...)".
+
+    depinde_de: {tabela: (coloana_in_frame, expresie_sql)} - modificările din
+    tabela respectivă înlocuiesc rândurile cu acele ID-uri. Prima intrare
+    trebuie să fie cheia primară a frame-ului.
+    reincarca_la: tabele care, dacă se modifică, cer reîncărcare completă.
+    filter_on: coloana de dată pentru FrameFilter (prima coloană din sort_by).
+    replica: citirile pot merge pe replica de citire. Versiunea, jurnalul și
+    rândurile unei sincronizări vin mereu din aceeași sursă.
+    nume: cheia din copia de pe disc (hot_snapshot); la prima sincronizare
+    frame-ul pornește de acolo și aplică doar modificările de după marcaj.
+    """
+
+    def __init__(self, query, depinde_de, sort_by=None, ascending=True,
+                 reincarca_la=(), postprocess=None, filter_on=None, replica=False, nume=None):
+        self.query = query
+        self.depinde_de = depinde_de
+        self.sort_by = sort_by
+        self.ascending = ascending
+        self.reincarca_la = set(reincarca_la)
+        self.postprocess = postprocess
+        self.filter_on = filter_on
+        self.replica = replica
+        self.nume = nume
+        self.versiune = None
+        self._din_copie = nume is None
+        self._df = None
+        self._filter = None
+        self._lock = threading.Lock()
+
+    def _fetch(self, endpoint, filtru="", params=None):
+        df = db.fetch_dataframe(self.query.format(filtru=filtru), params=params, endpoint=endpoint)
+        if self.postprocess is not None and not df.empty:
+            df = self.postprocess(df)
+        return df
+
+    def _fetch_ids(self, endpoint, expresie_sql, ids):
+        ids = sorted(ids)
+        bucati = []
+        for i in range(0, len(ids), IN_CHUNK):
+            chunk = ids[i:i + IN_CHUNK]
+            filtru = f"WHERE {expresie_sql} IN ({', '.join('?' * len(chunk))})"
+            bucati.append(self._fetch(endpoint, filtru, tuple(chunk)))
+        return bucati
+
+    def _reload(self, endpoint, versiune):
+        self._df = self._fetch(endpoint)
+        self._filter = None
+        self.versiune = versiune
+
+    def _apply(self, endpoint, modificari, versiune):
+        df = self._df
+        noi = []
+        for tabela, ids in modificari.items():
+            coloana, expresie_sql = self.depinde_de[tabela]
+            # Scoatem rândurile afectate (acoperă și DELETE), apoi le reîncărcăm
+            df = df[~df[coloana].isin(ids)]
+            noi.extend(self._fetch_ids(endpoint, expresie_sql, ids))
+        noi = [bucata for bucata in noi if not bucata.empty]
+        if noi:
+            df = pd.concat([df] + noi, ignore_index=True)
+            # Un rând poate veni de mai multe ori (ex: pacient și doctor modificați)
+            cheie = next(iter(self.depinde_de.values()))[0]
+            df = df.drop_duplicates(subset=[cheie], keep='last')
+        if self.sort_by:
+            df = df.sort_values(self.sort_by, ascending=self.ascending, kind='stable')
+        self._df = df.reset_index(drop=True)
+        self._filter = None
+        self.versiune = versiune
+
+    def sync(self):
+        """Aduce frame-ul la zi: cost proporțional cu numărul de modificări"""
+        with self._lock:
+            endpoint = db.read_endpoint(self.replica)
+            if not ensure_changelog():
+                self._reload(endpoint, None)
+                return
+            if not self._din_copie:
+                self._din_copie = True
+                copie = hot_snapshot.load_frame(self.nume, hot_snapshot.signature(self))
+                if copie is not None:
+                    self._df, self.versiune = copie
+            versiune = get_current_version(endpoint)
+            if self._df is None or self.versiune is None:
+                self._reload(endpoint, versiune)
+                return
+            if versiune == self.versiune:
+                return
+
+            modificari = get_changes_since(
+                self.versiune, set(self.depinde_de) | self.reincarca_la, endpoint
+            )
+            total_ids = sum(len(ids) for ids in modificari.values())
+            if (self.reincarca_la & set(modificari)) or total_ids > MAX_IDS_INCREMENTAL:
+                self._reload(endpoint, versiune)
+            elif modificari:
+                self._apply(endpoint, modificari, versiune)
+            else:
+                self.versiune = versiune
+
+    def get(self):
+        """Returnează frame-ul actualizat (copie superficială, nu-l modificați pe loc)"""
+        self.sync()
+        return self._df.copy(deep=False)
+
+    def get_filter(self):
+        """FrameFilter peste frame-ul actualizat, reconstruit doar când frame-ul se schimbă.
+
+        filter.df este frame-ul complet (nu-l modificați pe loc).
+        """
+        self.sync()
+        with self._lock:
+            if self._filter is None:
+                self._filter = FrameFilter(
+                    self._df,
+                    date_column=self.filter_on,
+                    descending=not self.ascending
+                )
+            return self._filter
+
+    def get_window(self):
+        """TableWindow peste frame-ul actualizat (pentru afișarea paginată)"""
+        return self.get_filter().window
+
+    def state(self):
+        """(df, versiune) curente, fără sincronizare (pentru copia de pe disc)"""
+        with self._lock:
+            return self._df, self.versiune
+
+    def invalidate(self):
+        """Forțează reîncărcarea completă la următorul get()"""
+        with self._lock:
+            self._df = None
+            self._filter = None
+            self.versiune = None
+
+
+def tracked_frame(nume, query, depinde_de, **kwargs):
+    """Returnează (și creează la nevoie) un TrackedFrame partajat în proces.
+
+    Paginile Streamlit sunt re-executate la fiecare rerun, așa că frame-urile
+    stau aici, în modulul importat o singură dată.
+    """
+    with _lock:
+        frame = _frames.get(nume)
+        if frame is None:
+            frame = TrackedFrame(query, depinde_de, nume=nume, **kwargs)
+            _frames[nume] = frame
+    hot_snapshot.start_writer()
+    return frame
+
+
+def tracked_frames():
+    """Frame-urile create până acum în proces: {nume: TrackedFrame}"""
+    with _lock:
+        return dict(_frames)
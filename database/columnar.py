@@ -0,0 +1,126 @@
+import os
+import datetime as dt
+import decimal
+import numpy as np
+import pandas as pd
+
+# Câte rânduri se citesc dintr-o dată din cursor
+BATCH_SIZE = int(os.getenv('DB_FETCH_BATCH', '10000'))
+# 'auto' = arrow-odbc dacă e instalat, altfel NumPy; 'arrow' / 'numpy' forțează motorul
+ENGINE = os.getenv('DB_FETCH_ENGINE', 'auto')
+
+try:
+    from arrow_odbc import read_arrow_batches_from_odbc
+except ImportError:
+    read_arrow_batches_from_odbc = None
+
+
+def _column(valori, tip):
+    """Un lot dintr-o coloană -> array tipizat (fără inferență per valoare în pandas)"""
+    if tip is int:
+        try:
+            return np.array(valori, dtype=np.int64)
+        except TypeError:
+            # NULL-uri: ca pd.read_sql, coloana devine float cu NaN
+            return np.array(valori, dtype=np.float64)
+    if tip in (float, decimal.Decimal):
+        return np.array(valori, dtype=np.float64)
+    if tip is dt.datetime:
+        return np.array(valori, dtype='datetime64[ns]')
+    if tip is bool and None not in valori:
+        return np.array(valori, dtype=bool)
+    arr = np.empty(len(valori), dtype=object)
+    arr[:] = valori
+    return arr
+
+
+def _concat(bucati):
+    if len(bucati) == 1:
+        return bucati[0]
+    tipuri = {b.dtype for b in bucati}
+    if np.dtype(np.int64) in tipuri and np.dtype(np.float64) in tipuri:
+        bucati = [b.astype(np.float64) for b in bucati]
+    return np.concatenate(bucati)
+
+
+def _empty(tip):
+    if tip is int:
+        return np.empty(0, dtype=np.int64)
+    if tip in (float, decimal.Decimal):
+        return np.empty(0, dtype=np.float64)
+    if tip is dt.datetime:
+        return np.empty(0, dtype='datetime64[ns]')
+    return np.empty(0, dtype=object)
+
+
+def _columns(randuri, descriere):
+    """Un lot de rânduri pyodbc -> o listă de array-uri tipizate, câte unul pe coloană"""
+    return [_column(valori, descriere[i][1]) for i, valori in enumerate(zip(*randuri))]
+
+
+def _frame(bucati, descriere):
+    coloane = {
+        i: _concat(bucati[i]) if bucati[i] else _empty(d[1])
+        for i, d in enumerate(descriere)
+    }
+    df = pd.DataFrame(coloane, copy=False)
+    df.columns = [d[0] for d in descriere]
+    return df
+
+
+def frame_from_rows(randuri, descriere):
+    """DataFrame dintr-un singur lot de rânduri (ex: o bucată din Database.stream)"""
+    return _frame([[c] for c in _columns(randuri, descriere)] if randuri else [[] for _ in descriere],
+                  descriere)
+
+
+def frame_from_cursor(cursor, batch_size=BATCH_SIZE):
+    """DataFrame din cursor, citit pe loturi direct în array-uri pe coloane.
+
+    Fiecare lot din fetchmany se transpune și se convertește imediat în
+    array-uri NumPy tipizate (după tipul din cursor.description), apoi
+    rândurile lotului sunt eliberate - nu se ține niciodată tot rezultatul
+    ca listă de tupluri, iar pandas nu mai deduce tipul valoare cu valoare.
+    """
+    descriere = cursor.description
+    bucati = [[] for _ in descriere]
+    while True:
+        randuri = cursor.fetchmany(batch_size)
+        if not randuri:
+            break
+        for i, arr in enumerate(_columns(randuri, descriere)):
+            bucati[i].append(arr)
+        del randuri
+    return _frame(bucati, descriere)
+
+
+def arrow_available(params=None):
+    """Dacă interogarea poate merge prin arrow-odbc.
+
+    arrow-odbc deschide o conexiune proprie (în afara pool-ului), deci în
+    modul 'auto' îl folosim doar pentru încărcările complete, fără
+    parametri; căutările punctuale rămân pe instrucțiunile pregătite.
+    Parametrii se trimit ca text, deci doar int / str sunt acceptați.
+    """
+    if read_arrow_batches_from_odbc is None or ENGINE == 'numpy':
+        return False
+    if ENGINE != 'arrow':
+        return not params
+    return all(v is None or isinstance(v, (int, str)) and not isinstance(v, bool) for v in params or ())
+
+
+def frame_from_arrow(query, connection_string, params=None, batch_size=BATCH_SIZE):
+    """DataFrame citit cu arrow-odbc: driverul umple direct buffere Arrow, fără obiecte Python per rând"""
+    import pyarrow as pa
+    reader = read_arrow_batches_from_odbc(
+        query=query,
+        connection_string=connection_string,
+        batch_size=batch_size,
+        parameters=[None if v is None else str(v) for v in params] if params else None,
+    )
+    tabel = pa.Table.from_batches(list(reader), schema=reader.schema)
+    # Ca pd.read_sql: Decimal -> float
+    for i, camp in enumerate(tabel.schema):
+        if pa.types.is_decimal(camp.type):
+            tabel = tabel.set_column(i, camp.name, tabel.column(i).cast(pa.float64()))
+    return tabel.to_pandas()
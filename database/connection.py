@@ -1,55 +1,630 @@
-import pyodbc
 import os
+import sys
+import random
+import threading
+import time
+import queue
+import decimal
+import datetime as dt
+from collections import OrderedDict
+from contextlib import contextmanager
 from dotenv import load_dotenv
-import pandas as pd
 
+# .env trebuie citit înainte ca modulele din database/ să-și citească setările
 load_dotenv()
 
+# Replica de citire (opțională) pentru rapoarte și încărcările complete
+READ_SERVER = os.getenv('DB_READ_SERVER')
+READ_DATABASE = os.getenv('DB_READ_NAME')
+# Peste acest decalaj (secunde) citirile merg pe primar
+MAX_REPLICA_LAG = float(os.getenv('DB_MAX_REPLICA_LAG', '30'))
+# Cât timp după o scriere sesiunea citește doar de pe primar (read-your-writes)
+STICKY_SECONDS = float(os.getenv('DB_STICKY_SECONDS', '60'))
+# Cât de des se verifică decalajul replicii
+LAG_CHECK_SECONDS = float(os.getenv('DB_LAG_CHECK_SECONDS', '15'))
+
+# Cât așteptăm (secunde) deschiderea unei conexiuni înainte să considerăm serverul indisponibil
+CONNECT_TIMEOUT = int(os.getenv('DB_CONNECT_TIMEOUT', '5'))
+# Câte conexiuni libere păstrăm per server (primar / replică)
+POOL_SIZE = int(os.getenv('DB_POOL_SIZE', '8'))
+# Câte instrucțiuni pregătite păstrăm pe fiecare conexiune
+STATEMENT_CACHE_SIZE = int(os.getenv('DB_STATEMENT_CACHE', '64'))
+# De câte ori se reia o tranzacție aleasă victimă într-un deadlock
+DEADLOCK_RETRIES = int(os.getenv('DB_DEADLOCK_RETRIES', '3'))
+# Pauza (secunde) înainte de prima reluare; se dublează la fiecare încercare
+DEADLOCK_BACKOFF = float(os.getenv('DB_DEADLOCK_BACKOFF', '0.05'))
+# SQL Server acceptă maxim 2100 de parametri pe comandă
+MAX_PARAMS = 2100
+
+PRIMARY = 'primary'
+REPLICA = 'replica'
+
+# Lungimea declarată pentru parametrii text: aceeași la fiecare apel, ca
+# serverul să vadă mereu nvarchar(4000) și să refolosească planul
+TEXT_SIZE = 4000
+
+
+_NATIVE = (type(None), str, bytes, bool, int, float, decimal.Decimal, dt.datetime, dt.date, dt.time)
+
+
+def _drain(cursor):
+    """Citește tot ce a rămas necitit pe cursor (toate seturile de rezultate).
+
+    Fără MARS, SQL Server ține o singură instrucțiune activă pe conexiune:
+    cât timp un cursor are rezultate necitite, orice alt cursor al
+    conexiunii primește „Connection is busy with results for another hstmt”.
+    """
+    try:
+        while True:
+            if cursor.description is not None:
+                cursor.fetchall()
+            if not cursor.nextset():
+                break
+    except Exception:
+        # Cursor închis sau fără rezultate - nimic de consumat
+        pass
+
+
+def normalize_value(valoare):
+    """Scalar NumPy / pandas -> tip Python pe care pyodbc îl înțelege (None pentru NaN / NaT / NA)"""
+    if type(valoare) in _NATIVE:
+        return None if type(valoare) is float and valoare != valoare else valoare
+    if hasattr(valoare, 'dtype') and hasattr(valoare, 'item'):
+        # Scalari NumPy: np.int64, np.float64, np.bool_, np.datetime64
+        if valoare.dtype.kind != 'M':
+            return normalize_value(valoare.item())
+        import pandas as pd
+        valoare = pd.Timestamp(valoare)
+    if isinstance(valoare, dt.datetime):
+        # pd.Timestamp / pd.NaT
+        if valoare != valoare:
+            return None
+        return valoare.to_pydatetime() if hasattr(valoare, 'to_pydatetime') else valoare
+    if isinstance(valoare, float):
+        return None if valoare != valoare else float(valoare)
+    if isinstance(valoare, int):
+        return int(valoare)
+    if type(valoare).__name__ == 'NAType':
+        return None
+    return valoare
+
+
+def normalize_params(params):
+    """Tuplu de parametri cu scalari Python nativi (None pentru NaN / NaT / NA)"""
+    if not params:
+        return params
+    return tuple(normalize_value(v) for v in params)
+
+
+def _param_type(valoare):
+    """Tipul declarat cu setinputsizes: (tip SQL, dimensiune, zecimale)"""
+    import pyodbc
+    if valoare is None:
+        return None
+    if isinstance(valoare, bool):
+        return (pyodbc.SQL_BIT, 0, 0)
+    if isinstance(valoare, int):
+        return (pyodbc.SQL_INTEGER, 0, 0) if -2**31 <= valoare < 2**31 else (pyodbc.SQL_BIGINT, 0, 0)
+    if isinstance(valoare, float):
+        return (pyodbc.SQL_DOUBLE, 0, 0)
+    if isinstance(valoare, decimal.Decimal):
+        return (pyodbc.SQL_DECIMAL, 38, max(0, -valoare.as_tuple().exponent))
+    if isinstance(valoare, str):
+        return (pyodbc.SQL_WVARCHAR, TEXT_SIZE if len(valoare) <= TEXT_SIZE else 0, 0)
+    if isinstance(valoare, bytes):
+        return (pyodbc.SQL_VARBINARY, 0, 0)
+    if isinstance(valoare, dt.datetime):
+        return (pyodbc.SQL_TYPE_TIMESTAMP, 23, 3)
+    if isinstance(valoare, dt.date):
+        return (pyodbc.SQL_TYPE_DATE, 0, 0)
+    if isinstance(valoare, dt.time):
+        return (pyodbc.SQL_SS_TIME2, 16, 7)
+    return None
+
+
+class PreparedConnection:
+    """Conexiune din pool cu un cache de instrucțiuni pregătite.
+
+    pyodbc pregătește o instrucțiune o singură dată per cursor și o refolosește
+    cât timp cursorul execută același text SQL. Păstrăm deci câte un cursor
+    per text SQL (LRU), cu tipurile parametrilor declarate prin setinputsizes;
+    un apel repetat (ex: get_pacient_by_id) nu mai recompilează și nu mai
+    deduce tipurile.
+
+    Conexiunile nu folosesc MARS, deci doar un cursor poate avea rezultate
+    active la un moment dat: înainte de a executa pe alt cursor, rezultatele
+    rămase pe cel folosit anterior se consumă (vezi _drain). Un cursor întors
+    de execute e valabil doar până la următorul apel pe aceeași conexiune.
+    """
+
+    def __init__(self, conn, stats):
+        self.conn = conn
+        self._stats = stats
+        self._cursors = OrderedDict()
+        self._activ = None
+
+    def drain(self):
+        """Consumă rezultatele rămase pe ultimul cursor folosit"""
+        if self._activ is not None:
+            _drain(self._activ)
+            self._activ = None
+
+    def cursor(self):
+        """Cursor nou (nepregătit), după ce conexiunea a fost eliberată de rezultate"""
+        self.drain()
+        return self.conn.cursor()
+
+    def execute(self, query, params=None):
+        params = normalize_params(params)
+        tipuri = tuple(_param_type(v) for v in params) if params else ()
+        intrare = self._cursors.get(query)
+        stat = self._stats.setdefault(query, {'executari': 0, 'pregatiri': 0, 'refolosiri': 0})
+        stat['executari'] += 1
+        if intrare is not None and intrare[1] == tipuri:
+            self._cursors.move_to_end(query)
+            cursor = intrare[0]
+            stat['refolosiri'] += 1
+        else:
+            cursor = intrare[0] if intrare is not None else self.conn.cursor()
+            if tipuri:
+                cursor.setinputsizes(list(tipuri))
+            self._cursors[query] = (cursor, tipuri)
+            stat['pregatiri'] += 1
+            while len(self._cursors) > STATEMENT_CACHE_SIZE:
+                _, (vechi, _) = self._cursors.popitem(last=False)
+                if vechi is self._activ:
+                    self._activ = None
+                vechi.close()
+        if self._activ is not None and self._activ is not cursor:
+            # Același cursor își închide singur rezultatele vechi la execute
+            self.drain()
+        self._activ = cursor
+        if params:
+            cursor.execute(query, params)
+        else:
+            cursor.execute(query)
+        return cursor
+
+    def close(self):
+        self._activ = None
+        for cursor, _ in self._cursors.values():
+            try:
+                cursor.close()
+            except Exception:
+                pass
+        self._cursors.clear()
+        self.conn.close()
+
+
+def is_deadlock(eroare):
+    """Eroarea 1205 (tranzacția aleasă victimă): serverul a anulat-o deja, poate fi reluată"""
+    args = getattr(eroare, 'args', ())
+    return bool(args) and (args[0] == '40001' or '(1205)' in str(args[-1]))
+
+
+class Transaction:
+    """Unitate de lucru pe o singură conexiune din pool (vezi Database.transaction).
+
+    Toate instrucțiunile văd aceeași stare și se confirmă împreună, cu un
+    singur COMMIT; instrucțiunile pregătite ale conexiunii se refolosesc.
+    """
+
+    def __init__(self, conn):
+        self.conn = conn
+        self._savepoints = 0
+        self._la_commit = []
+
+    def execute(self, query, params=None):
+        """O instrucțiune; întoarce cursorul (fetchone / fetchall / rowcount)"""
+        return self.conn.execute(query, params)
+
+    def fetch_one(self, query, params=None):
+        cursor = self.conn.execute(query, params)
+        rand = cursor.fetchone()
+        # Restul rezultatelor ar ține conexiunea ocupată pentru următoarea instrucțiune
+        _drain(cursor)
+        return rand
+
+    def fetch_all(self, query, params=None):
+        return self.conn.execute(query, params).fetchall()
+
+    def insert(self, query, params=None):
+        """Un INSERT într-un tabel cu IDENTITY; întoarce ID-ul rândului nou.
+
+        SCOPE_IDENTITY() se citește în același lot cu INSERT-ul, deci nu
+        vede ID-uri generate de triggere sau de alte instrucțiuni.
+        """
+        cursor = self.conn.execute(
+            f"{query.strip().rstrip(';')};\nSELECT CAST(SCOPE_IDENTITY() AS INT)", params
+        )
+        # Primul „rezultat” e numărul de rânduri inserate, fără coloane
+        while cursor.description is None:
+            if not cursor.nextset():
+                raise RuntimeError("INSERT-ul nu a întors ID-ul rândului nou")
+        rand = cursor.fetchone()
+        _drain(cursor)
+        return rand[0]
+
+    def executemany(self, query, seq_params):
+        """Aceeași instrucțiune pentru multe rânduri, trimisă în loturi (fast_executemany)"""
+        seq_params = [normalize_params(params) for params in seq_params]
+        if not seq_params:
+            return 0
+        cursor = self.conn.cursor()
+        try:
+            cursor.fast_executemany = True
+            cursor.executemany(query, seq_params)
+        finally:
+            cursor.close()
+        return len(seq_params)
+
+    def execute_batch(self, instructiuni):
+        """Instrucțiuni diferite, [(query, params), ...], trimise într-un singur drum la server.
+
+        Rezultatele intermediare se consumă toate, ca o eroare din orice
+        instrucțiune să ajungă aici (altfel SQL Server o raportează abia la
+        citirea setului de rezultate respectiv).
+        """
+        texte, toti = [], []
+        for query, params in instructiuni:
+            texte.append(query.strip().rstrip(';'))
+            toti.extend(params or ())
+        if len(toti) > MAX_PARAMS:
+            raise ValueError(f"Lotul are {len(toti)} parametri (maxim {MAX_PARAMS})")
+        cursor = self.conn.execute(';\n'.join(texte), tuple(toti))
+        while cursor.nextset():
+            pass
+
+    @contextmanager
+    def savepoint(self):
+        """Anulare parțială: o excepție din bloc anulează doar instrucțiunile din bloc.
+
+            with db.transaction() as tx:
+                tx.execute(...)
+                try:
+                    with tx.savepoint():
+                        tx.execute(...)   # poate eșua fără să piardă restul
+                except pyodbc.IntegrityError:
+                    ...
+        """
+        self._savepoints += 1
+        nume = f"sp{self._savepoints}"
+        self.conn.execute(f"IF @@TRANCOUNT = 0 BEGIN TRANSACTION; SAVE TRANSACTION {nume}")
+        try:
+            yield nume
+        except Exception:
+            # După un deadlock tranzacția e deja anulată (XACT_STATE() = -1) - nu mai are savepoint
+            try:
+                self.conn.execute(f"IF XACT_STATE() = 1 ROLLBACK TRANSACTION {nume}")
+            except Exception:
+                pass
+            raise
+
+    def on_commit(self, callback):
+        """callback() după COMMIT (ex: invalidarea cache-ului); nu rulează la rollback"""
+        self._la_commit.append(callback)
+
+
+def _current_session():
+    """ID-ul sesiunii Streamlit curente (None în afara unei sesiuni, ex: fire de fundal)"""
+    try:
+        from streamlit.runtime.scriptrunner import get_script_run_ctx
+        ctx = get_script_run_ctx()
+        return ctx.session_id if ctx is not None else None
+    except Exception:
+        return None
+
+
 class Database:
     def __init__(self):
         self.server = os.getenv('DB_SERVER', 'localhost')
         self.database = os.getenv('DB_NAME', 'HospitalDB')
-    
-    def get_connection(self):
-        """Conexiune cu Windows Authentication"""
-        conn_str = (
+        self.read_server = READ_SERVER
+        self.read_database = READ_DATABASE or self.database
+        self._last_write = {}
+        self._replica_lag = 0.0
+        self._replica_ok = True
+        self._last_lag_check = 0.0
+        self._lag_lock = threading.Lock()
+        self._pools = {PRIMARY: queue.LifoQueue(), REPLICA: queue.LifoQueue()}
+        self._stats = {}
+
+    def connection_string(self, endpoint=PRIMARY):
+        """Șirul de conectare ODBC pentru primar / replică"""
+        server, database = self.server, self.database
+        if endpoint == REPLICA and self.read_server:
+            server, database = self.read_server, self.read_database
+        return (
             f'DRIVER={{ODBC Driver 17 for SQL Server}};'
-            f'SERVER={self.server};'
-            f'DATABASE={self.database};'
+            f'SERVER={server};'
+            f'DATABASE={database};'
             f'Trusted_Connection=yes;'  # Pentru Windows Authentication
         )
-        return pyodbc.connect(conn_str)
-    
+
+    def get_connection(self, endpoint=PRIMARY):
+        """Conexiune cu Windows Authentication"""
+        # Driverul ODBC se încarcă abia la prima interogare, nu la pornirea paginii
+        import pyodbc
+        return pyodbc.connect(self.connection_string(endpoint), timeout=CONNECT_TIMEOUT)
+
+    # ===== RUTARE CITIRI / SCRIERI =====
+
+    def mark_write(self):
+        """Marchează o scriere în sesiunea curentă (citirile ei merg pe primar o vreme)"""
+        acum = time.monotonic()
+        if len(self._last_write) > 1000:
+            # Curățăm sesiunile care nu mai sunt „lipite” de primar
+            self._last_write = {
+                s: t for s, t in self._last_write.items() if acum - t < STICKY_SECONDS
+            }
+        self._last_write[_current_session()] = acum
+
+    def _is_sticky(self):
+        ultima = self._last_write.get(_current_session())
+        return ultima is not None and time.monotonic() - ultima < STICKY_SECONDS
+
+    def _last_change(self, endpoint):
+        conn = self.get_connection(endpoint)
+        try:
+            cursor = conn.cursor()
+            cursor.execute("SELECT MAX(data_modificare) FROM ChangeLog")
+            return cursor.fetchone()[0]
+        finally:
+            conn.close()
+
+    def _check_replica(self):
+        """Măsoară decalajul replicii comparând ultima modificare din ChangeLog"""
+        try:
+            replica = self._last_change(REPLICA)
+        except Exception:
+            self._replica_ok = False
+            return
+        try:
+            primar = self._last_change(PRIMARY)
+        except Exception:
+            primar = None
+        self._replica_ok = True
+        if primar is not None and replica is not None:
+            self._replica_lag = max(0.0, (primar - replica).total_seconds())
+        elif primar is not None:
+            self._replica_lag = float('inf')
+        else:
+            self._replica_lag = 0.0
+
+    def read_endpoint(self, replica=False):
+        """Alege unde merge o citire.
+
+        replica=False: citirea cere primarul (ex: verificări înainte de scriere).
+        replica=True: citirea poate merge pe replică, dacă aceasta există, e la zi
+        și sesiunea curentă nu a scris recent.
+        """
+        if not replica or not self.read_server or self._is_sticky():
+            return PRIMARY
+        if time.monotonic() - self._last_lag_check > LAG_CHECK_SECONDS:
+            # O singură verificare la un moment dat; ceilalți folosesc ultima valoare
+            if self._lag_lock.acquire(blocking=False):
+                try:
+                    self._check_replica()
+                    self._last_lag_check = time.monotonic()
+                finally:
+                    self._lag_lock.release()
+        if not self._replica_ok or self._replica_lag > MAX_REPLICA_LAG:
+            return PRIMARY
+        return REPLICA
+
+    # ===== POOL DE CONEXIUNI PREGĂTITE =====
+
+    def _acquire(self, endpoint):
+        """(conexiune, din_pool) - o conexiune liberă sau una nouă"""
+        try:
+            return self._pools[endpoint].get_nowait(), True
+        except queue.Empty:
+            return PreparedConnection(self.get_connection(endpoint), self._stats), False
+
+    def _release(self, endpoint, conn):
+        try:
+            # Rezultatele necitite ar bloca următorul utilizator al conexiunii
+            conn.drain()
+            # Închide tranzacția implicită a citirilor; instrucțiunile rămân pregătite
+            conn.conn.rollback()
+        except Exception:
+            self._discard(conn)
+            return
+        if self._pools[endpoint].qsize() < POOL_SIZE:
+            self._pools[endpoint].put_nowait(conn)
+        else:
+            self._discard(conn)
+
+    def _discard(self, conn):
+        try:
+            conn.close()
+        except Exception:
+            pass
+
+    def _run(self, endpoint, functie, reincearca=True):
+        """Rulează functie(conn) pe o conexiune din pool.
+
+        O conexiune din pool poate fi căzută între timp (ex: server
+        repornit): la eroare o aruncăm și, dacă reincearca, mai încercăm o
+        dată pe o conexiune nouă.
+        """
+        conn, din_pool = self._acquire(endpoint)
+        try:
+            rezultat = functie(conn)
+        except Exception:
+            self._discard(conn)
+            if din_pool and reincearca:
+                return self._run(endpoint, functie, reincearca=False)
+            raise
+        self._release(endpoint, conn)
+        return rezultat
+
+    def statement_stats(self):
+        """Statistici de refolosire a instrucțiunilor pregătite, per text SQL"""
+        return [
+            {'query': ' '.join(query.split())[:200], **stat,
+             'rata_refolosire': stat['refolosiri'] / stat['executari'] if stat['executari'] else 0.0}
+            for query, stat in sorted(self._stats.items(), key=lambda x: -x[1]['executari'])
+        ]
+
+    def plan_cache_stats(self, top=20):
+        """Planurile din cache-ul serverului cu numărul de refolosiri (cere VIEW SERVER STATE)"""
+        query = """
+            SELECT TOP (?)
+                cp.usecounts as refolosiri,
+                cp.objtype as tip,
+                LEFT(st.text, 200) as query
+            FROM sys.dm_exec_cached_plans cp
+            CROSS APPLY sys.dm_exec_sql_text(cp.plan_handle) st
+            WHERE cp.objtype IN ('Prepared', 'Adhoc')
+              AND st.dbid = DB_ID()
+            ORDER BY cp.usecounts DESC
+        """
+        return self.fetch_data(query, (int(top),))
+
+    # ===== TRANZACȚII =====
+
+    @contextmanager
+    def transaction(self):
+        """Unitate de lucru pe primar: o conexiune din pool, un singur COMMIT.
+
+            with db.transaction() as tx:
+                tx.execute("UPDATE Pacient SET id_sectie=? WHERE id_pacient=?", (...))
+                tx.execute("INSERT INTO ...", (...))
+
+        La ieșirea normală din bloc se face COMMIT, la o excepție ROLLBACK.
+        Blocul nu se poate relua automat - pentru reluare la deadlock
+        folosiți run_in_transaction.
+        """
+        conn, _ = self._acquire(PRIMARY)
+        tx = Transaction(conn)
+        try:
+            yield tx
+            conn.drain()
+            conn.conn.commit()
+        except BaseException:
+            try:
+                conn.conn.rollback()
+            except Exception:
+                # Conexiune căzută: nu se mai întoarce în pool
+                self._discard(conn)
+                raise
+            self._release(PRIMARY, conn)
+            raise
+        self._release(PRIMARY, conn)
+        self.mark_write()
+        for callback in tx._la_commit:
+            try:
+                callback()
+            except Exception as e:
+                print(f"Eroare după commit: {e}", file=sys.stderr)
+
+    def run_in_transaction(self, functie, reincercari=None):
+        """functie(tx) într-o tranzacție, reluată de la capăt dacă e victimă într-un deadlock.
+
+        functie poate rula de mai multe ori, deci nu trebuie să aibă efecte
+        în afara bazei de date (pentru ele: tx.on_commit). Returnează
+        rezultatul ei din încercarea confirmată.
+        """
+        reincercari = DEADLOCK_RETRIES if reincercari is None else reincercari
+        incercare = 0
+        while True:
+            try:
+                with self.transaction() as tx:
+                    return functie(tx)
+            except Exception as e:
+                if incercare >= reincercari or not is_deadlock(e):
+                    raise
+                incercare += 1
+                # Pauză aleatoare, ca tranzacțiile în conflict să nu se ciocnească din nou
+                time.sleep(DEADLOCK_BACKOFF * 2 ** (incercare - 1) * random.uniform(0.5, 1.5))
+
+    # ===== INTEROGĂRI =====
+
     def execute_query(self, query, params=None):
         """Pentru INSERT, UPDATE, DELETE"""
-        conn = self.get_connection()
-        cursor = conn.cursor()
-        if params:
-            cursor.execute(query, params)
-        else:
-            cursor.execute(query)
-        conn.commit()
-        conn.close()
-        
-    def fetch_data(self, query, params=None):
+        def _execute(conn):
+            conn.execute(query, params)
+            conn.drain()
+            conn.conn.commit()
+        # Fără reîncercare: o scriere nu se repetă automat
+        self._run(PRIMARY, _execute, reincearca=False)
+        self.mark_write()
+
+    def fetch_data(self, query, params=None, replica=False, endpoint=None):
         """Pentru SELECT - returnează coloane și date"""
-        conn = self.get_connection()
-        cursor = conn.cursor()
-        if params:
-            cursor.execute(query, params)
-        else:
-            cursor.execute(query)
-        columns = [desc[0] for desc in cursor.description]
-        data = cursor.fetchall()
-        conn.close()
-        return columns, data
-    
-    def fetch_dataframe(self, query, params=None):
-        """Pentru SELECT - returnează pandas DataFrame (mai ușor de folosit!)"""
-        conn = self.get_connection()
-        df = pd.read_sql(query, conn, params=params if params else None)
-        conn.close()
-        return df
+        def _fetch(conn):
+            cursor = conn.execute(query, params)
+            columns = [desc[0] for desc in cursor.description]
+            return columns, cursor.fetchall()
+        return self._run(endpoint or self.read_endpoint(replica), _fetch)
+
+    def stream(self, query, params=None, batch_size=None, as_frame=False, replica=False, endpoint=None):
+        """Pentru SELECT-uri mari - generator de loturi, în memorie constantă.
+
+        Produce liste de cel mult batch_size rânduri (sau DataFrame-uri, cu
+        as_frame=True). Cursorul implicit al SQL Server (forward-only,
+        read-only) trimite rândurile pe măsură ce sunt cerute, deci
+        rezultatul nu e niciodată ținut complet pe client. Conexiunea rămâne
+        scoasă din pool cât trăiește generatorul: la epuizare se întoarce în
+        pool, iar la ieșire timpurie (break, excepție, close()) interogarea
+        se anulează și conexiunea se închide, fiindcă are rezultate necitite.
+
+            for lot in db.stream("SELECT ...", batch_size=5000, as_frame=True):
+                proceseaza(lot)
+        """
+        from database import columnar
+        batch_size = batch_size or columnar.BATCH_SIZE
+        endpoint = endpoint or self.read_endpoint(replica)
+        conn, din_pool = self._acquire(endpoint)
+        cursor = None
+        complet = False
+        try:
+            try:
+                cursor = conn.execute(query, params)
+            except Exception:
+                if not din_pool:
+                    raise
+                # Conexiune căzută în pool: mai încercăm o dată pe una nouă
+                self._discard(conn)
+                conn = PreparedConnection(self.get_connection(endpoint), self._stats)
+                cursor = conn.execute(query, params)
+            descriere = cursor.description
+            while True:
+                randuri = cursor.fetchmany(batch_size)
+                if not randuri:
+                    break
+                yield columnar.frame_from_rows(randuri, descriere) if as_frame else randuri
+            complet = True
+        finally:
+            if complet:
+                self._release(endpoint, conn)
+            else:
+                if cursor is not None:
+                    try:
+                        cursor.cancel()
+                    except Exception:
+                        pass
+                self._discard(conn)
+
+    def fetch_dataframe(self, query, params=None, replica=False, endpoint=None):
+        """Pentru SELECT - returnează pandas DataFrame (mai ușor de folosit!)
+
+        replica=True marchează citirea ca sigură pentru replică; endpoint
+        fixează explicit PRIMARY / REPLICA (pentru citiri care trebuie să
+        vină toate din aceeași sursă).
+
+        Rezultatul se citește pe coloane (database.columnar): cu arrow-odbc
+        instalat driverul scrie direct în buffere Arrow, altfel loturile din
+        fetchmany devin array-uri NumPy tipizate - fără lista completă de
+        rânduri pyodbc și fără inferența de tip din pd.read_sql.
+        """
+        from database import columnar
+        endpoint = endpoint or self.read_endpoint(replica)
+        params = normalize_params(params)
+        if columnar.arrow_available(params):
+            return columnar.frame_from_arrow(query, self.connection_string(endpoint), params)
+        return self._run(endpoint, lambda conn: columnar.frame_from_cursor(conn.execute(query, params)))
 
 # Creăm o instanță globală
-db = Database()
\ No newline at end of file
+db = Database()
@@ -0,0 +1,336 @@
+import os
+import threading
+import time
+import numpy as np
+import pandas as pd
+from database.connection import db
+from database import changes, hot_snapshot
+from database.archive import diagnostic_date_sql, source
+
+# Cât de des (secunde) verifică cubul dacă există date noi în baza de date
+SYNC_SECONDS = int(os.getenv('CUBE_SYNC_SECONDS', '30'))
+
+PROGRAMARI_FACT_QUERY = """
+    SELECT
+        pr.id_programare as id,
+        CAST(pr.data_programare AS DATE) as data,
+        DATEPART(HOUR, pr.ora_programare) as ora,
+        d.nume + ' ' + d.prenume as doctor,
+        d.specializare as specializare,
+        ISNULL(s.nume_sectie, 'Fără secție') as sectie,
+        pr.tip_programare as tip
+    FROM {tabela} pr
+    JOIN Doctor d ON pr.id_doctor = d.id_doctor
+    LEFT JOIN Sectie s ON s.id_sectie = ISNULL(pr.id_sectie, d.id_sectie)
+    {filtru}
+"""
+
+DIAGNOSTIC_FACT_QUERY = """
+    SELECT
+        dg.id_diagnostic as id,
+        {data} as data,
+        d.nume + ' ' + d.prenume as doctor,
+        d.specializare as specializare,
+        ISNULL(s.nume_sectie, 'Fără secție') as sectie,
+        dg.boala as boala,
+        dg.severitate as severitate
+    FROM {tabela} dg
+    JOIN Doctor d ON dg.id_doctor = d.id_doctor
+    LEFT JOIN Sectie s ON d.id_sectie = s.id_sectie
+    {filtru}
+"""
+
+# Dimensiuni derivate din coloana 'data' (zile de la 1970-01-01)
+DIMENSIUNI_TIMP = ('data', 'luna', 'zi_saptamana')
+# 'data' pentru faptele fără dată (diagnostice, dacă schema nu are coloana de
+# dată): intră doar în rapoartele pe tot istoricul, fără dimensiuni de timp
+FARA_DATA = np.iinfo(np.int32).min
+
+
+class Dimension:
+    """Dicționar valoare -> cod întreg pentru o dimensiune categorică"""
+
+    def __init__(self):
+        self.values = []
+        self._codes = {}
+
+    def code(self, value):
+        return self._codes.get(value)
+
+    def encode(self, series):
+        """Codifică o coloană; bucla rulează doar peste valorile distincte"""
+        unice, inv = np.unique(series.fillna('—').astype(str).to_numpy(), return_inverse=True)
+        coduri = np.empty(len(unice), dtype=np.int32)
+        for i, value in enumerate(unice):
+            cod = self._codes.get(value)
+            if cod is None:
+                cod = len(self.values)
+                self._codes[value] = cod
+                self.values.append(value)
+            coduri[i] = cod
+        return coduri[inv]
+
+    def decode(self, coduri):
+        return np.asarray(self.values, dtype=object)[coduri]
+
+
+class FactTable:
+    """Tabel de fapte coloanar: un array NumPy per coloană, aliniate pe 'id'.
+
+    Array-urile nu se modifică pe loc - append/remove construiesc un dict
+    nou, astfel încât cititorii concurenți văd mereu o stare consistentă.
+    """
+
+    def __init__(self, dimensiuni, numerice=()):
+        self.dimensiuni = dimensiuni
+        self.numerice = numerice
+        self.columns = self._empty()
+
+    def _empty(self):
+        columns = {'id': np.empty(0, np.int64), 'data': np.empty(0, np.int32)}
+        for nume in self.numerice:
+            columns[nume] = np.empty(0, np.int16)
+        for nume in self.dimensiuni:
+            columns[nume] = np.empty(0, np.int32)
+        return columns
+
+    def __len__(self):
+        return len(self.columns['id'])
+
+    def reset(self):
+        self.columns = self._empty()
+
+    def _encode(self, df, dims):
+        zile = pd.to_datetime(df['data']).to_numpy(dtype='datetime64[D]')
+        noi = {
+            'id': df['id'].to_numpy(dtype=np.int64),
+            'data': np.where(np.isnat(zile), FARA_DATA, zile.astype(np.int64)).astype(np.int32),
+        }
+        for nume in self.numerice:
+            noi[nume] = df[nume].fillna(-1).to_numpy(dtype=np.int16)
+        for nume in self.dimensiuni:
+            noi[nume] = dims[nume].encode(df[nume])
+        return noi
+
+    def append(self, df, dims):
+        self.extend([df], dims)
+
+    def extend(self, loturi, dims):
+        """Adaugă mai multe loturi (ex: din db.stream), concatenate o singură dată.
+
+        Din fiecare lot se păstrează doar coloanele codificate (int-uri), deci
+        o reconstruire completă nu ține niciodată tot rezultatul SQL în memorie.
+        """
+        parti = [self._encode(df, dims) for df in loturi if not df.empty]
+        if not parti:
+            return
+        self.columns = {
+            nume: np.concatenate([self.columns[nume]] + [p[nume] for p in parti])
+            for nume in self.columns
+        }
+
+    def remove(self, ids):
+        pastreaza = ~np.isin(self.columns['id'], np.fromiter(ids, dtype=np.int64))
+        self.columns = {nume: arr[pastreaza] for nume, arr in self.columns.items()}
+
+
+class ReportCube:
+    """Cub analitic în memorie peste Programare și Diagnostic.
+
+    Rapoartele pe orice interval de date și orice combinație de dimensiuni
+    (doctor, specializare, secție, tip, boală, severitate, zi, lună, oră)
+    se calculează din array-uri NumPy, fără interogări suplimentare.
+    Programările și diagnosticele se actualizează incremental din ChangeLog;
+    diagnosticele noi se citesc și după cel mai mare id_diagnostic deja
+    încărcat (pentru bazele fără triggerul ChangeLog pe Diagnostic).
+    """
+
+    def __init__(self):
+        self.dims = {nume: Dimension() for nume in
+                     ('doctor', 'specializare', 'sectie', 'tip', 'boala', 'severitate')}
+        self.programari = FactTable(('doctor', 'specializare', 'sectie', 'tip'), numerice=('ora',))
+        self.diagnostice = FactTable(('doctor', 'specializare', 'sectie', 'boala', 'severitate'))
+        self._versiune = None
+        self._max_diagnostic = 0
+        self._ultima_sincronizare = 0
+        self._endpoint = None
+        self._din_copie = False
+        self._lock = threading.Lock()
+
+    # ----- încărcare și actualizare incrementală -----
+
+    def _load_programari(self, filtru="", params=None):
+        # Cubul acoperă tot istoricul, deci citește și din arhivă (dacă există)
+        query = PROGRAMARI_FACT_QUERY.format(tabela=source('Programare'), filtru=filtru)
+        self.programari.extend(db.stream(query, params, as_frame=True, endpoint=self._endpoint),
+                               self.dims)
+
+    def _load_diagnostice(self, filtru=None, params=None):
+        if filtru is None:
+            filtru, params = "WHERE dg.id_diagnostic > ?", (int(self._max_diagnostic),)
+        query = DIAGNOSTIC_FACT_QUERY.format(tabela=source('Diagnostic'),
+                                             data=diagnostic_date_sql('dg'), filtru=filtru)
+        self.diagnostice.extend(db.stream(query, params, as_frame=True, endpoint=self._endpoint),
+                                self.dims)
+        if len(self.diagnostice):
+            self._max_diagnostic = max(self._max_diagnostic, int(self.diagnostice.columns['id'].max()))
+
+    def _reload_ids(self, tabel, ids, incarca, cheie):
+        """Înlocuiește faptele cu aceste ID-uri (cele șterse doar dispar)"""
+        tabel.remove(ids)
+        ids = sorted(ids)
+        for i in range(0, len(ids), changes.IN_CHUNK):
+            chunk = ids[i:i + changes.IN_CHUNK]
+            incarca(f"WHERE {cheie} IN ({', '.join('?' * len(chunk))})", tuple(chunk))
+
+    def _rebuild(self):
+        self.programari.reset()
+        self.diagnostice.reset()
+        self._max_diagnostic = 0
+        self._load_programari()
+        self._load_diagnostice()
+
+    def sync(self, force=False):
+        """Aduce cubul la zi (cel mult o dată la SYNC_SECONDS, dacă nu e forțat)"""
+        with self._lock:
+            if not force and time.monotonic() - self._ultima_sincronizare < SYNC_SECONDS:
+                return
+            # Toată sincronizarea citește din aceeași sursă (replică sau primar)
+            self._endpoint = db.read_endpoint(replica=True)
+            versiune = changes.get_current_version(self._endpoint) if changes.ensure_changelog() else None
+            if self._versiune is None and versiune is not None and not self._din_copie:
+                # Pornire: coloanele vin din copia de pe disc, apoi doar delta din ChangeLog
+                self._din_copie = True
+                hot_snapshot.load_cube(self)
+            if self._versiune is None or versiune is None:
+                self._rebuild()
+            elif versiune != self._versiune:
+                modificari = changes.get_changes_since(
+                    self._versiune, {'Programare', 'Diagnostic', 'Doctor', 'Sectie'}, self._endpoint
+                )
+                ids = modificari.get('Programare', set())
+                ids_diagnostic = modificari.get('Diagnostic', set())
+                if 'Doctor' in modificari or 'Sectie' in modificari \
+                        or len(ids) + len(ids_diagnostic) > changes.MAX_IDS_INCREMENTAL:
+                    self._rebuild()
+                else:
+                    if ids:
+                        self._reload_ids(self.programari, ids, self._load_programari, 'pr.id_programare')
+                    # Întâi cele noi după id, apoi cele din ChangeLog: un rând prins de
+                    # ambele e scos și recitit, deci nu apare de două ori
+                    self._load_diagnostice()
+                    if ids_diagnostic:
+                        self._reload_ids(self.diagnostice, ids_diagnostic, self._load_diagnostice,
+                                         'dg.id_diagnostic')
+            elif not changes.diagnostics_tracked():
+                # Fără trigger, diagnosticele noi nu schimbă versiunea ChangeLog
+                self._load_diagnostice()
+            self._versiune = versiune
+            self._ultima_sincronizare = time.monotonic()
+
+    # ----- interogări -----
+
+    def _time_key(self, nume, zile):
+        if nume == 'data':
+            return zile
+        if nume == 'luna':
+            return zile.astype('datetime64[D]').astype('datetime64[M]').astype(np.int32)
+        # 1970-01-01 a fost joi: (zile + 3) % 7 dă luni = 0
+        return (zile + 3) % 7
+
+    def _decode(self, nume, coduri):
+        if nume == 'data':
+            return pd.to_datetime(coduri.astype('datetime64[D]'))
+        if nume == 'luna':
+            return pd.to_datetime(coduri.astype('datetime64[M]')).strftime('%Y-%m')
+        if nume in ('zi_saptamana', 'ora'):
+            return coduri
+        return self.dims[nume].decode(coduri)
+
+    def aggregate(self, fapt, by, start=None, end=None, filtre=None, severe=False):
+        """Numără faptele grupate după dimensiunile din `by`.
+
+        fapt: 'programari' sau 'diagnostice'
+        by: listă de dimensiuni (ex: ['sectie', 'doctor', 'luna'])
+        start / end: interval de date inclusiv (opțional)
+        filtre: {dimensiune: valoare sau listă de valori}
+        severe: pentru diagnostice, adaugă coloana 'Severe'
+
+        Returnează un DataFrame cu coloanele din `by` plus 'Numar'.
+        """
+        self.sync()
+        tabel = self.programari if fapt == 'programari' else self.diagnostice
+        columns = tabel.columns
+        zile = columns['data']
+
+        mask = np.ones(len(zile), dtype=bool)
+        if start is not None or end is not None or any(nume in DIMENSIUNI_TIMP for nume in by):
+            mask &= zile != FARA_DATA
+        if start is not None:
+            mask &= zile >= np.datetime64(pd.Timestamp(start).date(), 'D').astype(np.int32)
+        if end is not None:
+            mask &= zile <= np.datetime64(pd.Timestamp(end).date(), 'D').astype(np.int32)
+        for nume, valori in (filtre or {}).items():
+            if not isinstance(valori, (list, tuple, set)):
+                valori = [valori]
+            coduri = [c for c in (self.dims[nume].code(str(v)) for v in valori) if c is not None]
+            mask &= np.isin(columns[nume], coduri)
+
+        chei = []
+        for nume in by:
+            if nume in DIMENSIUNI_TIMP:
+                chei.append(self._time_key(nume, zile[mask]).astype(np.int64))
+            else:
+                chei.append(columns[nume][mask].astype(np.int64))
+
+        coloane_rezultat = list(by) + ['Numar'] + (['Severe'] if severe else [])
+        if not mask.any():
+            return pd.DataFrame(columns=coloane_rezultat)
+
+        # Cheie compusă în bază mixtă -> o singură grupare np.unique
+        compus = np.zeros(int(mask.sum()), dtype=np.int64)
+        minime, baze = [], []
+        for cheie in chei:
+            minim = cheie.min()
+            baza = int(cheie.max() - minim) + 1
+            compus = compus * baza + (cheie - minim)
+            minime.append(minim)
+            baze.append(baza)
+        grupuri, inv, numar = np.unique(compus, return_inverse=True, return_counts=True)
+
+        rezultat = {}
+        rest = grupuri
+        for nume, minim, baza in reversed(list(zip(by, minime, baze))):
+            rezultat[nume] = self._decode(nume, rest % baza + minim)
+            rest = rest // baza
+        df = pd.DataFrame({nume: rezultat[nume] for nume in by})
+        df['Numar'] = numar
+        if severe:
+            cod_severa = self.dims['severitate'].code('severa')
+            este_severa = columns['severitate'][mask] == (cod_severa if cod_severa is not None else -1)
+            df['Severe'] = np.bincount(inv, weights=este_severa, minlength=len(grupuri)).astype(np.int64)
+        return df
+
+    def date_bounds(self):
+        """Prima și ultima dată cu programări din cub"""
+        self.sync()
+        zile = self.programari.columns['data']
+        zile = zile[zile != FARA_DATA]
+        if len(zile) == 0:
+            return None, None
+        return (pd.Timestamp(zile.min().astype('datetime64[D]')).date(),
+                pd.Timestamp(zile.max().astype('datetime64[D]')).date())
+
+
+_cube = None
+_cube_lock = threading.Lock()
+
+
+def get_cube():
+    """Instanța unică (per proces) a cubului de rapoarte"""
+    global _cube
+    with _cube_lock:
+        if _cube is None:
+            _cube = ReportCube()
+    hot_snapshot.start_writer()
+    return _cube
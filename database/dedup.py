@@ -0,0 +1,281 @@
+import os
+import re
+import sys
+import threading
+import unicodedata
+from functools import lru_cache
+import numpy as np
+import pandas as pd
+from database.changes import tracked_frame
+
+# Scorul minim pentru a raporta o pereche ca posibil duplicat
+PRAG = float(os.getenv('DEDUP_THRESHOLD', '0.7'))
+# Blocurile mai mari sunt ignorate (cheie prea puțin selectivă)
+MAX_BLOC = int(os.getenv('DEDUP_MAX_BLOCK', '500'))
+
+# Ponderile scorului final
+PONDERI = {'nume': 0.45, 'cnp': 0.35, 'data': 0.15, 'telefon': 0.05}
+
+PACIENTI_DEDUP_QUERY = """
+    SELECT
+        p.id_pacient,
+        p.nume,
+        p.prenume,
+        p.CNP,
+        p.data_nasterii,
+        p.telefon
+    FROM Pacient p
+    {filtru}
+"""
+
+# Substituții aplicate înainte de cheia fonetică (grafii care sună la fel)
+_FONETIC = [
+    ('ph', 'f'), ('ch', 'c'), ('gh', 'g'), ('ck', 'c'), ('tz', 't'),
+    ('w', 'v'), ('y', 'i'), ('k', 'c'), ('q', 'c'), ('x', 'cs'),
+]
+
+
+@lru_cache(maxsize=100000)
+def normalize_text(text):
+    """Litere mici, fără diacritice și fără alte caractere decât litere și spații"""
+    if not isinstance(text, str):
+        return ''
+    text = unicodedata.normalize('NFKD', text.lower())
+    text = ''.join(c for c in text if not unicodedata.combining(c))
+    return re.sub(r'[^a-z ]+', ' ', text).strip()
+
+
+@lru_cache(maxsize=100000)
+def cheie_fonetica(text):
+    """Cheie fonetică simplă: prima literă + consoanele (fără dubluri), max 5 caractere"""
+    text = normalize_text(text).replace(' ', '')
+    if not text:
+        return ''
+    for vechi, nou in _FONETIC:
+        text = text.replace(vechi, nou)
+    cheie = text[0]
+    for c in text[1:]:
+        if c not in 'aeiou' and c != cheie[-1]:
+            cheie += c
+    return cheie[:5]
+
+
+@lru_cache(maxsize=100000)
+def _masca_bigrame(text):
+    # Bigramele numelui, fiecare pe un bit dintr-un întreg de 64 de biți
+    text = f" {normalize_text(text)} "
+    masca = 0
+    for a, b in zip(text, text[1:]):
+        masca |= 1 << ((ord(a) * 31 + ord(b)) % 64)
+    return masca
+
+
+def _masti(serie):
+    return np.fromiter((_masca_bigrame(v) for v in serie), dtype=np.uint64, count=len(serie))
+
+
+def _similaritate(a, b):
+    """Jaccard aproximativ pe bigrame, vectorizat peste perechi"""
+    inter = np.bitwise_count(a & b).astype(np.float64)
+    reuniune = np.bitwise_count(a | b).astype(np.float64)
+    return np.divide(inter, reuniune, out=np.zeros_like(inter), where=reuniune > 0)
+
+
+def _cifre_cnp(serie):
+    """Matrice (n, 13) cu cifrele CNP-ului; -1 pentru CNP lipsă sau invalid"""
+    cnp = serie.fillna('').astype(str).str.strip()
+    valid = cnp.str.fullmatch(r'\d{13}').to_numpy()
+    cifre = np.full((len(cnp), 13), -1, dtype=np.int8)
+    if valid.any():
+        bytes_ = np.frombuffer(''.join(cnp[valid]).encode('ascii'), dtype=np.uint8)
+        cifre[valid] = (bytes_.reshape(-1, 13) - ord('0')).astype(np.int8)
+    return cifre
+
+
+def _telefon(serie):
+    # Ultimele 9 cifre, ca 07xx și +407xx să fie egale
+    return serie.fillna('').astype(str).str.replace(r'\D', '', regex=True).str[-9:].to_numpy()
+
+
+class PatientFeatures:
+    """Câmpurile pacienților pregătite pentru comparații vectorizate"""
+
+    def __init__(self, df):
+        self.ids = df['id_pacient'].to_numpy(dtype=np.int64) if 'id_pacient' in df else \
+            np.zeros(len(df), dtype=np.int64)
+        self.nume = _masti(df['nume'])
+        self.prenume = _masti(df['prenume'])
+        self.cnp = _cifre_cnp(df['CNP'])
+        date = pd.to_datetime(df['data_nasterii'], errors='coerce')
+        self.data = date.to_numpy(dtype='datetime64[D]')
+        self.telefon = _telefon(df['telefon'])
+        self.chei = self._chei(df, date)
+
+    def _chei(self, df, date):
+        """Cheile de blocare ale fiecărui rând: (cheie, rând)"""
+        randuri = np.arange(len(df))
+        cnp = df['CNP'].fillna('').astype(str).str.strip()
+        fonetic_nume = df['nume'].map(cheie_fonetica)
+        fonetic = fonetic_nume + '|' + df['prenume'].map(lambda v: cheie_fonetica(v)[:1])
+        bucati = [
+            pd.DataFrame({'cheie': 'data:' + date.dt.strftime('%Y-%m-%d'), 'rand': randuri})[date.notna().to_numpy()],
+            # Sex + data nașterii din CNP (primele 7 cifre)
+            pd.DataFrame({'cheie': 'cnp:' + cnp.str[:7], 'rand': randuri})[(cnp.str.len() >= 7).to_numpy()],
+            pd.DataFrame({'cheie': 'nume:' + fonetic, 'rand': randuri})[(fonetic_nume != '').to_numpy()],
+        ]
+        return pd.concat(bucati, ignore_index=True)
+
+    def score(self, i, other, j):
+        """Scorurile perechilor (self[i], other[j]) - i și j sunt array-uri de rânduri"""
+        directe = (_similaritate(self.nume[i], other.nume[j])
+                   + _similaritate(self.prenume[i], other.prenume[j])) / 2
+        # Nume și prenume inversate la introducere
+        inversate = (_similaritate(self.nume[i], other.prenume[j])
+                     + _similaritate(self.prenume[i], other.nume[j])) / 2
+        nume = np.maximum(directe, inversate)
+
+        a, b = self.cnp[i], other.cnp[j]
+        cnp = ((a == b) & (a >= 0)).sum(axis=1) / 13
+
+        da, db = self.data[i], other.data[j]
+        data = (da == db) & ~np.isnat(da)
+
+        ta, tb = self.telefon[i], other.telefon[j]
+        telefon = (ta == tb) & (ta != '')
+
+        scor = (PONDERI['nume'] * nume + PONDERI['cnp'] * cnp
+                + PONDERI['data'] * data + PONDERI['telefon'] * telefon)
+        return pd.DataFrame({
+            'Scor': scor.round(3),
+            'Nume': nume.round(3),
+            'CNP': cnp.round(3),
+            'Data Nașterii': data,
+            'Telefon': telefon,
+        })
+
+
+class DedupIndex:
+    """Index pe blocuri peste toți pacienții.
+
+    Comparațiile se fac doar între pacienții care au cel puțin o cheie de
+    blocare comună (data nașterii, prefixul CNP, cheia fonetică a numelui),
+    deci costul e proporțional cu suma pătratelor mărimilor blocurilor, nu n².
+    """
+
+    def __init__(self, df):
+        self.df = df.reset_index(drop=True)
+        self.features = PatientFeatures(self.df)
+        chei = self.features.chei
+        randuri = chei['rand'].to_numpy()
+        self.blocuri = {
+            cheie: randuri[pozitii] for cheie, pozitii in chei.groupby('cheie').indices.items()
+            if len(pozitii) <= MAX_BLOC
+        }
+
+    def _perechi(self):
+        """Toate perechile (i < j) din blocuri, fără repetiții"""
+        n = len(self.df)
+        coduri = []
+        for randuri in self.blocuri.values():
+            if len(randuri) < 2:
+                continue
+            iu, ju = np.triu_indices(len(randuri), 1)
+            a, b = randuri[iu], randuri[ju]
+            coduri.append(np.minimum(a, b).astype(np.int64) * n + np.maximum(a, b))
+        if not coduri:
+            return np.empty(0, np.int64), np.empty(0, np.int64)
+        coduri = np.unique(np.concatenate(coduri))
+        return coduri // n, coduri % n
+
+    def _rezultat(self, scoruri, i, j, df_stanga):
+        rezultat = pd.DataFrame({
+            'ID 1': df_stanga['id_pacient'].to_numpy()[i] if 'id_pacient' in df_stanga else None,
+            'Pacient 1': (df_stanga['nume'] + ' ' + df_stanga['prenume']).to_numpy()[i],
+            'CNP 1': df_stanga['CNP'].to_numpy()[i],
+            'ID 2': self.df['id_pacient'].to_numpy()[j],
+            'Pacient 2': (self.df['nume'] + ' ' + self.df['prenume']).to_numpy()[j],
+            'CNP 2': self.df['CNP'].to_numpy()[j],
+        })
+        rezultat = pd.concat([rezultat, scoruri], axis=1)
+        return rezultat.sort_values('Scor', ascending=False, kind='stable').reset_index(drop=True)
+
+    def find_duplicates(self, prag=PRAG):
+        """Toate perechile de posibile duplicate cu scor >= prag"""
+        i, j = self._perechi()
+        scoruri = self.features.score(i, self.features, j)
+        pastreaza = (scoruri['Scor'] >= prag).to_numpy()
+        return self._rezultat(scoruri[pastreaza].reset_index(drop=True), i[pastreaza], j[pastreaza], self.df)
+
+    def check(self, pacient, prag=PRAG):
+        """Pacienții existenți care seamănă cu `pacient` (dict cu câmpurile din formular)"""
+        nou = pd.DataFrame([{
+            'nume': pacient.get('nume'),
+            'prenume': pacient.get('prenume'),
+            'CNP': pacient.get('CNP'),
+            'data_nasterii': pacient.get('data_nasterii'),
+            'telefon': pacient.get('telefon'),
+        }])
+        features = PatientFeatures(nou)
+        blocuri = [self.blocuri[c] for c in features.chei['cheie'] if c in self.blocuri]
+        if not blocuri:
+            return self._rezultat(features.score(np.empty(0, int), self.features, np.empty(0, int)),
+                                  np.empty(0, int), np.empty(0, int), nou)
+        j = np.unique(np.concatenate(blocuri))
+        i = np.zeros(len(j), dtype=np.int64)
+        scoruri = features.score(i, self.features, j)
+        pastreaza = (scoruri['Scor'] >= prag).to_numpy()
+        rezultat = self._rezultat(scoruri[pastreaza].reset_index(drop=True), i[pastreaza], j[pastreaza], nou)
+        return rezultat.drop(columns=['ID 1', 'Pacient 1', 'CNP 1'])
+
+
+def _pacienti_frame():
+    return tracked_frame(
+        "pacienti_dedup",
+        PACIENTI_DEDUP_QUERY,
+        {'Pacient': ('id_pacient', 'p.id_pacient')},
+        replica=True
+    )
+
+
+_index = None
+_index_versiune = None
+_index_lock = threading.Lock()
+
+
+def get_dedup_index():
+    """Indexul pe blocuri, reconstruit doar când lista de pacienți se schimbă"""
+    global _index, _index_versiune
+    frame = _pacienti_frame()
+    df = frame.get()
+    with _index_lock:
+        if _index is None or frame.versiune is None or frame.versiune != _index_versiune:
+            _index = DedupIndex(df)
+            _index_versiune = frame.versiune
+        return _index
+
+
+def find_duplicates(prag=PRAG):
+    """Job complet: toate perechile de posibile duplicate din tabelul Pacient"""
+    return get_dedup_index().find_duplicates(prag)
+
+
+def check_new_patient(nume, prenume, cnp, data_nasterii, telefon=None, prag=PRAG):
+    """Verificare rapidă la adăugare: pacienții existenți care par a fi aceeași persoană"""
+    return get_dedup_index().check({
+        'nume': nume,
+        'prenume': prenume,
+        'CNP': cnp,
+        'data_nasterii': data_nasterii,
+        'telefon': telefon,
+    }, prag)
+
+
+if __name__ == "__main__":
+    # python -m database.dedup [fisier.csv]
+    rezultat = find_duplicates()
+    print(f"{len(rezultat)} perechi de posibile duplicate (prag {PRAG})")
+    if len(sys.argv) > 1:
+        rezultat.to_csv(sys.argv[1], index=False)
+        print(f"Salvat în {sys.argv[1]}")
+    else:
+        print(rezultat.head(50).to_string(index=False))
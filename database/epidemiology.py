@@ -0,0 +1,132 @@
+import os
+import threading
+from datetime import datetime, timedelta
+import numpy as np
+import pandas as pd
+from database.cube import get_cube
+
+# Câte zile de istoric intră în calcul (fereastra mobilă)
+FEREASTRA_ZILE = int(os.getenv('OUTBREAK_WINDOW_DAYS', '120'))
+# Primele zile din fereastră doar inițializează media (fără alerte)
+ZILE_INITIALIZARE = int(os.getenv('OUTBREAK_WARMUP_DAYS', '28'))
+# Factorul de netezire EWMA pentru media și varianța de bază
+LAMBDA = float(os.getenv('OUTBREAK_EWMA_LAMBDA', '0.1'))
+# CUSUM: toleranța (k) și pragul de alertă (h), în abateri standard
+CUSUM_K = float(os.getenv('OUTBREAK_CUSUM_K', '0.5'))
+CUSUM_H = float(os.getenv('OUTBREAK_CUSUM_H', '4'))
+# Nu alertăm pentru serii cu mai puține cazuri în ultimele 7 zile
+MIN_CAZURI = int(os.getenv('OUTBREAK_MIN_CASES', '3'))
+
+
+class OutbreakDetector:
+    """Detectarea creșterilor bruște de cazuri pe boală x secție.
+
+    Numărul zilnic de diagnostice din fereastră e o matrice serii x zile,
+    construită dintr-o singură agregare pe cubul de rapoarte (care se
+    actualizează incremental). Detectorul EWMA + CUSUM parcurge zilele o
+    singură dată și actualizează toate seriile deodată, vectorizat.
+    """
+
+    def __init__(self, counts, serii, zile):
+        self.counts = counts
+        self.serii = serii
+        self.zile = zile
+        self._run()
+
+    def _run(self):
+        x = self.counts
+        n_serii, n_zile = x.shape
+        init = min(ZILE_INITIALIZARE, n_zile)
+        medie = x[:, :init].mean(axis=1) if init else np.zeros(n_serii)
+        varianta = x[:, :init].var(axis=1) if init else np.zeros(n_serii)
+
+        self.medie = np.zeros_like(x)
+        self.cusum = np.zeros_like(x)
+        s = np.zeros(n_serii)
+        for t in range(n_zile):
+            self.medie[:, t] = medie
+            if t >= init:
+                # Varianța minimă e cea Poisson (= media), ca seriile rare să nu alerteze din zgomot
+                sigma = np.sqrt(np.maximum(np.maximum(varianta, medie), 0.25))
+                z = (x[:, t] - medie) / sigma
+                s = np.maximum(0.0, s + z - CUSUM_K)
+                self.cusum[:, t] = s
+            # Baza se actualizează doar cu zilele fără semnal, ca focarul să nu devină „normal”
+            normal = s <= CUSUM_H
+            dif = x[:, t] - medie
+            medie = np.where(normal, medie + LAMBDA * dif, medie)
+            varianta = np.where(normal, (1 - LAMBDA) * (varianta + LAMBDA * dif * dif), varianta)
+
+    def alerts(self):
+        """Seriile aflate acum peste prag, ordonate după scorul CUSUM"""
+        if self.counts.size == 0:
+            return pd.DataFrame(columns=['Boala', 'Secție', 'Cazuri 7 zile', 'Așteptate 7 zile',
+                                         'Scor CUSUM', 'Semnal din'])
+        ultim = self.cusum[:, -1]
+        cazuri_7 = self.counts[:, -7:].sum(axis=1)
+        asteptate_7 = self.medie[:, -7:].sum(axis=1)
+        activ = (ultim > CUSUM_H) & (cazuri_7 >= MIN_CAZURI)
+        idx = np.flatnonzero(activ)
+
+        # Începutul semnalului: ultima zi în care CUSUM era 0
+        zero = self.cusum[idx] == 0
+        ultima_zero = np.where(zero.any(axis=1),
+                               zero.shape[1] - 1 - np.argmax(zero[:, ::-1], axis=1), -1)
+        inceput = np.minimum(ultima_zero + 1, len(self.zile) - 1)
+
+        df = pd.DataFrame({
+            'Boala': [self.serii[i][0] for i in idx],
+            'Secție': [self.serii[i][1] for i in idx],
+            'Cazuri 7 zile': cazuri_7[idx].astype(int),
+            'Așteptate 7 zile': np.round(asteptate_7[idx], 1),
+            'Scor CUSUM': np.round(ultim[idx], 1),
+            'Semnal din': self.zile[inceput].strftime('%d.%m.%Y'),
+        })
+        return df.sort_values('Scor CUSUM', ascending=False).reset_index(drop=True)
+
+    def serie(self, boala, sectie):
+        """Cazurile zilnice, media de bază și CUSUM pentru o serie"""
+        i = self.serii.index((boala, sectie))
+        return pd.DataFrame({
+            'Cazuri': self.counts[i],
+            'Medie': self.medie[i],
+            'CUSUM': self.cusum[i],
+        }, index=self.zile)
+
+
+def compute_detector(azi=None):
+    """Construiește matricea serii x zile pe fereastra mobilă și rulează detectorul"""
+    azi = azi or datetime.now().date()
+    start = azi - timedelta(days=FEREASTRA_ZILE - 1)
+    zile = pd.date_range(start, azi, freq='D')
+    df = get_cube().aggregate('diagnostice', ['boala', 'sectie', 'data'], start, azi)
+    if df.empty:
+        return OutbreakDetector(np.zeros((0, len(zile))), [], zile)
+    serii, cod = np.unique(
+        df['boala'].astype(str).to_numpy() + '\x00' + df['sectie'].astype(str).to_numpy(),
+        return_inverse=True
+    )
+    zi = (pd.to_datetime(df['data']).to_numpy(dtype='datetime64[D]')
+          - np.datetime64(start, 'D')).astype(np.int64)
+    counts = np.zeros((len(serii), len(zile)))
+    counts[cod, zi] = df['Numar'].to_numpy()
+    return OutbreakDetector(counts, [tuple(s.split('\x00')) for s in serii], zile)
+
+
+_cache = {'date': None, 'zi': None, 'detector': None}
+_cache_lock = threading.Lock()
+
+
+def get_outbreak_detector():
+    """Detectorul pentru azi, recalculat doar când cubul primește diagnostice noi"""
+    cube = get_cube()
+    cube.sync()
+    date = cube.diagnostice.columns
+    azi = datetime.now().date()
+    with _cache_lock:
+        if _cache['date'] is date and _cache['zi'] == azi:
+            return _cache['detector']
+    detector = compute_detector(azi)
+    with _cache_lock:
+        _cache.update(date=date, zi=azi, detector=detector)
+    return detector
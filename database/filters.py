@@ -0,0 +1,147 @@
+import numpy as np
+import pandas as pd
+
+ZI_NS = np.int64(24 * 3600 * 10**9)
+
+
+class FrameFilter:
+    """Filtre rapide pentru listele din pagini (programări, doctori, pacienți).
+
+    Se construiește o singură dată per versiune a frame-ului:
+    - coloana de dată e deja datetime64 și sortată, deci un interval de
+      date devine o felie [i0, i1) găsită cu searchsorted (O(log n));
+    - coloanele de egalitate sunt factorizate la prima folosire, iar
+      comparațiile se fac pe coduri întregi;
+    - toate predicatele se combină într-o singură mască peste felie și se
+      face o singură copiere, la final.
+    """
+
+    def __init__(self, df, date_column=None, descending=False):
+        self.df = df
+        self._coduri = {}
+        self._cheie = None
+        self._window = None
+        if date_column is not None and not df.empty:
+            ns = df[date_column].to_numpy(dtype='datetime64[ns]').view(np.int64)
+            # Pentru ordinea descrescătoare căutăm în valorile negate (crescătoare)
+            self._cheie = -ns if descending else ns
+            self._descending = descending
+
+    def _factorize(self, coloana):
+        if coloana not in self._coduri:
+            coduri, unice = pd.factorize(self.df[coloana])
+            self._coduri[coloana] = (coduri, {v: i for i, v in enumerate(unice)})
+        return self._coduri[coloana]
+
+    def _slice(self, start, end):
+        """Felia de rânduri cu data în [start, end] (zile inclusive)"""
+        n = len(self.df)
+        if self._cheie is None or (start is None and end is None):
+            return 0, n
+        s = pd.Timestamp(start).normalize().value if start is not None else None
+        # sfârșit exclusiv: începutul zilei următoare
+        e = pd.Timestamp(end).normalize().value + ZI_NS if end is not None else None
+        if self._descending:
+            i0 = np.searchsorted(self._cheie, -e, side='right') if e is not None else 0
+            i1 = np.searchsorted(self._cheie, -s, side='right') if s is not None else n
+        else:
+            i0 = np.searchsorted(self._cheie, s, side='left') if s is not None else 0
+            i1 = np.searchsorted(self._cheie, e, side='left') if e is not None else n
+        return int(i0), int(max(i0, i1))
+
+    def indices(self, egal=None, start=None, end=None):
+        """Pozițiile rândurilor care îndeplinesc toate condițiile"""
+        i0, i1 = self._slice(start, end)
+        mask = np.ones(i1 - i0, dtype=bool)
+        for coloana, valoare in (egal or {}).items():
+            if valoare is None:
+                continue
+            coduri, index = self._factorize(coloana)
+            cod = index.get(valoare)
+            if cod is None:
+                return np.empty(0, dtype=np.int64)
+            mask &= coduri[i0:i1] == cod
+        return np.flatnonzero(mask) + i0
+
+    @property
+    def window(self):
+        """TableWindow peste același frame (pozițiile din indices() sunt compatibile)"""
+        if self._window is None:
+            self._window = TableWindow(self.df)
+        return self._window
+
+    def filter(self, egal=None, start=None, end=None, columns=None):
+        """DataFrame-ul filtrat (o singură copiere, doar cu coloanele cerute)
+
+        egal: {coloana: valoare}; valorile None sunt ignorate
+        start / end: interval de date inclusiv pe coloana de dată
+        """
+        idx = self.indices(egal, start, end)
+        if columns is None:
+            return self.df.take(idx)
+        return self.df.iloc[idx, [self.df.columns.get_loc(c) for c in columns]]
+
+
+class TableWindow:
+    """Ferestre de rânduri dintr-un frame mare, pentru afișare paginată.
+
+    Frame-ul rămâne pe server; pagina primește doar rândurile vizibile.
+    Ordinea pentru fiecare (coloană, direcție) și masca pentru fiecare
+    termen de căutare se calculează o singură dată per versiune a frame-ului.
+    """
+
+    def __init__(self, df):
+        self.df = df
+        self._ordini = {}
+        self._cautari = {}
+
+    def _ordine(self, sort_by, ascending):
+        cheie = (sort_by, ascending)
+        if cheie not in self._ordini:
+            # argsort stabil, valorile lipsă la final
+            ordine = self.df[sort_by].reset_index(drop=True).sort_values(
+                ascending=ascending, kind='stable', na_position='last'
+            ).index.to_numpy()
+            self._ordini[cheie] = ordine
+        return self._ordini[cheie]
+
+    def _cautare(self, termen, coloane):
+        cheie = (termen.lower(), tuple(coloane))
+        if cheie not in self._cautari:
+            mask = np.zeros(len(self.df), dtype=bool)
+            for coloana in coloane:
+                mask |= self.df[coloana].astype(str).str.contains(
+                    termen, case=False, regex=False, na=False
+                ).to_numpy()
+            # Păstrăm doar ultimele câteva căutări
+            if len(self._cautari) > 20:
+                self._cautari.pop(next(iter(self._cautari), None), None)
+            self._cautari[cheie] = mask
+        return self._cautari[cheie]
+
+    def positions(self, pozitii=None, sort_by=None, ascending=True, cautare=None, coloane_cautare=None):
+        """Pozițiile rândurilor, în ordinea de afișare.
+
+        pozitii: subset deja filtrat (ex: din FrameFilter.indices); None = tot frame-ul
+        cautare: text căutat (fără diferență între litere mari și mici) în coloane_cautare
+        """
+        n = len(self.df)
+        mask = None
+        if pozitii is not None:
+            mask = np.zeros(n, dtype=bool)
+            mask[pozitii] = True
+        if cautare:
+            gasite = self._cautare(cautare, coloane_cautare or list(self.df.columns))
+            mask = gasite if mask is None else mask & gasite
+        if sort_by is None:
+            return np.flatnonzero(mask) if mask is not None else np.arange(n)
+        ordine = self._ordine(sort_by, ascending)
+        return ordine[mask[ordine]] if mask is not None else ordine
+
+    def window(self, offset, limit, columns=None, **kwargs):
+        """(rândurile [offset, offset + limit) din ordinea de afișare, numărul total de rânduri)"""
+        pozitii = self.positions(**kwargs)
+        bucata = pozitii[offset:offset + limit]
+        if columns is None:
+            return self.df.take(bucata), len(pozitii)
+        return self.df.iloc[bucata, [self.df.columns.get_loc(c) for c in columns]], len(pozitii)
@@ -0,0 +1,319 @@
+import os
+import sys
+import json
+import shutil
+import hashlib
+import threading
+import time
+from datetime import datetime
+import numpy as np
+from database.shared_cache import get_shared_cache
+
+# Copia pe disc a tabelelor ținute în memorie (frame-urile din changes.tracked_frame
+# și cubul de rapoarte), pentru pornire rapidă. Un director per versiune:
+#   <nume>.arrow                - frame-urile, Arrow IPC necomprimat
+#   cub/<fapt>.<coloana>.npy    - coloanele cubului, NumPy
+#   manifest.json               - marcajul ChangeLog al fiecărei bucăți
+# La pornire fișierele se deschid prin memory-mapping (worker-ii de pe aceeași
+# mașină împart paginile prin cache-ul sistemului de operare) și se aplică
+# doar modificările de după marcaj.
+SNAPSHOT_DIR = os.getenv(
+    'HOT_SNAPSHOT_DIR',
+    os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'snapshots', 'tabele')
+)
+# Cât de des (secunde) se rescrie copia, dacă datele s-au schimbat
+WRITE_SECONDS = int(os.getenv('HOT_SNAPSHOT_SECONDS', '300'))
+KEEP_VERSIONS = int(os.getenv('HOT_SNAPSHOT_KEEP', '2'))
+# 'thread' = scrierea periodică rulează în proces; 'off' = fără copie pe disc
+MODE = os.getenv('HOT_SNAPSHOT_MODE', 'thread')
+
+MANIFEST = 'manifest.json'
+# Se incrementează când se schimbă formatul fișierelor sau prelucrarea frame-urilor
+FORMAT = 2
+
+_manifest_lock = threading.Lock()
+_manifest_cache = {'mtime': None, 'manifest': None}
+
+
+def _write_json(path, data):
+    tmp = path + '.tmp'
+    with open(tmp, 'w', encoding='utf-8') as f:
+        json.dump(data, f, ensure_ascii=False, indent=2)
+    os.replace(tmp, path)
+
+
+def _prune():
+    versiuni = sorted(
+        d for d in os.listdir(SNAPSHOT_DIR)
+        if os.path.isdir(os.path.join(SNAPSHOT_DIR, d)) and not d.endswith('.tmp')
+    )
+    for vechi in versiuni[:-KEEP_VERSIONS]:
+        # Pe Windows un director încă mapat de alt worker nu se poate șterge - rămâne la următoarea
+        shutil.rmtree(os.path.join(SNAPSHOT_DIR, vechi), ignore_errors=True)
+
+
+def latest_manifest():
+    """Manifestul ultimei copii complete (None dacă nu există)"""
+    path = os.path.join(SNAPSHOT_DIR, MANIFEST)
+    try:
+        mtime = os.path.getmtime(path)
+    except OSError:
+        return None
+    with _manifest_lock:
+        if _manifest_cache['mtime'] != mtime:
+            try:
+                with open(path, encoding='utf-8') as f:
+                    manifest = json.load(f)
+            except (OSError, ValueError):
+                return None
+            _manifest_cache.update(mtime=mtime, manifest=manifest)
+        manifest = _manifest_cache['manifest']
+    return manifest if manifest.get('format') == FORMAT else None
+
+
+def signature(frame):
+    """Amprenta definiției unui frame: o copie scrisă de altă versiune a codului e ignorată"""
+    postprocess = frame.postprocess
+    parti = [
+        frame.query,
+        repr(sorted(frame.depinde_de.items())),
+        repr(frame.sort_by), repr(frame.ascending),
+        f"{postprocess.__module__}.{postprocess.__qualname__}" if postprocess else '',
+    ]
+    return hashlib.sha1('\n'.join(parti).encode('utf-8')).hexdigest()
+
+
+# ===== CITIRE =====
+
+def load_frame(nume, amprenta):
+    """(df, versiune) din ultima copie sau None.
+
+    Coloanele numerice fără NULL rămân vederi peste fișierul mapat; textul
+    devine obiecte Python (pandas nu poate folosi direct bufferele Arrow).
+    """
+    if MODE == 'off':
+        return None
+    manifest = latest_manifest()
+    intrare = manifest['frames'].get(nume) if manifest else None
+    if intrare is None or intrare['amprenta'] != amprenta:
+        return None
+    try:
+        import pyarrow as pa
+        sursa = pa.memory_map(os.path.join(SNAPSHOT_DIR, manifest['versiune'], intrare['fisier']), 'r')
+        df = pa.ipc.open_file(sursa).read_all().to_pandas(split_blocks=True)
+    except Exception as e:
+        print(f"Copia frame-ului '{nume}' nu se poate citi: {e}", file=sys.stderr)
+        return None
+    return df, intrare['versiune']
+
+
+def load_cube(cube):
+    """Încarcă cubul din ultima copie (coloane mapate read-only). True dacă a reușit."""
+    if MODE == 'off':
+        return False
+    manifest = latest_manifest()
+    intrare = manifest.get('cub') if manifest else None
+    if intrare is None:
+        return False
+    director = os.path.join(SNAPSHOT_DIR, manifest['versiune'], 'cub')
+    try:
+        tabele = {}
+        for fapt in ('programari', 'diagnostice'):
+            tabel = getattr(cube, fapt)
+            tabele[fapt] = {
+                coloana: np.load(os.path.join(director, f"{fapt}.{coloana}.npy"), mmap_mode='r')
+                for coloana in tabel.columns
+            }
+        with open(os.path.join(director, 'dimensiuni.json'), encoding='utf-8') as f:
+            dimensiuni = json.load(f)
+    except Exception as e:
+        print(f"Copia cubului nu se poate citi: {e}", file=sys.stderr)
+        return False
+    if set(dimensiuni) != set(cube.dims):
+        return False
+    # Array-urile cubului nu se modifică pe loc, deci pot rămâne mapate
+    for fapt, coloane in tabele.items():
+        getattr(cube, fapt).columns = coloane
+    for nume, valori in dimensiuni.items():
+        cube.dims[nume].values = list(valori)
+        cube.dims[nume]._codes = {valoare: cod for cod, valoare in enumerate(valori)}
+    cube._versiune = intrare['versiune']
+    cube._max_diagnostic = intrare['max_diagnostic']
+    return True
+
+
+# ===== SCRIERE =====
+
+def _write_frame(path, df):
+    import pyarrow as pa
+    tabel = pa.Table.from_pandas(df, preserve_index=False)
+    with pa.OSFile(path, 'wb') as sink:
+        with pa.ipc.new_file(sink, tabel.schema) as writer:
+            writer.write_table(tabel)
+
+
+def _write_cube(director, cube):
+    with cube._lock:
+        if cube._versiune is None:
+            return None
+        tabele = {fapt: dict(getattr(cube, fapt).columns) for fapt in ('programari', 'diagnostice')}
+        dimensiuni = {nume: list(dim.values) for nume, dim in cube.dims.items()}
+        intrare = {'versiune': cube._versiune, 'max_diagnostic': int(cube._max_diagnostic)}
+    os.makedirs(director, exist_ok=True)
+    for fapt, coloane in tabele.items():
+        for coloana, valori in coloane.items():
+            np.save(os.path.join(director, f"{fapt}.{coloana}.npy"), np.ascontiguousarray(valori))
+    _write_json(os.path.join(director, 'dimensiuni.json'), dimensiuni)
+    intrare['randuri'] = {fapt: len(coloane['id']) for fapt, coloane in tabele.items()}
+    return intrare
+
+
+def _stari():
+    """Starea curentă (df, versiune) a frame-urilor încărcate în acest proces"""
+    from database import changes
+    stari = {}
+    for nume, frame in changes.tracked_frames().items():
+        df, versiune = frame.state()
+        if df is not None and versiune is not None:
+            stari[nume] = (frame, df, versiune)
+    return stari
+
+
+def _cube_loaded():
+    from database import cube
+    return cube._cube if cube._cube is not None and cube._cube._versiune is not None else None
+
+
+def is_stale():
+    """True dacă datele din memorie sunt mai noi decât ultima copie de pe disc"""
+    manifest = latest_manifest()
+    stari = _stari()
+    cube = _cube_loaded()
+    if manifest is None:
+        return bool(stari) or cube is not None
+    for nume, (_, _, versiune) in stari.items():
+        intrare = manifest['frames'].get(nume)
+        if intrare is None or intrare['versiune'] < versiune:
+            return True
+    intrare = manifest.get('cub')
+    return cube is not None and (intrare is None or intrare['versiune'] < cube._versiune)
+
+
+def write_snapshot():
+    """Scrie frame-urile încărcate în proces și cubul într-o versiune nouă.
+
+    Bucățile pe care acest proces nu le are în memorie se păstrează din
+    copia anterioară (cu marcajul lor), nu se pierd.
+    """
+    inceput = time.monotonic()
+    anterior = latest_manifest() or {'frames': {}, 'cub': None}
+    versiune = datetime.now().strftime('%Y%m%d_%H%M%S_%f')
+    director = os.path.join(SNAPSHOT_DIR, versiune)
+    tmp = director + '.tmp'
+    os.makedirs(tmp, exist_ok=True)
+
+    frames = {}
+    for nume, (frame, df, versiune_frame) in _stari().items():
+        fisier = f"{nume}.arrow"
+        try:
+            _write_frame(os.path.join(tmp, fisier), df)
+        except Exception as e:
+            # Ex: o coloană object cu tipuri amestecate pe care Arrow nu o acceptă
+            print(f"Frame-ul '{nume}' nu s-a putut scrie: {e}", file=sys.stderr)
+            continue
+        frames[nume] = {'fisier': fisier, 'versiune': versiune_frame,
+                        'amprenta': signature(frame), 'randuri': len(df)}
+    for nume, intrare in anterior['frames'].items():
+        if nume not in frames:
+            try:
+                shutil.copyfile(os.path.join(SNAPSHOT_DIR, anterior['versiune'], intrare['fisier']),
+                                os.path.join(tmp, intrare['fisier']))
+                frames[nume] = intrare
+            except OSError:
+                pass
+
+    cube = _cube_loaded()
+    cub = _write_cube(os.path.join(tmp, 'cub'), cube) if cube is not None else None
+    if cub is None and anterior.get('cub'):
+        try:
+            shutil.copytree(os.path.join(SNAPSHOT_DIR, anterior['versiune'], 'cub'),
+                            os.path.join(tmp, 'cub'))
+            cub = anterior['cub']
+        except OSError:
+            pass
+
+    manifest = {
+        'format': FORMAT,
+        'versiune': versiune,
+        'creat': datetime.now().isoformat(timespec='seconds'),
+        'frames': frames,
+        'cub': cub,
+        'durata_secunde': round(time.monotonic() - inceput, 2),
+    }
+    _write_json(os.path.join(tmp, MANIFEST), manifest)
+    os.replace(tmp, director)
+    _write_json(os.path.join(SNAPSHOT_DIR, MANIFEST), manifest)
+    _prune()
+    return manifest
+
+
+# ===== SCRIERE PERIODICĂ =====
+
+class SnapshotWriter:
+    """Fir de fundal care rescrie copia la WRITE_SECONDS, doar dacă datele s-au schimbat"""
+
+    def __init__(self, interval=WRITE_SECONDS):
+        self.interval = interval
+        self._stop = threading.Event()
+        self._thread = None
+
+    def _safe_write(self):
+        try:
+            # Cu mai mulți worker-i scrie unul singur; ceilalți citesc manifestul nou
+            with get_shared_cache().lock('tabele:snapshot', ttl=self.interval) as obtinut:
+                if obtinut and is_stale():
+                    write_snapshot()
+        except Exception as e:
+            print(f"Eroare la scrierea copiei tabelelor: {e}", file=sys.stderr)
+
+    def run(self):
+        while not self._stop.wait(self.interval):
+            self._safe_write()
+
+    def start(self):
+        if self._thread is None or not self._thread.is_alive():
+            self._stop.clear()
+            self._thread = threading.Thread(target=self.run, name="hot-snapshot", daemon=True)
+            self._thread.start()
+
+    def stop(self):
+        self._stop.set()
+
+
+_writer = None
+_writer_lock = threading.Lock()
+
+
+def start_writer():
+    """Pornește scrierea periodică în proces (o singură dată), dacă nu e dezactivată"""
+    global _writer
+    if MODE != 'thread':
+        return
+    with _writer_lock:
+        if _writer is None:
+            _writer = SnapshotWriter()
+        _writer.start()
+
+
+if __name__ == "__main__":
+    # python -m database.hot_snapshot   -> rezumatul ultimei copii
+    manifest = latest_manifest()
+    if manifest is None:
+        print(f"Nu există nicio copie în {SNAPSHOT_DIR}")
+        sys.exit(1)
+    print(f"Copia {manifest['versiune']} (scrisă {manifest['creat']}, {manifest['durata_secunde']}s)")
+    for nume, intrare in manifest['frames'].items():
+        print(f"  {nume}: {intrare['randuri']} rânduri, ChangeLog {intrare['versiune']}")
+    if manifest['cub']:
+        randuri = ', '.join(f"{fapt} {n}" for fapt, n in manifest['cub']['randuri'].items())
+        print(f"  cub: {randuri}, ChangeLog {manifest['cub']['versiune']}")
@@ -0,0 +1,181 @@
+import os
+import threading
+from datetime import datetime
+import pandas as pd
+from database.connection import db
+from database import changes, offline
+
+# Intervalul de actualizare al panoului live (secunde)
+REFRESH_SECONDS = int(os.getenv('LIVE_BOARD_INTERVAL', '30'))
+
+
+def fetch_programari_today():
+    """Programările de astăzi"""
+    query = """
+        SELECT
+            CONVERT(VARCHAR(5), pr.ora_programare, 108) as Ora,
+            p.nume + ' ' + p.prenume as Pacient,
+            d.nume + ' ' + d.prenume as Doctor,
+            pr.tip_programare as Tip
+        FROM Programare pr
+        JOIN Pacient p ON pr.id_pacient = p.id_pacient
+        JOIN Doctor d ON pr.id_doctor = d.id_doctor
+        WHERE CAST(pr.data_programare AS DATE) = CAST(GETDATE() AS DATE)
+        ORDER BY pr.ora_programare
+    """
+    return offline.read(lambda: db.fetch_dataframe(query), offline.LOCAL_PROGRAMARI_AZI)
+
+
+def fetch_programari_viitoare():
+    """Programările din următoarele 7 zile"""
+    query = """
+        SELECT
+            CONVERT(VARCHAR, pr.data_programare, 103) as Data,
+            CONVERT(VARCHAR(5), pr.ora_programare, 108) as Ora,
+            p.nume + ' ' + p.prenume as Pacient,
+            d.nume + ' ' + d.prenume as Doctor,
+            pr.tip_programare as Tip
+        FROM Programare pr
+        JOIN Pacient p ON pr.id_pacient = p.id_pacient
+        JOIN Doctor d ON pr.id_doctor = d.id_doctor
+        WHERE pr.data_programare BETWEEN CAST(GETDATE() AS DATE)
+              AND DATEADD(day, 7, CAST(GETDATE() AS DATE))
+        ORDER BY pr.data_programare, pr.ora_programare
+    """
+    return offline.read(lambda: db.fetch_dataframe(query), offline.LOCAL_PROGRAMARI_VIITOARE)
+
+
+def fetch_programari_recente():
+    """Ultimele 5 programări"""
+    query = """
+        SELECT TOP 5
+            p.nume + ' ' + p.prenume as Pacient,
+            d.nume + ' ' + d.prenume as Doctor,
+            s.nume_sectie as Sectie,
+            CONVERT(VARCHAR, pr.data_programare, 103) as Data,
+            CONVERT(VARCHAR(5), pr.ora_programare, 108) as Ora,
+            pr.tip_programare as Tip
+        FROM Programare pr
+        JOIN Pacient p ON pr.id_pacient = p.id_pacient
+        JOIN Doctor d ON pr.id_doctor = d.id_doctor
+        LEFT JOIN Sectie s ON pr.id_sectie = s.id_sectie
+        ORDER BY pr.data_programare DESC, pr.ora_programare DESC
+    """
+    return offline.read(lambda: db.fetch_dataframe(query), offline.LOCAL_PROGRAMARI_RECENTE)
+
+
+class LiveBoard:
+    """Un singur fir de fundal per proces care citește programările curente.
+
+    Toate sesiunile (ecranele din clinică) citesc același snapshot, deci
+    costul este de un set de interogări per interval, indiferent de numărul
+    de ecrane deschise. Dacă ChangeLog e disponibil și nu s-a schimbat nimic
+    (și nici data), intervalul costă doar o citire a versiunii.
+    """
+
+    def __init__(self, interval=REFRESH_SECONDS):
+        self.interval = interval
+        self._snapshot = None
+        self._versiune = None
+        self._zi = None
+        self._lock = threading.Lock()
+        self._stop = threading.Event()
+        self._thread = None
+
+    def start(self):
+        with self._lock:
+            if self._thread is None or not self._thread.is_alive():
+                self._stop.clear()
+                self._thread = threading.Thread(
+                    target=self._run, name="live-board", daemon=True
+                )
+                self._thread.start()
+
+    def stop(self):
+        self._stop.set()
+
+    def _run(self):
+        # Primul abonat a citit deja snapshot-ul (vezi snapshot): așteptăm un interval
+        if self._snapshot is not None and self._stop.wait(self.interval):
+            return
+        while not self._stop.is_set():
+            self.refresh()
+            self._stop.wait(self.interval)
+
+    def _versiune_curenta(self):
+        """Versiunea din ChangeLog; None dacă nu e disponibilă sau suntem offline"""
+        replica = offline.get_local_replica()
+        if replica is not None and replica.offline:
+            return None
+        try:
+            return changes.get_current_version() if changes.ensure_changelog() else None
+        except Exception:
+            return None
+
+    def _neschimbat(self, versiune):
+        """True dacă datele din snapshot sunt încă valabile"""
+        if self._snapshot is None or self._snapshot['eroare']:
+            return False
+        if self._zi != datetime.now().date() or versiune is None:
+            return False
+        return versiune == self._versiune
+
+    def refresh(self):
+        """Citește din nou programările (dacă s-au schimbat)"""
+        try:
+            versiune = self._versiune_curenta()
+            if self._neschimbat(versiune):
+                self._snapshot = dict(self._snapshot, actualizat=datetime.now())
+                return
+            snapshot = {
+                'today': fetch_programari_today(),
+                'viitoare': fetch_programari_viitoare(),
+                'recente': fetch_programari_recente(),
+                'actualizat': datetime.now(),
+                'eroare': None
+            }
+            replica = offline.get_local_replica()
+            if replica is not None and replica.offline:
+                # Date din copia locală: se recitesc la revenirea legăturii
+                versiune = None
+            self._versiune = versiune
+            self._zi = datetime.now().date()
+            # Înlocuire atomică: cititorii văd fie snapshot-ul vechi, fie pe cel nou
+            self._snapshot = snapshot
+        except Exception as e:
+            if self._snapshot is None:
+                self._snapshot = {
+                    'today': pd.DataFrame(),
+                    'viitoare': pd.DataFrame(),
+                    'recente': pd.DataFrame(),
+                    'actualizat': None,
+                    'eroare': str(e)
+                }
+            else:
+                self._snapshot = dict(self._snapshot, eroare=str(e))
+
+    def snapshot(self):
+        """Ultimul snapshot; pornește poller-ul la primul abonat.
+
+        Prima citire se face aici, sincron, iar poller-ul pornește abia după
+        ea, ca interogările inițiale să nu ruleze de două ori.
+        """
+        if self._snapshot is None:
+            with self._lock:
+                if self._snapshot is None:
+                    self.refresh()
+        self.start()
+        return self._snapshot
+
+
+_board = None
+_board_lock = threading.Lock()
+
+
+def get_live_board():
+    """Instanța unică (per proces) a panoului live"""
+    global _board
+    with _board_lock:
+        if _board is None:
+            _board = LiveBoard()
+        return _board
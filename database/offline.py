@@ -0,0 +1,514 @@
+import os
+import sys
+import sqlite3
+import threading
+from contextlib import contextmanager
+from datetime import datetime, date, time, timedelta
+import pandas as pd
+from database.connection import db, is_deadlock
+from database import changes
+
+# Copia locală (SQLite) folosită când legătura cu SQL Server e lentă sau căzută.
+# Conține secțiile, doctorii, pacienții activi, programările din zilele
+# următoare și coada programărilor făcute offline.
+OFFLINE_DB = os.getenv(
+    'OFFLINE_DB_PATH',
+    os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'snapshots', 'offline.sqlite')
+)
+# Cât de des (secunde) se sincronizează copia și se verifică legătura
+SYNC_SECONDS = int(os.getenv('OFFLINE_SYNC_SECONDS', '60'))
+# Programările copiate: de azi până la azi + DAYS_AHEAD
+DAYS_AHEAD = int(os.getenv('OFFLINE_DAYS_AHEAD', '7'))
+# Pacienți activi: internați sau cu programări în ultimele PATIENT_DAYS zile / în zilele copiate
+PATIENT_DAYS = int(os.getenv('OFFLINE_PATIENT_DAYS', '90'))
+# 'thread' = sincronizare de fundal în procesul Streamlit; 'off' = fără copie locală
+MODE = os.getenv('OFFLINE_MODE', 'thread')
+# O programare revendicată pentru trimitere (stare 'trimitere') de un proces
+# care a căzut între timp revine în coadă după atâtea secunde
+CLAIM_SECONDS = int(os.getenv('OFFLINE_CLAIM_SECONDS', '300'))
+
+SCHEMA = """
+    CREATE TABLE IF NOT EXISTS sectie (
+        id_sectie INTEGER PRIMARY KEY, nume_sectie TEXT);
+    CREATE TABLE IF NOT EXISTS doctor (
+        id_doctor INTEGER PRIMARY KEY, nume TEXT, prenume TEXT, specializare TEXT, id_sectie INTEGER);
+    CREATE TABLE IF NOT EXISTS pacient (
+        id_pacient INTEGER PRIMARY KEY, nume TEXT, prenume TEXT, CNP TEXT,
+        id_sectie INTEGER, internat INTEGER);
+    CREATE TABLE IF NOT EXISTS programare (
+        id_programare INTEGER PRIMARY KEY, id_pacient INTEGER, id_doctor INTEGER, id_sectie INTEGER,
+        data_programare TEXT, ora_programare TEXT, tip_programare TEXT, cauza TEXT);
+    CREATE INDEX IF NOT EXISTS ix_programare_data ON programare (data_programare, ora_programare);
+    CREATE TABLE IF NOT EXISTS meta (cheie TEXT PRIMARY KEY, valoare TEXT);
+    CREATE TABLE IF NOT EXISTS coada_programari (
+        id INTEGER PRIMARY KEY AUTOINCREMENT,
+        creat TEXT NOT NULL,
+        id_pacient INTEGER, id_doctor INTEGER, id_sectie INTEGER,
+        data_programare TEXT, ora_programare TEXT, tip_programare TEXT, cauza TEXT,
+        stare TEXT NOT NULL DEFAULT 'asteptare',
+        mesaj TEXT,
+        id_programare INTEGER,
+        revendicat TEXT);
+"""
+
+# Tabel local -> interogarea din SQL Server (datele și orele vin ca text ISO)
+SURSE = {
+    'sectie': ("SELECT id_sectie, nume_sectie FROM Sectie", ()),
+    'doctor': ("SELECT id_doctor, nume, prenume, specializare, id_sectie FROM Doctor", ()),
+    'pacient': ("""
+        SELECT
+            p.id_pacient, p.nume, p.prenume, p.CNP, p.id_sectie,
+            CASE WHEN p.data_internare IS NOT NULL AND p.data_externare IS NULL
+                 THEN 1 ELSE 0 END as internat
+        FROM Pacient p
+        WHERE (p.data_internare IS NOT NULL AND p.data_externare IS NULL)
+           OR EXISTS (
+                SELECT 1 FROM Programare pr
+                WHERE pr.id_pacient = p.id_pacient
+                  AND pr.data_programare BETWEEN DATEADD(day, -?, CAST(GETDATE() AS DATE))
+                      AND DATEADD(day, ?, CAST(GETDATE() AS DATE))
+           )
+    """, (PATIENT_DAYS, DAYS_AHEAD)),
+    'programare': ("""
+        SELECT
+            id_programare, id_pacient, id_doctor, id_sectie,
+            CONVERT(VARCHAR(10), data_programare, 23) as data_programare,
+            CONVERT(VARCHAR(5), ora_programare, 108) as ora_programare,
+            tip_programare, cauza
+        FROM Programare
+        WHERE data_programare BETWEEN CAST(GETDATE() AS DATE)
+              AND DATEADD(day, ?, CAST(GETDATE() AS DATE))
+    """, (DAYS_AHEAD,)),
+}
+
+TOTALURI_QUERY = "SELECT (SELECT COUNT(*) FROM Pacient), (SELECT COUNT(*) FROM Doctor)"
+
+# UPDLOCK + HOLDLOCK: nimeni nu poate ocupa intervalul până la COMMIT
+DISPONIBILITATE_QUERY = """
+    SELECT COUNT(*) FROM Programare WITH (UPDLOCK, HOLDLOCK)
+    WHERE id_doctor = ? AND data_programare = ? AND ora_programare = ?
+"""
+
+INSERT_PROGRAMARE = """
+    INSERT INTO Programare
+    (id_pacient, id_doctor, id_sectie, data_programare, ora_programare, tip_programare, cauza)
+    VALUES (?, ?, ?, ?, ?, ?, ?)
+"""
+
+
+def _connection_error(eroare):
+    """Eroare de legătură (server căzut, timeout), nu de date: programarea se reîncearcă"""
+    import pyodbc
+    if isinstance(eroare, (pyodbc.OperationalError, pyodbc.InterfaceError)):
+        return True
+    args = getattr(eroare, 'args', ())
+    return bool(args) and isinstance(args[0], str) and (args[0].startswith('08') or args[0] in ('HYT00', 'HYT01'))
+
+
+def _text(valoare):
+    """Dată / oră -> text ISO, ca în copia locală"""
+    if isinstance(valoare, datetime):
+        return valoare.strftime('%Y-%m-%d')
+    if isinstance(valoare, date):
+        return valoare.isoformat()
+    if isinstance(valoare, time):
+        return valoare.strftime('%H:%M')
+    return valoare
+
+
+class LocalReplica:
+    """Copie SQLite a datelor de zi cu zi, pentru funcționarea în mod degradat.
+
+    Un fir de fundal o sincronizează la SYNC_SECONDS (doar dacă ChangeLog s-a
+    schimbat sau a trecut ziua) și, cu aceeași ocazie, verifică legătura.
+    Când o citire din SQL Server eșuează, copia trece în modul offline:
+    citirile merg direct pe disc (fără să mai aștepte timeout-uri) până la
+    următoarea sincronizare reușită. Programările făcute între timp stau în
+    coada locală și se trimit la revenirea legăturii, cu verificarea
+    conflictelor (doctorul ocupat între timp la aceeași dată și oră).
+    """
+
+    def __init__(self, path=OFFLINE_DB, interval=SYNC_SECONDS):
+        self.path = path
+        self.interval = interval
+        self.eroare = None
+        self.offline_din = None
+        self._versiune = None
+        self._zi = None
+        self._lock = threading.Lock()
+        self._replay_lock = threading.Lock()
+        self._stop = threading.Event()
+        self._thread = None
+        os.makedirs(os.path.dirname(self.path), exist_ok=True)
+        with self._connect() as conn:
+            # WAL: cititorii văd copia veche cât timp sincronizarea scrie
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.executescript(SCHEMA)
+            coloane = {rand[1] for rand in conn.execute("PRAGMA table_info(coada_programari)")}
+            if 'revendicat' not in coloane:
+                # Copie creată de o versiune mai veche
+                conn.execute("ALTER TABLE coada_programari ADD COLUMN revendicat TEXT")
+
+    @contextmanager
+    def _connect(self):
+        # Tranzacție per bloc (commit / rollback), apoi conexiunea se închide
+        conn = sqlite3.connect(self.path, timeout=10)
+        try:
+            with conn:
+                yield conn
+        finally:
+            conn.close()
+
+    # ----- stare -----
+
+    @property
+    def offline(self):
+        return self.eroare is not None
+
+    def mark_offline(self, eroare):
+        if self.offline_din is None:
+            self.offline_din = datetime.now()
+        self.eroare = str(eroare)
+
+    def _meta(self, conn, cheie):
+        rand = conn.execute("SELECT valoare FROM meta WHERE cheie = ?", (cheie,)).fetchone()
+        return rand[0] if rand else None
+
+    def synced_at(self):
+        """Momentul ultimei sincronizări reușite (None dacă nu există copie)"""
+        with self._connect() as conn:
+            valoare = self._meta(conn, 'sincronizat')
+        return datetime.fromisoformat(valoare) if valoare else None
+
+    def available(self):
+        return self.synced_at() is not None
+
+    def status(self):
+        """Starea pentru bannerul din pagini"""
+        with self._connect() as conn:
+            in_asteptare, conflicte = conn.execute("""
+                SELECT SUM(stare IN ('asteptare', 'trimitere')), SUM(stare = 'conflict')
+                FROM coada_programari
+            """).fetchone()
+        return {
+            'offline': self.offline,
+            'eroare': self.eroare,
+            'offline_din': self.offline_din,
+            'sincronizat': self.synced_at(),
+            'in_asteptare': in_asteptare or 0,
+            'conflicte': conflicte or 0,
+        }
+
+    # ----- sincronizare -----
+
+    def _neschimbat(self, versiune):
+        return (versiune is not None and versiune == self._versiune
+                and self._zi == datetime.now().date())
+
+    def sync(self):
+        """Copiază datele din SQL Server; la eroare trece în modul offline"""
+        with self._lock:
+            try:
+                endpoint = db.read_endpoint(replica=True)
+                versiune = changes.get_current_version(endpoint) if changes.ensure_changelog() else None
+                if self._neschimbat(versiune):
+                    with self._connect() as conn:
+                        conn.execute("INSERT OR REPLACE INTO meta VALUES ('sincronizat', ?)",
+                                     (datetime.now().isoformat(timespec='seconds'),))
+                else:
+                    date_noi = {
+                        tabel: db.fetch_data(query, params, endpoint=endpoint)[1]
+                        for tabel, (query, params) in SURSE.items()
+                    }
+                    _, totaluri = db.fetch_data(TOTALURI_QUERY, endpoint=endpoint)
+                    # O singură tranzacție: cititorii văd fie copia veche, fie pe cea nouă
+                    with self._connect() as conn:
+                        for tabel, randuri in date_noi.items():
+                            conn.execute(f"DELETE FROM {tabel}")
+                            if randuri:
+                                semne = ', '.join('?' * len(randuri[0]))
+                                conn.executemany(f"INSERT INTO {tabel} VALUES ({semne})",
+                                                 [tuple(r) for r in randuri])
+                        conn.executemany("INSERT OR REPLACE INTO meta VALUES (?, ?)", [
+                            ('sincronizat', datetime.now().isoformat(timespec='seconds')),
+                            ('total_pacienti', str(totaluri[0][0])),
+                            ('total_doctori', str(totaluri[0][1])),
+                        ])
+                    self._versiune = versiune
+                    self._zi = datetime.now().date()
+            except Exception as e:
+                self.mark_offline(e)
+                return False
+        self.eroare = None
+        self.offline_din = None
+        self.replay()
+        return True
+
+    def start(self):
+        with self._lock:
+            if self._thread is None or not self._thread.is_alive():
+                self._stop.clear()
+                self._thread = threading.Thread(target=self._run, name="offline-sync", daemon=True)
+                self._thread.start()
+
+    def stop(self):
+        self._stop.set()
+
+    def _run(self):
+        while not self._stop.is_set():
+            try:
+                self.sync()
+            except Exception as e:
+                print(f"Eroare la sincronizarea copiei locale: {e}", file=sys.stderr)
+            self._stop.wait(self.interval)
+
+    # ----- citiri locale -----
+
+    def query(self, sql, params=()):
+        """SELECT pe copia locală -> DataFrame"""
+        with self._connect() as conn:
+            return pd.read_sql_query(sql, conn, params=params)
+
+    def statistics(self):
+        """Statisticile din pagina principală, calculate din copia locală"""
+        azi = datetime.now().date().isoformat()
+        with self._connect() as conn:
+            programari_astazi = conn.execute(
+                "SELECT COUNT(*) FROM programare WHERE data_programare = ?", (azi,)
+            ).fetchone()[0]
+            internati = conn.execute("SELECT COUNT(*) FROM pacient WHERE internat = 1").fetchone()[0]
+            return {
+                'total_pacienti': int(self._meta(conn, 'total_pacienti') or 0),
+                'total_doctori': int(self._meta(conn, 'total_doctori') or 0),
+                'programari_astazi': programari_astazi,
+                'pacienti_internati': internati,
+            }
+
+    # ----- programări offline -----
+
+    def is_available(self, id_doctor, data_programare, ora_programare):
+        """Doctorul e liber în copia locală și în coada de programări?"""
+        params = (int(id_doctor), _text(data_programare), _text(ora_programare))
+        with self._connect() as conn:
+            ocupat = conn.execute("""
+                SELECT
+                    (SELECT COUNT(*) FROM programare
+                     WHERE id_doctor = ? AND data_programare = ? AND ora_programare = ?)
+                  + (SELECT COUNT(*) FROM coada_programari
+                     WHERE stare IN ('asteptare', 'trimitere')
+                       AND id_doctor = ? AND data_programare = ? AND ora_programare = ?)
+            """, params + params).fetchone()[0]
+        return ocupat == 0
+
+    def queue_booking(self, id_pacient, id_doctor, id_sectie, data_programare, ora_programare,
+                      tip_programare, cauza):
+        """Salvează o programare în coada locală; returnează id-ul din coadă"""
+        with self._connect() as conn:
+            cursor = conn.execute("""
+                INSERT INTO coada_programari
+                (creat, id_pacient, id_doctor, id_sectie, data_programare, ora_programare,
+                 tip_programare, cauza)
+                VALUES (?, ?, ?, ?, ?, ?, ?, ?)
+            """, (datetime.now().isoformat(timespec='seconds'), int(id_pacient), int(id_doctor),
+                  None if id_sectie is None else int(id_sectie),
+                  _text(data_programare), _text(ora_programare), tip_programare, cauza))
+            return cursor.lastrowid
+
+    def queued(self, stare=None):
+        """Programările din coadă (toate sau doar cele cu starea dată)"""
+        sql = "SELECT * FROM coada_programari"
+        params = ()
+        if stare:
+            sql += " WHERE stare = ?"
+            params = (stare,)
+        return self.query(sql + " ORDER BY id", params)
+
+    def dismiss(self, id_coada):
+        """Scoate din coadă o programare (ex: un conflict rezolvat manual)"""
+        with self._connect() as conn:
+            conn.execute("DELETE FROM coada_programari WHERE id = ?", (int(id_coada),))
+
+    def _set_state(self, id_coada, stare, mesaj=None, id_programare=None):
+        with self._connect() as conn:
+            conn.execute(
+                "UPDATE coada_programari SET stare = ?, mesaj = ?, id_programare = ? WHERE id = ?",
+                (stare, mesaj, id_programare, int(id_coada))
+            )
+
+    def _claim(self, id_coada):
+        """Revendică o programare pentru trimitere; False dacă alt proces a luat-o deja"""
+        with self._connect() as conn:
+            cursor = conn.execute(
+                "UPDATE coada_programari SET stare = 'trimitere', revendicat = ? "
+                "WHERE id = ? AND stare = 'asteptare'",
+                (datetime.now().isoformat(timespec='seconds'), int(id_coada))
+            )
+            return cursor.rowcount == 1
+
+    def _release_stale_claims(self):
+        """Readuce în coadă programările revendicate de un proces căzut în timpul trimiterii"""
+        limita = (datetime.now() - timedelta(seconds=CLAIM_SECONDS)).isoformat(timespec='seconds')
+        with self._connect() as conn:
+            conn.execute(
+                "UPDATE coada_programari SET stare = 'asteptare' "
+                "WHERE stare = 'trimitere' AND (revendicat IS NULL OR revendicat < ?)",
+                (limita,)
+            )
+
+    def replay(self):
+        """Trimite programările din coadă în SQL Server, în ordinea în care au fost făcute.
+
+        Copia locală e comună tuturor proceselor de pe server, deci fiecare
+        programare se revendică întâi în SQLite (un singur proces o trimite).
+        Verificarea și INSERT-ul sunt în aceeași tranzacție pe primar: dacă
+        doctorul are între timp o programare la aceeași dată și oră, rămâne
+        în coadă ca 'conflict' pentru rezolvare manuală. La o eroare de
+        conexiune programarea revine în coadă, ne oprim și reîncercăm la
+        următoarea sincronizare. Returnează câte s-au trimis.
+        """
+        with self._replay_lock:
+            return self._replay()
+
+    def _replay(self):
+        self._release_stale_claims()
+        trimise = 0
+        for rand in self.queued('asteptare').itertuples(index=False):
+            if not self._claim(rand.id):
+                continue
+            data_programare = date.fromisoformat(rand.data_programare)
+            ora_programare = datetime.strptime(rand.ora_programare, '%H:%M').time()
+            id_sectie = None if pd.isna(rand.id_sectie) else int(rand.id_sectie)
+
+            def _trimite(tx):
+                if tx.fetch_one(DISPONIBILITATE_QUERY,
+                                (int(rand.id_doctor), data_programare, ora_programare))[0]:
+                    return None
+                return changes.track(
+                    tx, INSERT_PROGRAMARE,
+                    (int(rand.id_pacient), int(rand.id_doctor), id_sectie,
+                     data_programare, ora_programare, rand.tip_programare, rand.cauza),
+                    'Programare', 'I'
+                )
+
+            try:
+                id_programare = db.run_in_transaction(_trimite)
+            except Exception as e:
+                if _connection_error(e) or is_deadlock(e):
+                    self._set_state(rand.id, 'asteptare')
+                    if _connection_error(e):
+                        self.mark_offline(e)
+                    break
+                # Eroare de date, ex. pacient șters între timp
+                self._set_state(rand.id, 'conflict', str(e))
+                continue
+            if id_programare is None:
+                self._set_state(rand.id, 'conflict',
+                                "Doctorul are deja o programare la această dată și oră")
+                continue
+            self._set_state(rand.id, 'trimis', None, id_programare)
+            trimise += 1
+        return trimise
+
+
+_replica = None
+_replica_lock = threading.Lock()
+
+
+def get_local_replica():
+    """Copia locală (per proces), cu sincronizarea pornită; None dacă e dezactivată"""
+    global _replica
+    if MODE == 'off':
+        return None
+    with _replica_lock:
+        if _replica is None:
+            _replica = LocalReplica()
+    _replica.start()
+    return _replica
+
+
+def read(online, local_query, params=()):
+    """Citire cu rezervă locală.
+
+    online: funcția care citește din SQL Server. Dacă suntem deja offline
+    sau citirea eșuează, se rulează local_query pe copia SQLite (dacă
+    există). Fără copie locală eroarea se propagă ca până acum.
+    """
+    replica = get_local_replica()
+    if replica is None:
+        return online()
+    if replica.offline and replica.available():
+        return replica.query(local_query, params)
+    try:
+        return online()
+    except Exception as e:
+        replica.mark_offline(e)
+        if not replica.available():
+            raise
+        return replica.query(local_query, params)
+
+
+# Interogările locale echivalente celor din pagini (aceleași coloane)
+
+LOCAL_PROGRAMARI_AZI = """
+    SELECT pr.ora_programare as Ora,
+           p.nume || ' ' || p.prenume as Pacient,
+           d.nume || ' ' || d.prenume as Doctor,
+           pr.tip_programare as Tip
+    FROM programare pr
+    JOIN pacient p ON pr.id_pacient = p.id_pacient
+    JOIN doctor d ON pr.id_doctor = d.id_doctor
+    WHERE pr.data_programare = date('now', 'localtime')
+    ORDER BY pr.ora_programare
+"""
+
+LOCAL_PROGRAMARI_VIITOARE = """
+    SELECT strftime('%d/%m/%Y', pr.data_programare) as Data,
+           pr.ora_programare as Ora,
+           p.nume || ' ' || p.prenume as Pacient,
+           d.nume || ' ' || d.prenume as Doctor,
+           pr.tip_programare as Tip
+    FROM programare pr
+    JOIN pacient p ON pr.id_pacient = p.id_pacient
+    JOIN doctor d ON pr.id_doctor = d.id_doctor
+    WHERE pr.data_programare BETWEEN date('now', 'localtime') AND date('now', 'localtime', '+7 days')
+    ORDER BY pr.data_programare, pr.ora_programare
+"""
+
+LOCAL_PROGRAMARI_RECENTE = """
+    SELECT p.nume || ' ' || p.prenume as Pacient,
+           d.nume || ' ' || d.prenume as Doctor,
+           s.nume_sectie as Sectie,
+           strftime('%d/%m/%Y', pr.data_programare) as Data,
+           pr.ora_programare as Ora,
+           pr.tip_programare as Tip
+    FROM programare pr
+    JOIN pacient p ON pr.id_pacient = p.id_pacient
+    JOIN doctor d ON pr.id_doctor = d.id_doctor
+    LEFT JOIN sectie s ON pr.id_sectie = s.id_sectie
+    ORDER BY pr.data_programare DESC, pr.ora_programare DESC
+    LIMIT 5
+"""
+
+LOCAL_PACIENTI = """
+    SELECT id_pacient, nume || ' ' || prenume || ' (CNP: ' || CNP || ')' as nume_complet
+    FROM pacient ORDER BY nume, prenume
+"""
+
+LOCAL_DOCTORI = """
+    SELECT id_doctor, nume || ' ' || prenume || ' - ' || specializare as nume_complet
+    FROM doctor ORDER BY nume, prenume
+"""
+
+LOCAL_SECTII = "SELECT id_sectie, nume_sectie FROM sectie ORDER BY nume_sectie"
+
+
+if __name__ == "__main__":
+    # python -m database.offline -> o sincronizare (și trimiterea cozii), fără fir de fundal
+    replica = LocalReplica()
+    if replica.sync():
+        stare = replica.status()
+        print(f"Copie locală sincronizată la {stare['sincronizat']:%H:%M:%S} "
+              f"({stare['in_asteptare']} în așteptare, {stare['conflicte']} conflicte)")
+    else:
+        print(f"Sincronizare eșuată: {replica.eroare}")
+        sys.exit(1)
@@ -0,0 +1,489 @@
+import os
+import sys
+import json
+import random
+import string
+import asyncio
+import hashlib
+import importlib
+import threading
+from datetime import datetime, timedelta
+import pandas as pd
+from database.connection import db
+from database.async_connection import AsyncDatabase
+from database.shared_cache import get_shared_cache
+
+# Se trimit remindere pentru programările din următoarele DAYS_AHEAD zile (de mâine)
+DAYS_AHEAD = int(os.getenv('REMINDER_DAYS_AHEAD', '1'))
+# Câte programări se citesc și se randează dintr-o dată
+BATCH_SIZE = int(os.getenv('REMINDER_BATCH_SIZE', '1000'))
+# Câte trimiteri rulează simultan
+CONCURRENCY = int(os.getenv('REMINDER_CONCURRENCY', '20'))
+# Mesaje pe secundă (limita furnizorului de SMS / email)
+RATE = float(os.getenv('REMINDER_RATE', '50'))
+# Încercări per mesaj într-o rulare și pauza de bază între ele (secunde, exponențială)
+RETRIES = int(os.getenv('REMINDER_RETRIES', '3'))
+BACKOFF = float(os.getenv('REMINDER_BACKOFF', '1'))
+# Timeout pentru un apel către furnizor (secunde)
+SEND_TIMEOUT = float(os.getenv('REMINDER_SEND_TIMEOUT', '10'))
+# După atâtea încercări eșuate (în toate rulările) reminderul e abandonat
+MAX_ATTEMPTS = int(os.getenv('REMINDER_MAX_ATTEMPTS', '9'))
+# Expeditorul: 'file', 'mock' sau 'modul:Clasa'
+SENDER = os.getenv('REMINDER_SENDER', 'file')
+# Fișierul expeditorului 'file' (un mesaj JSON pe linie)
+OUTBOX = os.getenv(
+    'REMINDER_OUTBOX',
+    os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'snapshots', 'remindere.jsonl')
+)
+# Ora zilnică la care rulează trimiterea ('thread' = în procesul Streamlit, 'off' = worker CLI)
+SCHEDULE = os.getenv('REMINDER_SCHEDULE', '09:00')
+SCHEDULER_MODE = os.getenv('REMINDER_SCHEDULER_MODE', 'off')
+# Cât ține lacătul de cluster al unei rulări programate (secunde): expiră
+# dacă worker-ul care l-a luat cade în timpul trimiterii
+LOCK_SECONDS = int(os.getenv('REMINDER_LOCK_SECONDS', '3600'))
+
+# Șabloanele mesajelor: câmpuri simple {camp} din coloanele interogării
+TEMPLATES = {
+    'sms': os.getenv(
+        'REMINDER_TEMPLATE_SMS',
+        "Buna ziua, {prenume} {nume}! Va reamintim programarea ({tip}) din {data} ora {ora} "
+        "la dr. {doctor}, {sectie}."
+    ),
+    'email': os.getenv(
+        'REMINDER_TEMPLATE_EMAIL',
+        "Bună ziua, {prenume} {nume},\n\n"
+        "Vă reamintim programarea dumneavoastră ({tip}) din data de {data}, ora {ora}, "
+        "la dr. {doctor}, secția {sectie}.\n\n"
+        "Dacă nu puteți ajunge, vă rugăm să ne anunțați.\n"
+    ),
+}
+SUBIECT_EMAIL = os.getenv('REMINDER_EMAIL_SUBJECT', 'Reamintire programare {data} {ora}')
+
+REMINDER_DDL = [
+    """
+    IF OBJECT_ID('Reminder', 'U') IS NULL
+    CREATE TABLE Reminder (
+        cheie CHAR(40) NOT NULL PRIMARY KEY,
+        id_programare INT NOT NULL,
+        data_programare DATE NOT NULL,
+        ora_programare TIME NOT NULL,
+        canal VARCHAR(10) NOT NULL,
+        stare VARCHAR(10) NOT NULL,
+        incercari INT NOT NULL DEFAULT 0,
+        eroare NVARCHAR(400) NULL,
+        id_extern NVARCHAR(100) NULL,
+        data_actualizare DATETIME NOT NULL DEFAULT GETDATE()
+    )
+    """,
+    """
+    IF NOT EXISTS (SELECT 1 FROM sys.indexes WHERE name = 'IX_Reminder_programare')
+        CREATE INDEX IX_Reminder_programare ON Reminder (id_programare, data_programare, ora_programare)
+    """,
+]
+
+# Selecția remindere-lor e o căutare pe interval de date
+PROGRAMARE_INDEX_DDL = """
+    IF NOT EXISTS (SELECT 1 FROM sys.indexes WHERE name = 'IX_Programare_data')
+        CREATE INDEX IX_Programare_data ON Programare (data_programare, ora_programare)
+        INCLUDE (id_pacient, id_doctor, id_sectie, tip_programare)
+"""
+
+# O singură interogare pe interval: programările de trimis, fără cele deja
+# trimise sau abandonate (o programare mutată primește un reminder nou)
+DUE_QUERY = """
+    SELECT
+        pr.id_programare,
+        pr.data_programare,
+        pr.ora_programare,
+        CONVERT(VARCHAR(10), pr.data_programare, 104) as data,
+        CONVERT(VARCHAR(5), pr.ora_programare, 108) as ora,
+        pr.tip_programare as tip,
+        p.nume,
+        p.prenume,
+        p.telefon,
+        p.email,
+        d.nume + ' ' + d.prenume as doctor,
+        ISNULL(s.nume_sectie, '') as sectie
+    FROM Programare pr
+    JOIN Pacient p ON pr.id_pacient = p.id_pacient
+    JOIN Doctor d ON pr.id_doctor = d.id_doctor
+    LEFT JOIN Sectie s ON s.id_sectie = ISNULL(pr.id_sectie, d.id_sectie)
+    WHERE pr.data_programare >= ? AND pr.data_programare < ?
+      AND NOT EXISTS (
+        SELECT 1 FROM Reminder r
+        WHERE r.id_programare = pr.id_programare
+          AND r.data_programare = pr.data_programare
+          AND r.ora_programare = pr.ora_programare
+          AND r.stare IN ('trimis', 'abandonat')
+      )
+    ORDER BY pr.data_programare, pr.ora_programare
+"""
+
+# Starea livrărilor, scrisă pe loturi (un MERGE per mesaj, o tranzacție per lot)
+STATE_MERGE = f"""
+    MERGE Reminder AS t
+    USING (SELECT ? as cheie, ? as id_programare, ? as data_programare, ? as ora_programare,
+                  ? as canal, ? as stare, ? as incercari, ? as eroare, ? as id_extern) AS s
+    ON t.cheie = s.cheie
+    WHEN MATCHED THEN UPDATE SET
+        stare = CASE WHEN s.stare = 'esuat' AND t.incercari + s.incercari >= {MAX_ATTEMPTS}
+                     THEN 'abandonat' ELSE s.stare END,
+        incercari = t.incercari + s.incercari,
+        eroare = s.eroare,
+        id_extern = s.id_extern,
+        data_actualizare = GETDATE()
+    WHEN NOT MATCHED THEN
+        INSERT (cheie, id_programare, data_programare, ora_programare, canal, stare, incercari,
+                eroare, id_extern)
+        VALUES (s.cheie, s.id_programare, s.data_programare, s.ora_programare, s.canal,
+                CASE WHEN s.stare = 'esuat' AND s.incercari >= {MAX_ATTEMPTS}
+                     THEN 'abandonat' ELSE s.stare END,
+                s.incercari, s.eroare, s.id_extern);
+"""
+
+
+class PermanentSendError(Exception):
+    """Eroare de trimitere care nu trebuie reîncercată (ex: număr invalid)"""
+
+
+def ensure_reminder_schema():
+    """Creează tabelul Reminder și indexul pe data programării (dacă lipsesc)"""
+    for ddl in REMINDER_DDL:
+        db.execute_query(ddl)
+    try:
+        db.execute_query(PROGRAMARE_INDEX_DDL)
+    except Exception:
+        # Fără drept de CREATE INDEX: selecția merge și fără, doar mai lent
+        pass
+
+
+# ===== RANDARE =====
+
+def _compile(template):
+    return [(literal, camp) for literal, camp, _, _ in string.Formatter().parse(template)]
+
+
+def render_batch(template, df):
+    """Randează șablonul pentru tot lotul deodată (concatenare pe coloane)"""
+    rezultat = pd.Series('', index=df.index, dtype=object)
+    for literal, camp in _compile(template):
+        if literal:
+            rezultat = rezultat + literal
+        if camp:
+            rezultat = rezultat + df[camp].fillna('').astype(str)
+    return rezultat
+
+
+def idempotency_key(id_programare, data_programare, ora_programare, canal):
+    """Aceeași programare (la aceeași dată și oră) pe același canal -> aceeași cheie"""
+    text = f"{int(id_programare)}|{pd.Timestamp(data_programare):%Y-%m-%d}|{ora_programare}|{canal}"
+    return hashlib.sha1(text.encode('utf-8')).hexdigest()
+
+
+def build_messages(df):
+    """Lot de programări -> lista de mesaje (SMS dacă există telefon, altfel email)"""
+    telefon = df['telefon'].fillna('').astype(str).str.strip()
+    email = df['email'].fillna('').astype(str).str.strip()
+    canal = pd.Series('', index=df.index, dtype=object)
+    canal[email != ''] = 'email'
+    canal[telefon != ''] = 'sms'
+    df = df[canal != '']
+    canal = canal[canal != '']
+
+    mesaje = []
+    for nume_canal in ('sms', 'email'):
+        parte = df[canal == nume_canal]
+        if parte.empty:
+            continue
+        texte = render_batch(TEMPLATES[nume_canal], parte)
+        subiecte = render_batch(SUBIECT_EMAIL, parte) if nume_canal == 'email' else None
+        destinatari = (telefon if nume_canal == 'sms' else email)[parte.index]
+        for i, rand in enumerate(parte.itertuples(index=False)):
+            mesaje.append({
+                'cheie': idempotency_key(rand.id_programare, rand.data_programare,
+                                         rand.ora_programare, nume_canal),
+                'id_programare': int(rand.id_programare),
+                'data_programare': pd.Timestamp(rand.data_programare).date(),
+                'ora_programare': rand.ora_programare,
+                'canal': nume_canal,
+                'destinatar': destinatari.iloc[i],
+                'subiect': subiecte.iloc[i] if subiecte is not None else None,
+                'text': texte.iloc[i],
+            })
+    return mesaje
+
+
+# ===== EXPEDITORI =====
+
+class FileSender:
+    """Scrie mesajele într-un fișier JSONL (pentru teste și medii fără furnizor).
+
+    Respectă cheia de idempotență: un mesaj cu o cheie deja scrisă nu se
+    mai scrie a doua oară, ca un furnizor real care deduplică.
+    """
+
+    def __init__(self, path=OUTBOX):
+        self.path = path
+        os.makedirs(os.path.dirname(self.path), exist_ok=True)
+        self._chei = set()
+        if os.path.exists(self.path):
+            with open(self.path, encoding='utf-8') as f:
+                for linie in f:
+                    try:
+                        self._chei.add(json.loads(linie)['cheie'])
+                    except (ValueError, KeyError):
+                        pass
+        self._lock = asyncio.Lock()
+
+    async def send(self, mesaj):
+        async with self._lock:
+            if mesaj['cheie'] not in self._chei:
+                with open(self.path, 'a', encoding='utf-8') as f:
+                    f.write(json.dumps({
+                        'cheie': mesaj['cheie'],
+                        'canal': mesaj['canal'],
+                        'destinatar': mesaj['destinatar'],
+                        'subiect': mesaj['subiect'],
+                        'text': mesaj['text'],
+                        'trimis': datetime.now().isoformat(timespec='seconds'),
+                    }, ensure_ascii=False) + '\n')
+                self._chei.add(mesaj['cheie'])
+        return mesaj['cheie']
+
+
+class MockSender:
+    """Expeditor în memorie, cu latență și erori simulate (pentru teste de încărcare)"""
+
+    def __init__(self, latenta=0.01, rata_erori=0.0):
+        self.latenta = latenta
+        self.rata_erori = rata_erori
+        self.trimise = {}
+
+    async def send(self, mesaj):
+        await asyncio.sleep(self.latenta)
+        if random.random() < self.rata_erori:
+            raise ConnectionError("eroare simulată")
+        self.trimise.setdefault(mesaj['cheie'], mesaj)
+        return mesaj['cheie']
+
+
+def get_sender(nume=SENDER):
+    """Expeditorul configurat: 'file', 'mock' sau 'modul:Clasa' (clasă cu async send(mesaj))"""
+    if nume == 'file':
+        return FileSender()
+    if nume == 'mock':
+        return MockSender()
+    modul, clasa = nume.split(':')
+    return getattr(importlib.import_module(modul), clasa)()
+
+
+# ===== TRIMITERE =====
+
+class RateLimiter:
+    """Token bucket: cel mult `rata` mesaje pe secundă, cu rafale de până la `rafala`"""
+
+    def __init__(self, rata=RATE, rafala=None):
+        self.rata = rata
+        self.rafala = rafala or max(1.0, rata)
+        self._jetoane = self.rafala
+        self._ultim = None
+        self._lock = asyncio.Lock()
+
+    async def acquire(self):
+        async with self._lock:
+            loop = asyncio.get_running_loop()
+            acum = loop.time()
+            if self._ultim is not None:
+                self._jetoane = min(self.rafala, self._jetoane + (acum - self._ultim) * self.rata)
+            self._ultim = acum
+            if self._jetoane < 1:
+                await asyncio.sleep((1 - self._jetoane) / self.rata)
+                self._ultim = loop.time()
+                self._jetoane = 1
+            self._jetoane -= 1
+
+
+class ReminderDispatcher:
+    """Trimite remindere-le scadente: citire pe loturi, randare, trimitere, stare.
+
+    Programările se citesc cu db.stream într-un fir separat și intră într-o
+    coadă mărginită (memorie constantă oricâte rânduri sunt). Fiecare lot se
+    randează dintr-o dată, apoi mesajele pleacă prin cel mult `concurenta`
+    trimiteri simultane, limitate la `rata` pe secundă, cu reîncercări și
+    pauză exponențială. Stările se scriu în Reminder pe loturi, prin
+    AsyncDatabase, în timp ce lotul următor se trimite deja.
+    """
+
+    def __init__(self, sender=None, concurenta=CONCURRENCY, rata=RATE, incercari=RETRIES,
+                 batch_size=BATCH_SIZE, scrie_stare=True):
+        self.sender = sender or get_sender()
+        self.concurenta = concurenta
+        self.rata = rata
+        self.incercari = incercari
+        self.batch_size = batch_size
+        self.scrie_stare = scrie_stare
+        self.statistici = {'selectate': 0, 'trimise': 0, 'esuate': 0, 'fara_contact': 0}
+        self._oprit = threading.Event()
+
+    async def _send_one(self, mesaj, sem, limiter):
+        eroare = None
+        for incercare in range(1, self.incercari + 1):
+            async with sem:
+                await limiter.acquire()
+                try:
+                    id_extern = await asyncio.wait_for(self.sender.send(mesaj), SEND_TIMEOUT)
+                    return dict(mesaj, stare='trimis', incercari=incercare, eroare=None,
+                                id_extern=None if id_extern is None else str(id_extern))
+                except PermanentSendError as e:
+                    return dict(mesaj, stare='esuat', incercari=MAX_ATTEMPTS, eroare=str(e)[:400],
+                                id_extern=None)
+                except Exception as e:
+                    eroare = str(e) or type(e).__name__
+            if incercare < self.incercari:
+                await asyncio.sleep(BACKOFF * 2 ** (incercare - 1) * (0.5 + random.random()))
+        return dict(mesaj, stare='esuat', incercari=self.incercari, eroare=eroare[:400], id_extern=None)
+
+    async def _write_states(self, adb, rezultate):
+        if not self.scrie_stare or not rezultate:
+            return
+        await adb.executemany(STATE_MERGE, [
+            (r['cheie'], r['id_programare'], r['data_programare'], r['ora_programare'],
+             r['canal'], r['stare'], r['incercari'], r['eroare'], r['id_extern'])
+            for r in rezultate
+        ])
+
+    def _produce(self, loop, coada, start, end):
+        """Rulează în fir separat: citește loturile și le pune în coada asyncio"""
+        loturi = db.stream(DUE_QUERY, (start, end), batch_size=self.batch_size, as_frame=True)
+        try:
+            for lot in loturi:
+                if self._oprit.is_set():
+                    break
+                asyncio.run_coroutine_threadsafe(coada.put(lot), loop).result()
+        finally:
+            # Oprire timpurie: db.stream anulează interogarea și eliberează conexiunea
+            loturi.close()
+            asyncio.run_coroutine_threadsafe(coada.put(None), loop).result()
+
+    async def run(self, start=None, end=None):
+        """Trimite remindere-le pentru programările din [start, end); implicit următoarele DAYS_AHEAD zile"""
+        azi = datetime.now().date()
+        start = start or azi + timedelta(days=1)
+        end = end or start + timedelta(days=DAYS_AHEAD)
+        loop = asyncio.get_running_loop()
+        coada = asyncio.Queue(maxsize=2)
+        sem = asyncio.Semaphore(self.concurenta)
+        limiter = RateLimiter(self.rata)
+        adb = AsyncDatabase(pool_size=2)
+        producator = loop.run_in_executor(None, self._produce, loop, coada, start, end)
+        scriere = None
+        try:
+            while True:
+                lot = await coada.get()
+                if lot is None:
+                    break
+                self.statistici['selectate'] += len(lot)
+                mesaje = build_messages(lot)
+                self.statistici['fara_contact'] += len(lot) - len(mesaje)
+                rezultate = await asyncio.gather(*(self._send_one(m, sem, limiter) for m in mesaje))
+                for r in rezultate:
+                    self.statistici['trimise' if r['stare'] == 'trimis' else 'esuate'] += 1
+                # Starea lotului se scrie în paralel cu trimiterea lotului următor
+                if scriere is not None:
+                    await scriere
+                scriere = asyncio.ensure_future(self._write_states(adb, rezultate))
+            if scriere is not None:
+                await scriere
+            await producator
+        finally:
+            # La eroare: producătorul se oprește, iar coada golită îl deblochează
+            self._oprit.set()
+            while not coada.empty():
+                coada.get_nowait()
+            await adb.close()
+        return self.statistici
+
+
+def dispatch_reminders(start=None, end=None, sender=None, **kwargs):
+    """Rulare sincronă (worker CLI / fir de fundal), într-o buclă asyncio proprie"""
+    ensure_reminder_schema()
+    return asyncio.run(ReminderDispatcher(sender=sender, **kwargs).run(start, end))
+
+
+def reminder_stats(zile=7):
+    """Câte remindere pe zi și stare în ultimele `zile` zile"""
+    query = """
+        SELECT CAST(data_actualizare AS DATE) as Zi, canal as Canal, stare as Stare, COUNT(*) as Numar
+        FROM Reminder
+        WHERE data_actualizare >= DATEADD(day, -?, CAST(GETDATE() AS DATE))
+        GROUP BY CAST(data_actualizare AS DATE), canal, stare
+        ORDER BY Zi DESC, Canal, Stare
+    """
+    return db.fetch_dataframe(query, params=(int(zile),))
+
+
+# ===== PROGRAMATOR =====
+
+class ReminderScheduler:
+    """Fir de fundal care trimite remindere-le zilnic la ora din REMINDER_SCHEDULE"""
+
+    def __init__(self, schedule=SCHEDULE):
+        self.ora = datetime.strptime(schedule.strip(), '%H:%M').time()
+        self._stop = threading.Event()
+        self._thread = None
+
+    def next_run(self, acum):
+        moment = datetime.combine(acum.date(), self.ora)
+        return moment if moment > acum else moment + timedelta(days=1)
+
+    def run(self):
+        while not self._stop.is_set():
+            asteptare = (self.next_run(datetime.now()) - datetime.now()).total_seconds()
+            if self._stop.wait(max(asteptare, 1)):
+                break
+            try:
+                # Cu mai mulți worker-i (sau și un daemon CLI) trimite unul singur;
+                # o rulare ulterioară oricum sare peste remindere-le deja trimise
+                with get_shared_cache().lock('remindere:dispatch', ttl=LOCK_SECONDS) as obtinut:
+                    if obtinut:
+                        dispatch_reminders()
+            except Exception as e:
+                print(f"Eroare la trimiterea remindere-lor: {e}", file=sys.stderr)
+
+    def start(self):
+        if self._thread is None or not self._thread.is_alive():
+            self._stop.clear()
+            self._thread = threading.Thread(target=self.run, name="reminder-scheduler", daemon=True)
+            self._thread.start()
+
+    def stop(self):
+        self._stop.set()
+
+
+_scheduler = None
+_scheduler_lock = threading.Lock()
+
+
+def start_scheduler():
+    """Pornește programatorul în proces (o singură dată), dacă REMINDER_SCHEDULER_MODE=thread"""
+    global _scheduler
+    if SCHEDULER_MODE != 'thread':
+        return
+    with _scheduler_lock:
+        if _scheduler is None:
+            _scheduler = ReminderScheduler()
+        _scheduler.start()
+
+
+if __name__ == "__main__":
+    # Worker separat:
+    #   python -m database.reminders           -> o rulare (programările de mâine)
+    #   python -m database.reminders --daemon  -> zilnic la REMINDER_SCHEDULE
+    #   python -m database.reminders --mock    -> expeditor simulat, fără scrierea stării
+    if '--daemon' in sys.argv:
+        ReminderScheduler().run()
+    else:
+        mock = '--mock' in sys.argv
+        rezultat = dispatch_reminders(sender=MockSender() if mock else None, scrie_stare=not mock)
+        print(f"{rezultat['selectate']} programări: {rezultat['trimise']} trimise, "
+              f"{rezultat['esuate']} eșuate, {rezultat['fara_contact']} fără telefon / email")
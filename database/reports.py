@@ -0,0 +1,176 @@
+import pandas as pd
+from database.connection import db
+from database.cube import get_cube
+from database.archive import source
+
+# Seturile de date din pagina Rapoarte, fără dependență de Streamlit, ca să
+# poată fi calculate și de worker-ul de snapshot-uri. Toate primesc
+# (start, end); cele care nu depind de perioadă ignoră parametrii.
+# Toate citirile sunt sigure pentru replica de citire.
+
+
+def _count(query):
+    df = db.fetch_dataframe(query, replica=True)
+    return int(df['total'].iloc[0]) if not df.empty else 0
+
+
+def statistics_overview(start=None, end=None):
+    """Statistici generale (un singur rând)"""
+    stats = {
+        'total_pacienti': _count("SELECT COUNT(*) as total FROM Pacient"),
+        'total_doctori': _count("SELECT COUNT(*) as total FROM Doctor"),
+        'total_programari': _count(f"SELECT COUNT(*) as total FROM {source('Programare')}"),
+        'total_diagnostice': _count(f"SELECT COUNT(*) as total FROM {source('Diagnostic')}"),
+        'programari_luna': _count("""
+            SELECT COUNT(*) as total
+            FROM Programare
+            WHERE MONTH(data_programare) = MONTH(GETDATE())
+            AND YEAR(data_programare) = YEAR(GETDATE())
+        """),
+        'pacienti_internati': _count("""
+            SELECT COUNT(*) as total
+            FROM Pacient
+            WHERE data_internare IS NOT NULL AND data_externare IS NULL
+        """),
+    }
+    return pd.DataFrame([stats])
+
+
+def distributie_gen(start=None, end=None):
+    """Distribuție pacienți pe gen"""
+    query = """
+        SELECT
+            gen as Gen,
+            COUNT(*) as Numar
+        FROM Pacient
+        GROUP BY gen
+    """
+    df = db.fetch_dataframe(query, replica=True)
+    if not df.empty:
+        df['Gen'] = df['Gen'].map({'M': 'Masculin', 'F': 'Feminin'})
+    return df
+
+
+def pacienti_pe_sectie(start=None, end=None):
+    """Număr pacienți per secție"""
+    query = """
+        SELECT
+            s.nume_sectie as Sectie,
+            COUNT(p.id_pacient) as [Număr Pacienți]
+        FROM Sectie s
+        LEFT JOIN Pacient p ON s.id_sectie = p.id_sectie
+        GROUP BY s.nume_sectie
+        ORDER BY COUNT(p.id_pacient) DESC
+    """
+    return db.fetch_dataframe(query, replica=True)
+
+
+def statistici_programari(start=None, end=None):
+    """Total / viitoare / trecute / astăzi (inclusiv programările arhivate)"""
+    query = f"""
+        SELECT
+            COUNT(*) as Total,
+            SUM(CASE WHEN data_programare >= CAST(GETDATE() AS DATE) THEN 1 ELSE 0 END) as Viitoare,
+            SUM(CASE WHEN data_programare < CAST(GETDATE() AS DATE) THEN 1 ELSE 0 END) as Trecute,
+            SUM(CASE WHEN CAST(data_programare AS DATE) = CAST(GETDATE() AS DATE) THEN 1 ELSE 0 END) as Astazi
+        FROM {source('Programare')}
+    """
+    return db.fetch_dataframe(query, replica=True)
+
+
+def programari_recente(start=None, end=None):
+    """Ultimele 20 de programări"""
+    query = """
+        SELECT TOP 20
+            p.nume + ' ' + p.prenume as Pacient,
+            d.nume + ' ' + d.prenume as Doctor,
+            pr.tip_programare as Tip,
+            CONVERT(VARCHAR, pr.data_programare, 103) as Data,
+            CONVERT(VARCHAR(5), pr.ora_programare, 108) as Ora
+        FROM Programare pr
+        JOIN Pacient p ON pr.id_pacient = p.id_pacient
+        JOIN Doctor d ON pr.id_doctor = d.id_doctor
+        ORDER BY pr.data_programare DESC, pr.ora_programare DESC
+    """
+    return db.fetch_dataframe(query, replica=True)
+
+
+def top_doctori(start=None, end=None):
+    """Top 10 doctori după număr de programări"""
+    df = get_cube().aggregate('programari', ['doctor', 'specializare'], start, end)
+    df = df.sort_values('Numar', ascending=False).head(10)
+    return df.rename(columns={
+        'doctor': 'Doctor',
+        'specializare': 'Specializare',
+        'Numar': 'Număr Programări'
+    })
+
+
+def top_boli(start=None, end=None):
+    """Top 10 cele mai frecvente boli"""
+    df = get_cube().aggregate('diagnostice', ['boala'], start, end, severe=True)
+    df = df.sort_values('Numar', ascending=False).head(10)
+    return df.rename(columns={
+        'boala': 'Boala',
+        'Numar': 'Număr Cazuri',
+        'Severe': 'Cazuri Severe'
+    })
+
+
+def programari_pe_luna(start=None, end=None):
+    """Programări pe luni"""
+    df = get_cube().aggregate('programari', ['luna'], start, end)
+    df = df.sort_values('luna')
+    return df.rename(columns={'luna': 'Luna', 'Numar': 'Număr Programări'})
+
+
+def severitate_diagnostice(start=None, end=None):
+    """Distribuție diagnostice pe severitate"""
+    df = get_cube().aggregate('diagnostice', ['severitate'], start, end)
+    return df.rename(columns={'severitate': 'Severitate'})
+
+
+def programari_per_tip(start=None, end=None):
+    """Programări pe tipuri"""
+    df = get_cube().aggregate('programari', ['tip'], start, end)
+    df = df.sort_values('Numar', ascending=False)
+    return df.rename(columns={'tip': 'Tip'})
+
+
+def activitate_doctori(start=None, end=None):
+    """Activitate doctori - programări și diagnostice"""
+    cube = get_cube()
+    df_prog = cube.aggregate('programari', ['doctor', 'specializare'], start, end)
+    df_diag = cube.aggregate('diagnostice', ['doctor', 'specializare'], start, end)
+    df = pd.merge(
+        df_prog.rename(columns={'Numar': 'Programari'}),
+        df_diag.rename(columns={'Numar': 'Diagnostice'}),
+        on=['doctor', 'specializare'],
+        how='outer'
+    )
+    df[['Programari', 'Diagnostice']] = df[['Programari', 'Diagnostice']].fillna(0).astype(int)
+    df = df.sort_values('Programari', ascending=False)
+    return df.rename(columns={'doctor': 'Doctor', 'specializare': 'Specializare'})
+
+
+def distributie_ore(start=None, end=None):
+    """Programări pe ora zilei"""
+    df = get_cube().aggregate('programari', ['ora'], start, end)
+    return df.sort_values('ora').rename(columns={'ora': 'Ora'})
+
+
+# Toate seturile de date precalculate în snapshot-uri
+DATASETS = {
+    'statistics_overview': statistics_overview,
+    'distributie_gen': distributie_gen,
+    'pacienti_pe_sectie': pacienti_pe_sectie,
+    'statistici_programari': statistici_programari,
+    'programari_recente': programari_recente,
+    'top_doctori': top_doctori,
+    'top_boli': top_boli,
+    'programari_pe_luna': programari_pe_luna,
+    'severitate_diagnostice': severitate_diagnostice,
+    'programari_per_tip': programari_per_tip,
+    'activitate_doctori': activitate_doctori,
+    'distributie_ore': distributie_ore,
+}
@@ -0,0 +1,385 @@
+import os
+import re
+import sys
+import json
+import bisect
+import heapq
+import threading
+import time
+import unicodedata
+from datetime import datetime
+from database.connection import db
+from database import changes
+from database.shared_cache import get_shared_cache
+
+# Index inversat comun (per proces) peste pacienți, doctori, specializări,
+# secții și cauzele programărilor. Termenii sunt fără diacritice și ținuți
+# sortați, deci un prefix devine un interval găsit cu bisect.
+INDEX_PATH = os.getenv(
+    'SEARCH_INDEX_PATH',
+    os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'snapshots', 'cautare.json')
+)
+# Verificarea ChangeLog-ului e cel mult o dată la SYNC_SECONDS; scrierile din
+# aplicație (execute_tracked) marchează indexul imediat, prin cache-ul comun
+SYNC_SECONDS = int(os.getenv('SEARCH_SYNC_SECONDS', '30'))
+# Cât de des se rescrie copia de pe disc, dacă indexul s-a schimbat
+PERSIST_SECONDS = int(os.getenv('SEARCH_PERSIST_SECONDS', '300'))
+MAX_RESULTS = 50
+FORMAT = 2
+
+ETICHETE = {
+    'pacient': 'Pacient',
+    'doctor': 'Doctor',
+    'specializare': 'Specializare',
+    'sectie': 'Secție',
+    'programare': 'Programare',
+}
+# Ordinea tipurilor la scor egal
+_ORDINE = {tip: i for i, tip in enumerate(ETICHETE)}
+
+# tip: (tabela, query, expresie_id). query are marcajul {filtru} ca în TrackedFrame.
+SURSE = {
+    'pacient': ('Pacient', """
+        SELECT p.id_pacient, p.nume, p.prenume, p.CNP, p.telefon
+        FROM Pacient p
+        {filtru}
+    """, 'p.id_pacient'),
+    'doctor': ('Doctor', """
+        SELECT d.id_doctor, d.nume, d.prenume, d.specializare, d.telefon
+        FROM Doctor d
+        {filtru}
+    """, 'd.id_doctor'),
+    'sectie': ('Sectie', """
+        SELECT s.id_sectie, s.nume_sectie
+        FROM Sectie s
+        {filtru}
+    """, 's.id_sectie'),
+    'programare': ('Programare', """
+        SELECT pr.id_programare, pr.cauza,
+               CONVERT(VARCHAR, pr.data_programare, 103), pr.tip_programare
+        FROM Programare pr
+        {filtru}
+    """, 'pr.id_programare'),
+}
+
+
+def fold(text):
+    """Litere mici, fără diacritice (ș/ş, ț/ţ, ă, â, î), doar litere și cifre"""
+    if not text:
+        return ''
+    text = unicodedata.normalize('NFKD', str(text).lower())
+    text = ''.join(c for c in text if not unicodedata.combining(c))
+    return re.sub(r'[^a-z0-9]+', ' ', text).strip()
+
+
+def _text(*valori):
+    return ' '.join(str(v) for v in valori if v)
+
+
+def _document(tip, rand):
+    """(id, titlu, detaliu, text_indexat, grup) pentru un rând din SURSE; None = nu se indexează"""
+    if tip == 'pacient':
+        id_, nume, prenume, cnp, telefon = rand
+        return id_, _text(nume, prenume), f"CNP {cnp}" if cnp else '', \
+            _text(nume, prenume, cnp, telefon), ''
+    if tip == 'doctor':
+        id_, nume, prenume, specializare, telefon = rand
+        return id_, f"Dr. {_text(nume, prenume)}", specializare or '', \
+            _text(nume, prenume, specializare, telefon), (specializare or '').strip()
+    if tip == 'sectie':
+        id_, nume_sectie = rand
+        return id_, nume_sectie or '', '', nume_sectie, ''
+    id_, cauza, data, tip_programare = rand
+    if not cauza or not cauza.strip():
+        return None
+    return id_, cauza.strip(), _text(data, tip_programare), cauza, ''
+
+
+class SearchIndex:
+    """Index inversat termen -> chei (tip, id), actualizat incremental din ChangeLog.
+
+    Interogarea: fiecare cuvânt e un prefix; un rezultat trebuie să conțină
+    toate cuvintele. Scorul numără cuvintele găsite exact (nu doar ca prefix).
+    Specializările nu au tabel propriu - sunt documente derivate din doctori.
+    """
+
+    def __init__(self, path=INDEX_PATH):
+        self.path = path
+        self.versiune = None
+        self._docs = {}
+        self._postari = {}
+        self._termeni = []
+        self._specializari = {}
+        self._incarcat = False
+        self._murdare = set()
+        self._ultima_sincronizare = 0
+        self._salvat_la = 0
+        self._versiune_salvata = None
+        self._lock = threading.Lock()
+        tabele = {tabela for tabela, _, _ in SURSE.values()}
+        get_shared_cache().on_invalidate(
+            lambda tabela: self._murdare.add(tabela) if tabela in tabele else None
+        )
+
+    # ----- documente și postări -----
+
+    def _adauga(self, cheie, titlu, detaliu, termeni, grup='', masa=False):
+        self._sterge(cheie, masa)
+        self._docs[cheie] = (titlu, detaliu, termeni, grup)
+        for termen in termeni:
+            chei = self._postari.get(termen)
+            if chei is None:
+                chei = self._postari[termen] = set()
+                if not masa:
+                    bisect.insort(self._termeni, termen)
+            chei.add(cheie)
+        if grup:
+            self._specializari.setdefault(grup, set()).add(cheie[1])
+            self._adauga_specializare(grup, masa)
+
+    def _sterge(self, cheie, masa=False):
+        doc = self._docs.pop(cheie, None)
+        if doc is None:
+            return
+        for termen in doc[2]:
+            chei = self._postari.get(termen)
+            if chei is None:
+                continue
+            chei.discard(cheie)
+            if not chei:
+                del self._postari[termen]
+                if not masa:
+                    i = bisect.bisect_left(self._termeni, termen)
+                    if i < len(self._termeni) and self._termeni[i] == termen:
+                        del self._termeni[i]
+        grup = doc[3]
+        if grup:
+            doctori = self._specializari.get(grup, set())
+            doctori.discard(cheie[1])
+            if not doctori:
+                self._specializari.pop(grup, None)
+                self._sterge(('specializare', grup), masa)
+            else:
+                self._adauga_specializare(grup, masa)
+
+    def _adauga_specializare(self, grup, masa):
+        cheie = ('specializare', grup)
+        numar = len(self._specializari[grup])
+        detaliu = f"{numar} doctor" if numar == 1 else f"{numar} doctori"
+        doc = self._docs.get(cheie)
+        if doc is not None:
+            # Se schimbă doar numărul de doctori - termenii rămân aceiași
+            self._docs[cheie] = (doc[0], detaliu, doc[2], '')
+            return
+        self._adauga(cheie, grup, detaliu, tuple(dict.fromkeys(fold(grup).split())), masa=masa)
+
+    def _adauga_rand(self, tip, rand, masa=False):
+        doc = _document(tip, rand)
+        if doc is None:
+            return
+        id_, titlu, detaliu, text, grup = doc
+        termeni = tuple(dict.fromkeys(fold(text).split()))
+        self._adauga((tip, int(id_)), titlu, detaliu, termeni, grup, masa)
+
+    # ----- încărcare din baza de date -----
+
+    def _fetch(self, tip, endpoint, ids=None):
+        _, query, expresie_sql = SURSE[tip]
+        if ids is None:
+            _, randuri = db.fetch_data(query.format(filtru=""), endpoint=endpoint)
+            return randuri
+        ids = sorted(ids)
+        randuri = []
+        for i in range(0, len(ids), changes.IN_CHUNK):
+            chunk = ids[i:i + changes.IN_CHUNK]
+            filtru = f"WHERE {expresie_sql} IN ({', '.join('?' * len(chunk))})"
+            _, bucata = db.fetch_data(query.format(filtru=filtru), tuple(chunk), endpoint=endpoint)
+            randuri.extend(bucata)
+        return randuri
+
+    def _reload(self, tip, endpoint):
+        randuri = self._fetch(tip, endpoint)
+        for cheie in [c for c in self._docs if c[0] == tip]:
+            self._sterge(cheie, masa=True)
+        for rand in randuri:
+            self._adauga_rand(tip, rand, masa=True)
+        self._termeni = sorted(self._postari)
+
+    def _update(self, tip, endpoint, ids):
+        randuri = self._fetch(tip, endpoint, ids)
+        # Rândurile șterse nu mai vin din SQL - scoatem toate ID-urile, apoi le readăugăm
+        for id_ in ids:
+            self._sterge((tip, int(id_)))
+        for rand in randuri:
+            self._adauga_rand(tip, rand)
+
+    def _sync(self):
+        endpoint = db.read_endpoint(replica=True)
+        murdare, self._murdare = self._murdare, set()
+        if not self._incarcat:
+            self._incarcat = True
+            self.load()
+        if not changes.ensure_changelog():
+            # Fără jurnal: se reconstruiesc doar tipurile ale căror tabele s-au modificat
+            self.versiune = None
+            for tip, (tabela, _, _) in SURSE.items():
+                if tabela in murdare or not any(c[0] == tip for c in self._docs):
+                    self._reload(tip, endpoint)
+            return
+        versiune = changes.get_current_version(endpoint)
+        if self.versiune is None:
+            for tip in SURSE:
+                self._reload(tip, endpoint)
+        elif versiune != self.versiune:
+            tabele = {tabela: tip for tip, (tabela, _, _) in SURSE.items()}
+            modificari = changes.get_changes_since(self.versiune, set(tabele), endpoint)
+            for tabela, ids in modificari.items():
+                if len(ids) > changes.MAX_IDS_INCREMENTAL:
+                    self._reload(tabele[tabela], endpoint)
+                else:
+                    self._update(tabele[tabela], endpoint, ids)
+        self.versiune = versiune
+
+    def sync(self, force=False):
+        """Aduce indexul la zi (imediat după o scriere, altfel cel mult o dată la SYNC_SECONDS)"""
+        if not force and not self._murdare and self._incarcat \
+                and time.monotonic() - self._ultima_sincronizare < SYNC_SECONDS:
+            return
+        with self._lock:
+            self._sync()
+            self._ultima_sincronizare = time.monotonic()
+        if self.versiune is not None and self.versiune != self._versiune_salvata \
+                and time.monotonic() - self._salvat_la >= PERSIST_SECONDS:
+            self.save()
+
+    # ----- copia de pe disc -----
+
+    def save(self):
+        """Scrie documentele și marcajul ChangeLog (un singur worker odată)"""
+        with get_shared_cache().lock('cautare:index', ttl=600) as obtinut:
+            if not obtinut:
+                return False
+            with self._lock:
+                versiune = self.versiune
+                docs = [[tip, id_, titlu, detaliu, ' '.join(termeni), grup]
+                        for (tip, id_), (titlu, detaliu, termeni, grup) in self._docs.items()
+                        if tip != 'specializare']
+            if versiune is None:
+                return False
+            os.makedirs(os.path.dirname(self.path), exist_ok=True)
+            tmp = f"{self.path}.{os.getpid()}.tmp"
+            with open(tmp, 'w', encoding='utf-8') as f:
+                json.dump({'format': FORMAT, 'versiune': versiune,
+                           'creat': datetime.now().isoformat(timespec='seconds'), 'docs': docs},
+                          f, ensure_ascii=False, separators=(',', ':'))
+            os.replace(tmp, self.path)
+        self._versiune_salvata = versiune
+        self._salvat_la = time.monotonic()
+        return True
+
+    def load(self):
+        """Pornește din copia de pe disc; sincronizarea aplică apoi doar delta din ChangeLog"""
+        try:
+            with open(self.path, encoding='utf-8') as f:
+                copie = json.load(f)
+        except (OSError, ValueError):
+            return False
+        if copie.get('format') != FORMAT:
+            return False
+        self._docs, self._postari, self._specializari = {}, {}, {}
+        for tip, id_, titlu, detaliu, termeni, grup in copie['docs']:
+            self._adauga((tip, id_), titlu, detaliu, tuple(termeni.split()), grup, masa=True)
+        self._termeni = sorted(self._postari)
+        self.versiune = self._versiune_salvata = copie['versiune']
+        self._salvat_la = time.monotonic()
+        return True
+
+    # ----- căutare -----
+
+    def _prefix(self, termen):
+        i = bisect.bisect_left(self._termeni, termen)
+        j = bisect.bisect_left(self._termeni, termen + '\uffff')
+        return self._termeni[i:j]
+
+    def search(self, text, tipuri=None, limit=MAX_RESULTS):
+        """Rezultatele ordonate după scor: listă de dict (tip, id, titlu, detaliu).
+
+        Dacă baza de date nu răspunde, se caută în indexul existent.
+        limit=None întoarce toate potrivirile.
+        """
+        cuvinte = list(dict.fromkeys(fold(text).split()))
+        if not cuvinte:
+            return []
+        try:
+            self.sync()
+        except Exception as e:
+            if not self._docs:
+                raise
+            print(f"Indexul de căutare nu s-a putut actualiza: {e}", file=sys.stderr)
+        with self._lock:
+            # Doar cuvântul cu cele mai puține potriviri trece prin postări; pentru
+            # celelalte se verifică termenii documentelor candidate
+            prefixe = {cuvant: self._prefix(cuvant) for cuvant in cuvinte}
+            marime = {cuvant: sum(len(self._postari[t]) for t in termeni)
+                      for cuvant, termeni in prefixe.items()}
+            primul = min(cuvinte, key=marime.get)
+            gasite = set().union(*(self._postari[t] for t in prefixe[primul]))
+            if tipuri is not None:
+                gasite = {cheie for cheie in gasite if cheie[0] in tipuri}
+            restul = [cuvant for cuvant in cuvinte if cuvant != primul]
+            if restul:
+                gasite = [
+                    cheie for cheie in gasite
+                    if all(any(t.startswith(cuvant) for t in self._docs[cheie][2]) for cuvant in restul)
+                ]
+
+            def ordine(cheie):
+                titlu, _, termeni, _ = self._docs[cheie]
+                return -sum(cuvant in termeni for cuvant in cuvinte), _ORDINE[cheie[0]], titlu
+
+            if limit is None:
+                ordonate = sorted(gasite, key=ordine)
+            else:
+                ordonate = heapq.nsmallest(limit, gasite, key=ordine)
+            return [
+                {'tip': tip, 'id': id_, 'titlu': self._docs[(tip, id_)][0],
+                 'detaliu': self._docs[(tip, id_)][1]}
+                for tip, id_ in ordonate
+            ]
+
+    def __len__(self):
+        return len(self._docs)
+
+
+_index = None
+_index_lock = threading.Lock()
+
+
+def get_search_index():
+    """Instanța unică (per proces) a indexului de căutare"""
+    global _index
+    with _index_lock:
+        if _index is None:
+            _index = SearchIndex()
+        return _index
+
+
+def search(text, tipuri=None, limit=MAX_RESULTS):
+    return get_search_index().search(text, tipuri, limit)
+
+
+if __name__ == "__main__":
+    # python -m database.search            -> reconstruiește indexul și îl scrie pe disc
+    # python -m database.search "ion pop"  -> caută
+    index = get_search_index()
+    if len(sys.argv) > 1:
+        inceput = time.perf_counter()
+        rezultate = index.search(' '.join(sys.argv[1:]), limit=20)
+        durata = (time.perf_counter() - inceput) * 1000
+        for r in rezultate:
+            print(f"{ETICHETE[r['tip']]:<13} {r['id']:>7}  {r['titlu']}  {r['detaliu']}")
+        print(f"{len(rezultate)} rezultate în {durata:.1f} ms")
+    else:
+        index.sync(force=True)
+        print(f"{len(index)} documente, ChangeLog {index.versiune}; "
+              f"{'scris în ' + index.path if index.save() else 'nescris (fără ChangeLog sau lacăt ocupat)'}")
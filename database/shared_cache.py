@@ -0,0 +1,430 @@
+import os
+import sys
+import json
+import time
+import pickle
+import sqlite3
+import threading
+import uuid
+from collections import OrderedDict
+from contextlib import contextmanager
+import database.connection  # noqa: F401 - .env se citește înaintea setărilor de mai jos
+
+# Cache-ul comun pentru mai multe procese Streamlit (vezi scripts/run_cluster.py):
+#   'local'            - doar în proces (implicit, un singur worker)
+#   'sqlite'           - fișier SQLite comun (mmap), pe aceeași mașină
+#   'redis://host:port' - orice server compatibil Redis (Redis, Valkey, KeyDB...)
+BACKEND = os.getenv('CACHE_BACKEND', 'local')
+CACHE_PATH = os.getenv(
+    'CACHE_PATH',
+    os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'snapshots', 'cache.sqlite')
+)
+# Durata implicită a unei valori (secunde)
+DEFAULT_TTL = int(os.getenv('CACHE_TTL', '300'))
+# Cât de des verifică un worker invalidările celorlalți (backend-ul sqlite)
+POLL_SECONDS = float(os.getenv('CACHE_POLL_SECONDS', '1'))
+# Câte valori decodate păstrează fiecare proces în memorie
+L1_SIZE = int(os.getenv('CACHE_L1_SIZE', '256'))
+# Cât așteaptă un worker valoarea calculată de altul înainte s-o calculeze singur
+LOCK_WAIT = float(os.getenv('CACHE_LOCK_WAIT', '30'))
+
+CANAL_INVALIDARE = 'invalidare'
+
+
+# ===== BACKEND-URI (subset din interfața Redis; chei str, valori bytes) =====
+
+class LocalBackend:
+    """Backend în proces - comportamentul unui singur worker"""
+
+    def __init__(self):
+        self._date = {}
+        self._lock = threading.Lock()
+
+    def _valid(self, cheie):
+        intrare = self._date.get(cheie)
+        if intrare is not None and intrare[1] is not None and intrare[1] < time.time():
+            del self._date[cheie]
+            return None
+        return intrare
+
+    def get(self, cheie):
+        with self._lock:
+            intrare = self._valid(cheie)
+            return intrare[0] if intrare else None
+
+    def set(self, cheie, valoare, ex=None, nx=False):
+        with self._lock:
+            if nx and self._valid(cheie) is not None:
+                return False
+            self._date[cheie] = (valoare, time.time() + ex if ex else None)
+            return True
+
+    def delete(self, *chei):
+        with self._lock:
+            for cheie in chei:
+                self._date.pop(cheie, None)
+
+    def delete_if(self, cheie, valoare):
+        with self._lock:
+            intrare = self._valid(cheie)
+            if intrare is None or intrare[0] != valoare:
+                return False
+            del self._date[cheie]
+            return True
+
+    def incr(self, cheie):
+        with self._lock:
+            intrare = self._valid(cheie)
+            valoare = int(intrare[0]) + 1 if intrare else 1
+            self._date[cheie] = (str(valoare).encode(), None)
+            return valoare
+
+    def publish(self, canal, mesaj):
+        # Un singur proces: invalidarea s-a aplicat deja local
+        pass
+
+    def listen(self, canal, callback, stop):
+        stop.wait()
+
+
+class SQLiteBackend:
+    """Fișier SQLite comun tuturor worker-ilor de pe mașină.
+
+    Fișierul e mapat în memorie (PRAGMA mmap_size), deci citirile repetate
+    vin din cache-ul sistemului de operare, partajat între procese.
+    Mesajele publish stau într-un tabel pe care ascultătorii îl citesc
+    periodic (POLL_SECONDS).
+    """
+
+    def __init__(self, path=CACHE_PATH):
+        self.path = path
+        os.makedirs(os.path.dirname(self.path), exist_ok=True)
+        with self._connect() as conn:
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.executescript("""
+                CREATE TABLE IF NOT EXISTS kv (cheie TEXT PRIMARY KEY, valoare BLOB, expira REAL);
+                CREATE TABLE IF NOT EXISTS evenimente (
+                    id INTEGER PRIMARY KEY AUTOINCREMENT, canal TEXT, mesaj BLOB, creat REAL);
+            """)
+
+    @contextmanager
+    def _connect(self):
+        conn = sqlite3.connect(self.path, timeout=10, isolation_level=None)
+        try:
+            conn.execute("PRAGMA mmap_size=268435456")
+            yield conn
+        finally:
+            conn.close()
+
+    def get(self, cheie):
+        with self._connect() as conn:
+            rand = conn.execute(
+                "SELECT valoare FROM kv WHERE cheie = ? AND (expira IS NULL OR expira > ?)",
+                (cheie, time.time())
+            ).fetchone()
+        return bytes(rand[0]) if rand else None
+
+    def set(self, cheie, valoare, ex=None, nx=False):
+        expira = time.time() + ex if ex else None
+        with self._connect() as conn:
+            if not nx:
+                conn.execute("INSERT OR REPLACE INTO kv VALUES (?, ?, ?)", (cheie, valoare, expira))
+                return True
+            conn.execute("BEGIN IMMEDIATE")
+            try:
+                conn.execute("DELETE FROM kv WHERE cheie = ? AND expira <= ?", (cheie, time.time()))
+                adaugat = conn.execute("INSERT OR IGNORE INTO kv VALUES (?, ?, ?)",
+                                       (cheie, valoare, expira)).rowcount == 1
+                conn.execute("COMMIT")
+            except Exception:
+                conn.execute("ROLLBACK")
+                raise
+            return adaugat
+
+    def delete(self, *chei):
+        with self._connect() as conn:
+            conn.executemany("DELETE FROM kv WHERE cheie = ?", [(c,) for c in chei])
+
+    def delete_if(self, cheie, valoare):
+        with self._connect() as conn:
+            return conn.execute(
+                "DELETE FROM kv WHERE cheie = ? AND valoare = ? AND (expira IS NULL OR expira > ?)",
+                (cheie, valoare, time.time())
+            ).rowcount == 1
+
+    def incr(self, cheie):
+        with self._connect() as conn:
+            conn.execute("BEGIN IMMEDIATE")
+            try:
+                rand = conn.execute("SELECT valoare FROM kv WHERE cheie = ?", (cheie,)).fetchone()
+                valoare = int(bytes(rand[0])) + 1 if rand else 1
+                conn.execute("INSERT OR REPLACE INTO kv VALUES (?, ?, NULL)", (cheie, str(valoare).encode()))
+                conn.execute("COMMIT")
+            except Exception:
+                conn.execute("ROLLBACK")
+                raise
+            return valoare
+
+    def publish(self, canal, mesaj):
+        acum = time.time()
+        with self._connect() as conn:
+            conn.execute("INSERT INTO evenimente (canal, mesaj, creat) VALUES (?, ?, ?)", (canal, mesaj, acum))
+            # Evenimentele vechi nu mai interesează pe nimeni
+            conn.execute("DELETE FROM evenimente WHERE creat < ?", (acum - 3600,))
+            conn.execute("DELETE FROM kv WHERE expira <= ?", (acum,))
+
+    def listen(self, canal, callback, stop):
+        with self._connect() as conn:
+            ultimul = conn.execute("SELECT IFNULL(MAX(id), 0) FROM evenimente").fetchone()[0]
+        while not stop.wait(POLL_SECONDS):
+            with self._connect() as conn:
+                randuri = conn.execute(
+                    "SELECT id, mesaj FROM evenimente WHERE canal = ? AND id > ? ORDER BY id",
+                    (canal, ultimul)
+                ).fetchall()
+            for id_eveniment, mesaj in randuri:
+                ultimul = id_eveniment
+                callback(bytes(mesaj))
+
+
+class RedisBackend:
+    """Orice server care vorbește protocolul Redis (dependință opțională: redis)"""
+
+    def __init__(self, url):
+        try:
+            import redis
+        except ImportError:
+            raise ImportError("CACHE_BACKEND=redis://... necesită pachetul 'redis' (pip install redis)")
+        self._r = redis.Redis.from_url(url)
+        # GET + DEL atomic pe server
+        self._delete_if = self._r.register_script(
+            "if redis.call('get', KEYS[1]) == ARGV[1] then return redis.call('del', KEYS[1]) end return 0"
+        )
+
+    def get(self, cheie):
+        return self._r.get(cheie)
+
+    def set(self, cheie, valoare, ex=None, nx=False):
+        return bool(self._r.set(cheie, valoare, ex=int(ex) if ex else None, nx=nx))
+
+    def delete(self, *chei):
+        if chei:
+            self._r.delete(*chei)
+
+    def delete_if(self, cheie, valoare):
+        return bool(self._delete_if(keys=[cheie], args=[valoare]))
+
+    def incr(self, cheie):
+        return int(self._r.incr(cheie))
+
+    def publish(self, canal, mesaj):
+        self._r.publish(canal, mesaj)
+
+    def listen(self, canal, callback, stop):
+        pubsub = self._r.pubsub(ignore_subscribe_messages=True)
+        pubsub.subscribe(canal)
+        try:
+            while not stop.is_set():
+                mesaj = pubsub.get_message(timeout=1.0)
+                if mesaj is not None:
+                    callback(mesaj['data'])
+        finally:
+            pubsub.close()
+
+
+def make_backend(nume=BACKEND):
+    if nume == 'sqlite':
+        return SQLiteBackend()
+    if nume.startswith(('redis://', 'rediss://', 'unix://')):
+        return RedisBackend(nume)
+    return LocalBackend()
+
+
+# ===== CACHE-UL COMUN =====
+
+class SharedCache:
+    """Valori calculate o singură dată per cluster, invalidate pe tabele.
+
+    Fiecare valoare declară tabelele de care depinde; cheia ei include
+    „generația” curentă a fiecărui tabel. O scriere (execute_tracked) crește
+    generația tabelului și o anunță pe canalul de invalidare, deci toate
+    valorile care depind de el devin automat inaccesibile - în toate
+    procesele - fără să fie căutate și șterse.
+
+    Generațiile și ultimele valori decodate stau și în proces (L1): o citire
+    reușită nu atinge backend-ul deloc. Un ascultător de fundal aplică
+    invalidările venite de la ceilalți worker-i.
+    """
+
+    def __init__(self, backend=None):
+        self.backend = backend or make_backend()
+        self._generatii = {}
+        self._l1 = OrderedDict()
+        self._lock = threading.Lock()
+        self._callbacks = []
+        self._stop = threading.Event()
+        self._thread = None
+
+    # ----- generații și invalidare -----
+
+    def _generatie(self, tabela):
+        generatie = self._generatii.get(tabela)
+        if generatie is None:
+            valoare = self.backend.get(f'gen:{tabela}')
+            generatie = int(valoare) if valoare else 0
+            self._generatii[tabela] = generatie
+        return generatie
+
+    def _aplica(self, tabela, generatie):
+        with self._lock:
+            if generatie <= self._generatii.get(tabela, -1):
+                # Deja aplicată (ex: propriul mesaj, întors de la backend)
+                return
+            self._generatii[tabela] = generatie
+        for callback in list(self._callbacks):
+            try:
+                callback(tabela)
+            except Exception as e:
+                print(f"Eroare în callback-ul de invalidare: {e}", file=sys.stderr)
+
+    def invalidate(self, *tabele):
+        """Marchează tabelele ca modificate, în acest proces și în ceilalți worker-i"""
+        for tabela in tabele:
+            try:
+                generatie = self.backend.incr(f'gen:{tabela}')
+                self._aplica(tabela, generatie)
+                self.backend.publish(CANAL_INVALIDARE, json.dumps({tabela: generatie}).encode())
+            except Exception as e:
+                # Scrierea în baza de date a reușit deja; fără backend golim măcar cache-ul local
+                print(f"Invalidarea pentru {tabela} nu a ajuns în backend: {e}", file=sys.stderr)
+                with self._lock:
+                    self._l1.clear()
+                    self._generatii.clear()
+
+    def on_invalidate(self, callback):
+        """callback(tabela) la fiecare invalidare, locală sau venită de la alt worker"""
+        self._callbacks.append(callback)
+        self.start()
+
+    def _mesaj(self, date):
+        for tabela, generatie in json.loads(date).items():
+            self._aplica(tabela, int(generatie))
+
+    def _run(self):
+        while not self._stop.is_set():
+            try:
+                self.backend.listen(CANAL_INVALIDARE, self._mesaj, self._stop)
+            except Exception as e:
+                print(f"Ascultătorul de invalidări s-a oprit: {e}", file=sys.stderr)
+                # Ce s-a pierdut între timp se recitește din backend
+                with self._lock:
+                    self._generatii.clear()
+                self._stop.wait(POLL_SECONDS)
+
+    def start(self):
+        with self._lock:
+            if self._thread is None or not self._thread.is_alive():
+                self._stop.clear()
+                self._thread = threading.Thread(target=self._run, name="cache-invalidare", daemon=True)
+                self._thread.start()
+
+    def stop(self):
+        self._stop.set()
+
+    # ----- valori -----
+
+    def _cheie(self, nume, depinde_de):
+        return nume + ''.join(f'|{t}:{self._generatie(t)}' for t in depinde_de)
+
+    def get_or_compute(self, nume, compute, depinde_de=(), ttl=DEFAULT_TTL):
+        """Valoarea `nume`; dacă lipsește, un singur worker o calculează, ceilalți o așteaptă"""
+        self.start()
+        try:
+            cheie = self._cheie(nume, depinde_de)
+        except Exception as e:
+            # Backend indisponibil: calculăm local, ca înainte
+            print(f"Cache-ul comun nu răspunde: {e}", file=sys.stderr)
+            return compute()
+        acum = time.monotonic()
+        with self._lock:
+            intrare = self._l1.get(cheie)
+            if intrare is not None and intrare[1] > acum:
+                self._l1.move_to_end(cheie)
+                return intrare[0]
+
+        try:
+            valoare = self._read(cheie)
+            if valoare is None:
+                valoare = self._compute(cheie, compute, ttl)
+        except Exception as e:
+            if isinstance(e, (OSError, sqlite3.Error)) or type(e).__module__.startswith('redis'):
+                print(f"Cache-ul comun nu răspunde: {e}", file=sys.stderr)
+                return compute()
+            raise
+
+        with self._lock:
+            self._l1[cheie] = (valoare, acum + ttl)
+            self._l1.move_to_end(cheie)
+            while len(self._l1) > L1_SIZE:
+                self._l1.popitem(last=False)
+        return valoare
+
+    def _read(self, cheie):
+        date = self.backend.get(f'val:{cheie}')
+        return pickle.loads(date) if date is not None else None
+
+    def _compute(self, cheie, compute, ttl):
+        # Valoarea lacătului e unică: la final ștergem doar lacătul nostru, nu
+        # pe al altui worker care l-a luat după ce al nostru a expirat
+        token = uuid.uuid4().hex.encode()
+        obtinut = self.backend.set(f'lock:{cheie}', token, ex=LOCK_WAIT, nx=True)
+        if not obtinut:
+            # Alt worker calculează deja aceeași valoare
+            limita = time.monotonic() + LOCK_WAIT
+            while time.monotonic() < limita:
+                time.sleep(0.1)
+                valoare = self._read(cheie)
+                if valoare is not None:
+                    return valoare
+        try:
+            valoare = compute()
+            self.backend.set(f'val:{cheie}', pickle.dumps(valoare), ex=ttl)
+            return valoare
+        finally:
+            if obtinut:
+                self.backend.delete_if(f'lock:{cheie}', token)
+
+    @contextmanager
+    def lock(self, nume, ttl=3600):
+        """Lacăt pe cluster (fără așteptare): True dacă acest worker l-a obținut.
+
+        Dacă blocul durează mai mult decât ttl, lacătul expiră și îl poate lua
+        alt worker; la ieșire îl eliberăm doar dacă e încă al nostru.
+        """
+        token = uuid.uuid4().hex.encode()
+        obtinut = self.backend.set(f'lock:{nume}', token, ex=ttl, nx=True)
+        try:
+            yield obtinut
+        finally:
+            if obtinut:
+                self.backend.delete_if(f'lock:{nume}', token)
+
+
+_cache = None
+_cache_lock = threading.Lock()
+
+
+def get_shared_cache():
+    """Instanța unică (per proces), pe backend-ul din CACHE_BACKEND"""
+    global _cache
+    with _cache_lock:
+        if _cache is None:
+            _cache = SharedCache()
+        return _cache
+
+
+def cached(nume, compute, depinde_de=(), ttl=DEFAULT_TTL):
+    """Ca get_or_compute, dar întoarce o copie (paginile modifică uneori DataFrame-ul primit)"""
+    valoare = get_shared_cache().get_or_compute(nume, compute, depinde_de, ttl)
+    copie = getattr(valoare, 'copy', None)
+    return copie() if callable(copie) else valoare
@@ -0,0 +1,234 @@
+import os
+import sys
+import json
+import shutil
+import threading
+import time
+from datetime import datetime, timedelta
+import pandas as pd
+from database import reports
+from database.cube import get_cube
+from database.shared_cache import get_shared_cache
+
+# Snapshot-urile de rapoarte: câte un director per versiune cu un fișier
+# Parquet per set de date, plus manifest.json. Manifestul din rădăcină
+# indică ultima versiune completă.
+SNAPSHOT_DIR = os.getenv(
+    'REPORT_SNAPSHOT_DIR',
+    os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'snapshots', 'rapoarte')
+)
+# Orele zilnice la care se recalculează rapoartele (HH:MM, separate prin virgulă)
+SCHEDULE = os.getenv('REPORT_SCHEDULE', '06:30,12:00')
+# Câte versiuni vechi păstrăm pe disc
+KEEP_VERSIONS = int(os.getenv('REPORT_SNAPSHOT_KEEP', '5'))
+# 'thread' = programatorul rulează în procesul Streamlit; 'off' = există un worker CLI separat
+SCHEDULER_MODE = os.getenv('REPORT_SCHEDULER_MODE', 'thread')
+
+MANIFEST = 'manifest.json'
+# Un director .tmp mai vechi de atât (secunde) a rămas de la un calcul căzut
+STALE_TMP_SECONDS = 3600
+
+_compute_lock = threading.Lock()
+_cache_lock = threading.Lock()
+_cache = {'versiune': None, 'manifest': None, 'datasets': {}}
+
+
+def _write_json(path, data):
+    tmp = path + '.tmp'
+    with open(tmp, 'w', encoding='utf-8') as f:
+        json.dump(data, f, ensure_ascii=False, indent=2)
+    os.replace(tmp, path)
+
+
+def _prune():
+    directoare = [d for d in os.listdir(SNAPSHOT_DIR) if os.path.isdir(os.path.join(SNAPSHOT_DIR, d))]
+    versiuni = sorted(d for d in directoare if not d.endswith('.tmp'))
+    for vechi in versiuni[:-KEEP_VERSIONS]:
+        shutil.rmtree(os.path.join(SNAPSHOT_DIR, vechi), ignore_errors=True)
+    # Directoarele .tmp recente pot fi ale unui calcul în curs (alt proces)
+    limita = time.time() - STALE_TMP_SECONDS
+    for d in directoare:
+        cale = os.path.join(SNAPSHOT_DIR, d)
+        if d.endswith('.tmp') and os.path.getmtime(cale) < limita:
+            shutil.rmtree(cale, ignore_errors=True)
+
+
+def compute_snapshot():
+    """Calculează toate seturile de date din Rapoarte și scrie o versiune nouă"""
+    with _compute_lock:
+        inceput = time.monotonic()
+        # Cu microsecunde: două calcule în aceeași secundă (ex: buton + programator) nu
+        # mai scriu în același director .tmp și nu se suprascriu la os.replace
+        versiune = datetime.now().strftime('%Y%m%d_%H%M%S_%f')
+        director = os.path.join(SNAPSHOT_DIR, versiune)
+        tmp = director + '.tmp'
+        os.makedirs(tmp, exist_ok=True)
+        try:
+            fisiere, erori = {}, {}
+            prima = ultima = None
+            try:
+                cube = get_cube()
+                cube.sync(force=True)
+                prima, ultima = cube.date_bounds()
+            except Exception as e:
+                # Seturile care nu depind de cub se scriu oricum
+                erori['cub'] = str(e)
+
+            for nume, functie in reports.DATASETS.items():
+                try:
+                    functie().to_parquet(os.path.join(tmp, nume + '.parquet'), index=False)
+                    fisiere[nume] = nume + '.parquet'
+                except Exception as e:
+                    erori[nume] = str(e)
+
+            manifest = {
+                'versiune': versiune,
+                'creat': datetime.now().isoformat(timespec='seconds'),
+                'durata_secunde': round(time.monotonic() - inceput, 2),
+                'prima_data': prima.isoformat() if prima else None,
+                'ultima_data': ultima.isoformat() if ultima else None,
+                'fisiere': fisiere,
+                'erori': erori,
+            }
+            _write_json(os.path.join(tmp, MANIFEST), manifest)
+            os.replace(tmp, director)
+        finally:
+            if os.path.isdir(tmp):
+                # Calcul întrerupt: nu lăsăm în urmă directorul parțial
+                shutil.rmtree(tmp, ignore_errors=True)
+        _write_json(os.path.join(SNAPSHOT_DIR, MANIFEST), manifest)
+        _prune()
+        return manifest
+
+
+def latest_manifest():
+    """Manifestul ultimei versiuni sau None dacă nu există încă snapshot-uri"""
+    try:
+        with open(os.path.join(SNAPSHOT_DIR, MANIFEST), encoding='utf-8') as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return None
+
+
+def load_latest():
+    """Ultimul snapshot: {'manifest': ..., 'datasets': {nume: DataFrame}}.
+
+    Fișierele se citesc o singură dată per versiune și rămân în memorie.
+    """
+    manifest = latest_manifest()
+    if manifest is None:
+        return None
+    with _cache_lock:
+        if _cache['versiune'] != manifest['versiune']:
+            director = os.path.join(SNAPSHOT_DIR, manifest['versiune'])
+            datasets = {}
+            for nume, fisier in manifest['fisiere'].items():
+                try:
+                    datasets[nume] = pd.read_parquet(os.path.join(director, fisier))
+                except Exception:
+                    # Versiune ștearsă între timp: se va folosi calculul live
+                    pass
+            _cache.update(versiune=manifest['versiune'], manifest=manifest, datasets=datasets)
+        return {'manifest': _cache['manifest'], 'datasets': _cache['datasets']}
+
+
+def get_report(nume, start=None, end=None):
+    """Setul de date din ultimul snapshot (pentru perioada implicită) sau calculat live"""
+    if start is None and end is None:
+        snapshot = load_latest()
+        if snapshot is not None and nume in snapshot['datasets']:
+            return snapshot['datasets'][nume].copy()
+    return reports.DATASETS[nume](start, end)
+
+
+# ===== PROGRAMATOR =====
+
+class ReportScheduler:
+    """Fir de fundal care recalculează snapshot-urile la orele din REPORT_SCHEDULE"""
+
+    def __init__(self, schedule=SCHEDULE):
+        self.ore = sorted(
+            datetime.strptime(ora.strip(), '%H:%M').time()
+            for ora in schedule.split(',') if ora.strip()
+        )
+        self._stop = threading.Event()
+        self._thread = None
+
+    def last_scheduled(self, acum):
+        """Ultima oră programată care a trecut deja"""
+        for zi in (acum.date(), acum.date() - timedelta(days=1)):
+            for ora in reversed(self.ore):
+                moment = datetime.combine(zi, ora)
+                if moment <= acum:
+                    return moment
+        return None
+
+    def next_run(self, acum):
+        for zi in (acum.date(), acum.date() + timedelta(days=1)):
+            for ora in self.ore:
+                moment = datetime.combine(zi, ora)
+                if moment > acum:
+                    return moment
+        return acum + timedelta(days=1)
+
+    def _needs_catch_up(self):
+        manifest = latest_manifest()
+        if manifest is None:
+            return True
+        ultima = self.last_scheduled(datetime.now())
+        return ultima is not None and datetime.fromisoformat(manifest['creat']) < ultima
+
+    def _safe_compute(self):
+        try:
+            # Cu mai mulți worker-i calculează unul singur; ceilalți găsesc manifestul nou
+            with get_shared_cache().lock('rapoarte:snapshot') as obtinut:
+                if obtinut and self._needs_catch_up():
+                    compute_snapshot()
+        except Exception as e:
+            print(f"Eroare la calculul snapshot-ului de rapoarte: {e}", file=sys.stderr)
+
+    def run(self):
+        # La pornire recuperăm o rulare ratată (server oprit la ora programată)
+        if self._needs_catch_up():
+            self._safe_compute()
+        while not self._stop.is_set():
+            asteptare = (self.next_run(datetime.now()) - datetime.now()).total_seconds()
+            if self._stop.wait(max(asteptare, 1)):
+                break
+            self._safe_compute()
+
+    def start(self):
+        if self._thread is None or not self._thread.is_alive():
+            self._stop.clear()
+            self._thread = threading.Thread(target=self.run, name="report-scheduler", daemon=True)
+            self._thread.start()
+
+    def stop(self):
+        self._stop.set()
+
+
+_scheduler = None
+_scheduler_lock = threading.Lock()
+
+
+def start_scheduler():
+    """Pornește programatorul în proces (o singură dată), dacă nu e dezactivat"""
+    global _scheduler
+    if SCHEDULER_MODE != 'thread':
+        return
+    with _scheduler_lock:
+        if _scheduler is None:
+            _scheduler = ReportScheduler()
+        _scheduler.start()
+
+
+if __name__ == "__main__":
+    # Worker separat:
+    #   python -m database.snapshots          -> un singur snapshot
+    #   python -m database.snapshots --daemon -> rulează după REPORT_SCHEDULE
+    if '--daemon' in sys.argv:
+        ReportScheduler().run()
+    else:
+        m = compute_snapshot()
+        print(f"Snapshot {m['versiune']} scris în {m['durata_secunde']}s "
+              f"({len(m['fisiere'])} seturi, {len(m['erori'])} erori)")
@@ -0,0 +1,245 @@
+import os
+import threading
+from collections import OrderedDict
+import pandas as pd
+from database.connection import db
+from database import changes
+from database.archive import diagnostic_date_sql, source
+
+# Câte evenimente aduce o pagină din istoricul unui pacient
+PAGE_SIZE = int(os.getenv('TIMELINE_PAGE_SIZE', '500'))
+# Câți pacienți țin istoricul în memorie (cei folosiți cel mai recent)
+CACHE_SIZE = int(os.getenv('TIMELINE_CACHE_SIZE', '200'))
+
+# Toate evenimentele unui pacient într-o singură interogare, de la cel mai
+# recent la cel mai vechi. 'ordine' separă evenimentele din același moment,
+# astfel încât (Moment, ordine, id) e o cheie unică pentru cursor. Diagnosticele
+# fără dată (schema fără DIAGNOSTIC_DATE_COLUMN) nu apar în istoric.
+TIMELINE_QUERY = """
+    SELECT TOP (?) *
+    FROM (
+        SELECT
+            pr.id_programare as id,
+            1 as ordine,
+            'Programare' as Tip,
+            CAST(pr.data_programare AS DATETIME)
+                + ISNULL(CAST(pr.ora_programare AS DATETIME), 0) as Moment,
+            pr.tip_programare as Eveniment,
+            pr.cauza as Detalii,
+            d.nume + ' ' + d.prenume as Doctor,
+            s.nume_sectie as Sectie
+        FROM {programare} pr
+        JOIN Doctor d ON pr.id_doctor = d.id_doctor
+        LEFT JOIN Sectie s ON pr.id_sectie = s.id_sectie
+        WHERE pr.id_pacient = ?
+
+        UNION ALL
+
+        SELECT
+            dg.id_diagnostic,
+            2,
+            'Diagnostic',
+            {data_diagnostic},
+            dg.boala,
+            dg.severitate,
+            d.nume + ' ' + d.prenume,
+            s.nume_sectie
+        FROM {diagnostic} dg
+        JOIN Doctor d ON dg.id_doctor = d.id_doctor
+        LEFT JOIN Sectie s ON d.id_sectie = s.id_sectie
+        WHERE dg.id_pacient = ? AND {data_diagnostic} IS NOT NULL
+
+        UNION ALL
+
+        SELECT p.id_pacient, 3, 'Internare', CAST(p.data_internare AS DATETIME),
+               'Internare', NULL, NULL, s.nume_sectie
+        FROM Pacient p
+        LEFT JOIN Sectie s ON p.id_sectie = s.id_sectie
+        WHERE p.id_pacient = ? AND p.data_internare IS NOT NULL
+
+        UNION ALL
+
+        SELECT p.id_pacient, 4, 'Externare', CAST(p.data_externare AS DATETIME),
+               'Externare', NULL, NULL, s.nume_sectie
+        FROM Pacient p
+        LEFT JOIN Sectie s ON p.id_sectie = s.id_sectie
+        WHERE p.id_pacient = ? AND p.data_externare IS NOT NULL
+    ) t
+    {cursor}
+    ORDER BY Moment DESC, ordine DESC, id DESC
+"""
+
+CURSOR_FILTER = """
+    WHERE Moment < ?
+       OR (Moment = ? AND (ordine < ? OR (ordine = ? AND id < ?)))
+"""
+
+
+def fetch_timeline_page(id_pacient, cursor=None, limit=PAGE_SIZE, endpoint=None):
+    """O pagină din istoricul pacientului, înainte de `cursor`.
+
+    cursor: (Moment, ordine, id) al ultimului eveniment deja afișat, sau None
+    pentru cele mai recente evenimente.
+    Returnează (DataFrame, cursor_urmator); cursor_urmator e None la final.
+    """
+    id_pacient = int(id_pacient)
+    query = TIMELINE_QUERY.format(
+        programare=source('Programare'),
+        diagnostic=source('Diagnostic'),
+        data_diagnostic=diagnostic_date_sql('dg', 'DATETIME'),
+        cursor=CURSOR_FILTER if cursor is not None else ""
+    )
+    params = [int(limit)] + [id_pacient] * 4
+    if cursor is not None:
+        moment, ordine, id_ = cursor
+        params += [moment, moment, int(ordine), int(ordine), int(id_)]
+    df = db.fetch_dataframe(query, params=tuple(params),
+                            endpoint=endpoint or db.read_endpoint(replica=True))
+    if df.empty:
+        return df, None
+    df['Moment'] = pd.to_datetime(df['Moment'])
+    urmator = None
+    if len(df) >= limit:
+        ultim = df.iloc[-1]
+        urmator = (ultim['Moment'].to_pydatetime(), int(ultim['ordine']), int(ultim['id']))
+    return df, urmator
+
+
+class TimelineCache:
+    """Istoricul pacienților deschiși recent, ținut în memorie.
+
+    Pentru fiecare pacient se păstrează paginile deja citite și cursorul
+    următoarei pagini. La fiecare citire se verifică ChangeLog (programări,
+    diagnostice, pacienți) și cel mai mare id_diagnostic; doar pacienții
+    afectați sunt scoși din cache.
+    """
+
+    def __init__(self, page_size=PAGE_SIZE, cache_size=CACHE_SIZE):
+        self.page_size = page_size
+        self.cache_size = cache_size
+        self._entries = OrderedDict()
+        self._versiune = None
+        self._max_diagnostic = None
+        self._lock = threading.Lock()
+
+    # ----- invalidare -----
+
+    def _pacienti_modificati(self, tabela, cheie, ids, endpoint):
+        """Pacienții programărilor / diagnosticelor modificate (cele șterse se caută în cache)"""
+        pacienti = {
+            id_pacient for id_pacient, intrare in self._entries.items()
+            if intrare['df'] is not None
+            and intrare['df']['id'][intrare['df']['Tip'] == tabela].isin(ids).any()
+        }
+        ids = sorted(ids)
+        for i in range(0, len(ids), changes.IN_CHUNK):
+            chunk = ids[i:i + changes.IN_CHUNK]
+            query = f"""
+                SELECT DISTINCT id_pacient FROM {source(tabela)}
+                WHERE {cheie} IN ({', '.join('?' * len(chunk))})
+            """
+            _, data = db.fetch_data(query, tuple(chunk), endpoint=endpoint)
+            pacienti.update(int(row[0]) for row in data)
+        return pacienti
+
+    def _pacienti_diagnostice(self, endpoint):
+        """Pacienții cu diagnostice noi (și fără triggerul ChangeLog pe Diagnostic)"""
+        _, data = db.fetch_data(
+            f"SELECT ISNULL(MAX(id_diagnostic), 0) FROM {source('Diagnostic')}",
+            endpoint=endpoint
+        )
+        maxim = int(data[0][0])
+        pacienti = set()
+        if self._max_diagnostic is not None and maxim > self._max_diagnostic:
+            _, data = db.fetch_data(
+                f"SELECT DISTINCT id_pacient FROM {source('Diagnostic')} WHERE id_diagnostic > ?",
+                (self._max_diagnostic,), endpoint=endpoint
+            )
+            pacienti = {int(row[0]) for row in data}
+        self._max_diagnostic = maxim
+        return pacienti
+
+    def _sync(self, endpoint):
+        if not self._entries:
+            self._versiune = None
+            self._max_diagnostic = None
+        afectati = self._pacienti_diagnostice(endpoint)
+        versiune = changes.get_current_version(endpoint) if changes.ensure_changelog() else None
+        if versiune is None:
+            # Fără ChangeLog nu putem ști ce s-a schimbat
+            self._entries.clear()
+        elif self._versiune is not None and versiune != self._versiune:
+            modificari = changes.get_changes_since(
+                self._versiune, {'Programare', 'Diagnostic', 'Pacient', 'Doctor', 'Sectie'}, endpoint
+            )
+            total = sum(len(ids) for ids in modificari.values())
+            if 'Doctor' in modificari or 'Sectie' in modificari or total > changes.MAX_IDS_INCREMENTAL:
+                self._entries.clear()
+            else:
+                afectati |= modificari.get('Pacient', set())
+                if modificari.get('Programare'):
+                    afectati |= self._pacienti_modificati('Programare', 'id_programare',
+                                                         modificari['Programare'], endpoint)
+                if modificari.get('Diagnostic'):
+                    afectati |= self._pacienti_modificati('Diagnostic', 'id_diagnostic',
+                                                         modificari['Diagnostic'], endpoint)
+        for id_pacient in afectati:
+            self._entries.pop(id_pacient, None)
+        self._versiune = versiune
+
+    # ----- citire -----
+
+    def get(self, id_pacient, pagini=1):
+        """Primele `pagini` pagini din istoric (cele mai recente evenimente).
+
+        Returnează (DataFrame, mai_are) - mai_are spune dacă există
+        evenimente mai vechi decât cele returnate.
+        """
+        id_pacient = int(id_pacient)
+        with self._lock:
+            endpoint = db.read_endpoint(replica=True)
+            self._sync(endpoint)
+            intrare = self._entries.get(id_pacient)
+            if intrare is None:
+                intrare = {'df': None, 'pagini': 0, 'cursor': None, 'complet': False}
+
+            while intrare['pagini'] < pagini and not intrare['complet']:
+                df, cursor = fetch_timeline_page(id_pacient, intrare['cursor'],
+                                                 self.page_size, endpoint)
+                intrare['df'] = df if intrare['df'] is None else \
+                    pd.concat([intrare['df'], df], ignore_index=True)
+                intrare['pagini'] += 1
+                intrare['cursor'] = cursor
+                intrare['complet'] = cursor is None
+
+            # Intră în cache doar după prima pagină citită: o eroare nu lasă în urmă
+            # o intrare fără date
+            self._entries[id_pacient] = intrare
+            self._entries.move_to_end(id_pacient)
+            while len(self._entries) > self.cache_size:
+                self._entries.popitem(last=False)
+
+            df = intrare['df'].head(pagini * self.page_size)
+            mai_are = len(df) < len(intrare['df']) or not intrare['complet']
+            return df.copy(deep=False), mai_are
+
+    def invalidate(self, id_pacient=None):
+        """Scoate un pacient (sau pe toți) din cache"""
+        with self._lock:
+            if id_pacient is None:
+                self._entries.clear()
+            else:
+                self._entries.pop(int(id_pacient), None)
+
+
+_timeline = None
+_timeline_lock = threading.Lock()
+
+
+def get_timeline_cache():
+    """Instanța unică (per proces) a cache-ului de istoric"""
+    global _timeline
+    with _timeline_lock:
+        if _timeline is None:
+            _timeline = TimelineCache()
+        return _timeline
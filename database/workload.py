@@ -0,0 +1,144 @@
+import os
+import json
+import threading
+from collections import OrderedDict
+import numpy as np
+import pandas as pd
+from database.cube import get_cube
+
+# Programul implicit: zilele (0 = luni) și orele [inceput, sfarsit) de lucru
+ZILE_LUCRU = [int(z) for z in os.getenv('WORKLOAD_DAYS', '0,1,2,3,4').split(',') if z.strip()]
+ORA_INCEPUT = int(os.getenv('WORKLOAD_START_HOUR', '8'))
+ORA_SFARSIT = int(os.getenv('WORKLOAD_END_HOUR', '16'))
+# Câte programări poate prelua un doctor într-o oră
+PE_ORA = float(os.getenv('WORKLOAD_SLOTS_PER_HOUR', '2'))
+# Program diferit pentru unii doctori (JSON):
+# {"Popescu Ion": {"zile": [0, 2, 4], "ore": [9, 14], "pe_ora": 3}}
+CONFIG_FILE = os.getenv('WORKLOAD_CONFIG')
+# Câte intervale de date păstrăm calculate
+CACHE_SIZE = int(os.getenv('WORKLOAD_CACHE_SIZE', '16'))
+
+ZILE = ['Luni', 'Marți', 'Miercuri', 'Joi', 'Vineri', 'Sâmbătă', 'Duminică']
+
+
+def _load_config():
+    if not CONFIG_FILE or not os.path.exists(CONFIG_FILE):
+        return {}
+    with open(CONFIG_FILE, encoding='utf-8') as f:
+        return json.load(f)
+
+
+def _program(config):
+    """Matrice 7 x 24 cu programările posibile într-o oră din program"""
+    program = np.zeros((7, 24), dtype=np.float64)
+    inceput, sfarsit = config.get('ore', (ORA_INCEPUT, ORA_SFARSIT))
+    program[np.ix_(config.get('zile', ZILE_LUCRU), np.arange(inceput, sfarsit))] = \
+        config.get('pe_ora', PE_ORA)
+    return program
+
+
+def _zile_in_interval(start, end):
+    """De câte ori apare fiecare zi a săptămânii în [start, end]"""
+    zile = pd.date_range(start, end, freq='D')
+    return np.bincount(zile.dayofweek, minlength=7).astype(np.float64)
+
+
+class WorkloadMatrix:
+    """Programări și capacitate pe doctor x zi a săptămânii x oră.
+
+    numar[d, z, h] = programările doctorului d în ziua z, ora h din interval
+    capacitate[d, z, h] = programările posibile conform programului de lucru
+    """
+
+    def __init__(self, doctori, numar, capacitate):
+        self.doctori = doctori
+        self.numar = numar
+        self.capacitate = capacitate
+        self._pozitii = {doctor: i for i, doctor in enumerate(doctori)}
+
+    def _slice(self, doctor):
+        if doctor is None:
+            return self.numar.sum(axis=0), self.capacitate.sum(axis=0)
+        i = self._pozitii[doctor]
+        return self.numar[i], self.capacitate[i]
+
+    def utilizare(self, doctor=None):
+        """Grad de ocupare (0-1+) pe zi x oră; NaN în afara programului"""
+        numar, capacitate = self._slice(doctor)
+        return np.divide(numar, capacitate, out=np.full_like(numar, np.nan), where=capacitate > 0)
+
+    def programari(self, doctor=None):
+        """Numărul de programări pe zi x oră"""
+        return self._slice(doctor)[0]
+
+    def rezumat(self):
+        """Un rând per doctor: programări, capacitate, ocupare, programări în afara programului"""
+        numar = self.numar.reshape(len(self.doctori), -1)
+        capacitate = self.capacitate.reshape(len(self.doctori), -1)
+        total_capacitate = capacitate.sum(axis=1)
+        df = pd.DataFrame({
+            'Doctor': self.doctori,
+            'Programări': numar.sum(axis=1).astype(int),
+            'Capacitate': total_capacitate.astype(int),
+            'Ocupare (%)': np.round(100 * np.divide(
+                numar.sum(axis=1), total_capacitate,
+                out=np.zeros(len(self.doctori)), where=total_capacitate > 0
+            ), 1),
+            'În afara programului': np.where(capacitate == 0, numar, 0).sum(axis=1).astype(int),
+        })
+        return df.sort_values('Ocupare (%)', ascending=False).reset_index(drop=True)
+
+
+def compute_workload(start=None, end=None):
+    """Matricea de încărcare pentru interval (implicit: tot istoricul din cub)"""
+    cube = get_cube()
+    if start is None or end is None:
+        prima, ultima = cube.date_bounds()
+        start = start or prima
+        end = end or ultima
+    df = cube.aggregate('programari', ['doctor', 'zi_saptamana', 'ora'], start, end)
+    doctori = sorted(df['doctor'].unique().tolist()) if not df.empty else []
+    numar = np.zeros((len(doctori), 7, 24), dtype=np.float64)
+    if not df.empty:
+        # Agregarea e deja pe (doctor, zi, oră): doar o împrăștiem în cubul 3D
+        df = df[(df['ora'] >= 0) & (df['ora'] < 24)]
+        pozitie = pd.Index(doctori).get_indexer(df['doctor'])
+        numar[pozitie, df['zi_saptamana'].to_numpy(), df['ora'].to_numpy()] = df['Numar'].to_numpy()
+
+    capacitate = np.zeros((len(doctori), 7, 24), dtype=np.float64)
+    if doctori:
+        config = _load_config()
+        implicit = _program({})
+        program = np.stack([_program(config[d]) if d in config else implicit for d in doctori])
+        # Capacitatea unei celule = programări pe oră x de câte ori apare ziua în interval
+        capacitate = program * _zile_in_interval(start, end)[None, :, None]
+    return WorkloadMatrix(doctori, numar, capacitate)
+
+
+_cache = OrderedDict()
+_cache_lock = threading.Lock()
+
+
+def get_workload(start=None, end=None):
+    """Matricea de încărcare, calculată o singură dată per interval.
+
+    Se recalculează doar când cubul primește date noi (array-urile lui se
+    înlocuiesc la fiecare modificare), deci schimbarea doctorului sau a
+    vederii nu mai atinge nici cubul, nici baza de date.
+    """
+    cube = get_cube()
+    cube.sync()
+    date = cube.programari.columns
+    cheie = (start, end)
+    with _cache_lock:
+        intrare = _cache.get(cheie)
+        if intrare is not None and intrare[0] is date:
+            _cache.move_to_end(cheie)
+            return intrare[1]
+    matrice = compute_workload(start, end)
+    with _cache_lock:
+        _cache[cheie] = (date, matrice)
+        _cache.move_to_end(cheie)
+        while len(_cache) > CACHE_SIZE:
+            _cache.popitem(last=False)
+    return matrice
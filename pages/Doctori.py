@@ -1,5 +1,10 @@
 import streamlit as st
 from database.connection import db
+from database.changes import execute_tracked, track, tracked_frame
+from database.shared_cache import cached
+from database.search import search
+from components.paged_table import paged_table
+from database.archive import source, archive_exists, TABELE as ARHIVE
 import pandas as pd
 from datetime import datetime
 
@@ -35,35 +40,70 @@ def validate_email(email):
     return True, "Valid"
 
 
+DOCTORI_QUERY = """
+    SELECT 
+        d.id_doctor as ID,
+        d.nume as Nume,
+        d.prenume as Prenume,
+        d.specializare as Specializare,
+        d.grad_profesional as [Grad Profesional],
+        d.telefon as Telefon,
+        d.email as Email,
+        s.nume_sectie as Sectie
+    FROM Doctor d
+    LEFT JOIN Sectie s ON d.id_sectie = s.id_sectie
+    {filtru}
+    ORDER BY d.id_doctor DESC
+"""
+
+
+def _doctori_frame():
+    return tracked_frame(
+        "doctori",
+        DOCTORI_QUERY,
+        {'Doctor': ('ID', 'd.id_doctor')},
+        sort_by='ID',
+        ascending=False,
+        reincarca_la=('Sectie',),
+        replica=True
+    )
+
+
+def search_doctori(df_doctori, search_term):
+    """Rândurile găsite în indexul comun de căutare (prefixe, fără diacritice), în ordinea relevanței"""
+    try:
+        ids = [r['id'] for r in search(search_term, tipuri=('doctor',), limit=None)]
+    except Exception as e:
+        st.error(f"Căutarea nu este disponibilă: {e}")
+        return df_doctori.iloc[0:0]
+    ordine = {id_: i for i, id_ in enumerate(ids)}
+    rezultate = df_doctori[df_doctori['ID'].isin(ordine)]
+    return rezultate.sort_values('ID', key=lambda coloana: coloana.map(ordine))
+
+
 def get_all_doctori():
-    """Obține toți doctorii din baza de date"""
+    """Obține toți doctorii (actualizați incremental din ChangeLog)"""
     try:
-        query = """
-            SELECT 
-                d.id_doctor as ID,
-                d.nume as Nume,
-                d.prenume as Prenume,
-                d.specializare as Specializare,
-                d.grad_profesional as [Grad Profesional],
-                d.telefon as Telefon,
-                d.email as Email,
-                s.nume_sectie as Sectie
-            FROM Doctor d
-            LEFT JOIN Sectie s ON d.id_sectie = s.id_sectie
-            ORDER BY d.id_doctor DESC
-        """
-        return db.fetch_dataframe(query)
+        return _doctori_frame().get()
     except Exception as e:
         st.error(f"Eroare la citirea doctorilor: {e}")
         return pd.DataFrame()
 
 
+def get_doctori_filter():
+    """FrameFilter peste lista de doctori (None dacă citirea eșuează)"""
+    try:
+        return _doctori_frame().get_filter()
+    except Exception as e:
+        st.error(f"Eroare la citirea doctorilor: {e}")
+        return None
+
+
 def get_sectii():
     """Obține lista de secții pentru dropdown"""
     try:
         query = "SELECT id_sectie, nume_sectie FROM Sectie ORDER BY nume_sectie"
-        df = db.fetch_dataframe(query)
-        return df
+        return cached("sectii", lambda: db.fetch_dataframe(query), depinde_de=('Sectie',))
     except Exception as e:
         st.error(f"Eroare la citirea secțiilor: {e}")
         return pd.DataFrame()
@@ -105,15 +145,13 @@ def get_grade_profesionale():
 def add_doctor(nume, prenume, specializare, telefon, email, grad_profesional, id_sectie):
     """Adaugă un doctor nou în baza de date"""
     try:
-        # Convertim id_sectie la int Python sau None
-        id_sectie_final = int(id_sectie) if id_sectie is not None else None
-        
         query = """
             INSERT INTO Doctor 
             (nume, prenume, specializare, telefon, email, grad_profesional, id_sectie)
             VALUES (?, ?, ?, ?, ?, ?, ?)
         """
-        db.execute_query(query, (nume, prenume, specializare, telefon, email, grad_profesional, id_sectie_final))
+        execute_tracked(query, (nume, prenume, specializare, telefon, email, grad_profesional, id_sectie),
+                        'Doctor', 'I')
         return True, "✅ Doctor adăugat cu succes!"
     except Exception as e:
         return False, f"❌ Eroare: {str(e)}"
@@ -122,28 +160,57 @@ def add_doctor(nume, prenume, specializare, telefon, email, grad_profesional, id
 def update_doctor(id_doctor, nume, prenume, specializare, telefon, email, grad_profesional, id_sectie):
     """Actualizează datele unui doctor"""
     try:
-        id_sectie_final = int(id_sectie) if id_sectie is not None else None
-        id_doctor_final = int(id_doctor)
-        
         query = """
             UPDATE Doctor 
             SET nume=?, prenume=?, specializare=?, telefon=?, 
                 email=?, grad_profesional=?, id_sectie=?
             WHERE id_doctor=?
         """
-        db.execute_query(query, (nume, prenume, specializare, telefon, email, grad_profesional, id_sectie_final, id_doctor_final))
+        execute_tracked(query, (nume, prenume, specializare, telefon, email, grad_profesional, id_sectie, id_doctor),
+                        'Doctor', 'U', id_doctor)
         return True, "✅ Doctor actualizat cu succes!"
     except Exception as e:
         return False, f"❌ Eroare: {str(e)}"
 
 
+# UPDLOCK + HOLDLOCK: nicio programare nouă pentru doctor până la COMMIT
+DEPENDENTE_DOCTOR_QUERY = """
+    SELECT
+        (SELECT COUNT(*) FROM Programare WITH (UPDLOCK, HOLDLOCK) WHERE id_doctor=?),
+        (SELECT COUNT(*) FROM Diagnostic WITH (UPDLOCK, HOLDLOCK) WHERE id_doctor=?)
+"""
+
+
+def _doctor_dependencies(tx, id_doctor):
+    """(programări, diagnostice) ale doctorului, inclusiv istoricul arhivat"""
+    programari, diagnostice = tx.fetch_one(DEPENDENTE_DOCTOR_QUERY, (id_doctor, id_doctor))
+    if archive_exists():
+        for tabela, info in ARHIVE.items():
+            numar = tx.fetch_one(f"SELECT COUNT(*) FROM {info['arhiva']} WHERE id_doctor=?", (id_doctor,))[0]
+            if tabela == 'Programare':
+                programari += numar
+            else:
+                diagnostice += numar
+    return programari, diagnostice
+
+
 def delete_doctor(id_doctor):
-    """Șterge un doctor din baza de date"""
+    """Șterge un doctor, doar dacă nu are programări sau diagnostice.
+
+    Verificarea și ștergerea sunt în aceeași tranzacție, deci o programare
+    adăugată între timp de alt utilizator nu poate rămâne fără doctor.
+    """
+    def _sterge(tx):
+        programari, diagnostice = _doctor_dependencies(tx, id_doctor)
+        if programari == 0 and diagnostice == 0:
+            track(tx, "DELETE FROM Doctor WHERE id_doctor=?", (id_doctor,), 'Doctor', 'D', id_doctor)
+        return programari, diagnostice
+
     try:
-        id_doctor_final = int(id_doctor)
-        
-        query = "DELETE FROM Doctor WHERE id_doctor=?"
-        db.execute_query(query, (id_doctor_final,))
+        programari, diagnostice = db.run_in_transaction(_sterge)
+        if programari or diagnostice:
+            return False, (f"❌ Doctorul are {programari} programări și {diagnostice} diagnostice "
+                           f"și nu poate fi șters")
         return True, "✅ Doctor șters cu succes!"
     except Exception as e:
         return False, f"❌ Eroare: {str(e)}"
@@ -153,7 +220,7 @@ def get_doctor_by_id(id_doctor):
     """Obține detaliile unui doctor specific"""
     try:
         query = "SELECT * FROM Doctor WHERE id_doctor=?"
-        df = db.fetch_dataframe(query, params=(int(id_doctor),))
+        df = db.fetch_dataframe(query, params=(id_doctor,))
         if not df.empty:
             return df.iloc[0]
         return None
@@ -163,22 +230,22 @@ def get_doctor_by_id(id_doctor):
 
 
 def get_doctor_statistics(id_doctor):
-    """Obține statistici pentru un doctor"""
+    """Obține statistici pentru un doctor (inclusiv istoricul arhivat)"""
     try:
-        query_programari = """
+        query_programari = f"""
             SELECT COUNT(*) as total 
-            FROM Programare 
+            FROM {source('Programare')} 
             WHERE id_doctor=?
         """
-        df_prog = db.fetch_dataframe(query_programari, params=(int(id_doctor),))
+        df_prog = db.fetch_dataframe(query_programari, params=(id_doctor,))
         total_programari = int(df_prog['total'].iloc[0]) if not df_prog.empty else 0
      
-        query_diag = """
+        query_diag = f"""
             SELECT COUNT(*) as total 
-            FROM Diagnostic 
+            FROM {source('Diagnostic')} 
             WHERE id_doctor=?
         """
-        df_diag = db.fetch_dataframe(query_diag, params=(int(id_doctor),))
+        df_diag = db.fetch_dataframe(query_diag, params=(id_doctor,))
         total_diagnostice = int(df_diag['total'].iloc[0]) if not df_diag.empty else 0
         
         return {
@@ -214,7 +281,8 @@ def main():
                 st.rerun()
         
         # Obține și afișează doctorii
-        df_doctori = get_all_doctori()
+        filtru = get_doctori_filter()
+        df_doctori = filtru.df if filtru is not None else pd.DataFrame()
         
         if not df_doctori.empty:
             st.info(f"📊 Total doctori: **{len(df_doctori)}**")
@@ -223,27 +291,20 @@ def main():
             specializari_unice = ["Toate"] + sorted(df_doctori['Specializare'].unique().tolist())
             filtru_specializare = st.selectbox("Filtrează după Specializare:", specializari_unice)
             
+            pozitii = None
             if filtru_specializare != "Toate":
-                df_doctori = df_doctori[df_doctori['Specializare'] == filtru_specializare]
+                pozitii = filtru.indices(egal={'Specializare': filtru_specializare})
             
-            # Afișează tabelul
-            st.dataframe(
-                df_doctori,
-                use_container_width=True,
-                hide_index=True,
+            # Afișează tabelul (doar pagina curentă ajunge în browser)
+            paged_table(
+                filtru.window,
+                key="tabel_doctori",
+                pozitii=pozitii,
                 column_config={
                     "ID": st.column_config.NumberColumn("ID", width="small"),
                     "Email": st.column_config.TextColumn("Email", width="medium")
-                }
-            )
-            
-            # Opțiune de export
-            csv = df_doctori.to_csv(index=False).encode('utf-8')
-            st.download_button(
-                label="📥 Descarcă CSV",
-                data=csv,
-                file_name=f"doctori_{datetime.now().strftime('%Y%m%d')}.csv",
-                mime="text/csv"
+                },
+                export=f"doctori_{datetime.now().strftime('%Y%m%d')}"
             )
         else:
             st.warning("📭 Nu există doctori în baza de date")
@@ -439,13 +500,7 @@ def main():
             df_doctori = get_all_doctori()
             
             if not df_doctori.empty:
-                # Filtrare
-                mask = (
-                    df_doctori['Nume'].str.contains(search_term, case=False, na=False) |
-                    df_doctori['Prenume'].str.contains(search_term, case=False, na=False) |
-                    df_doctori['Specializare'].str.contains(search_term, case=False, na=False)
-                )
-                rezultate = df_doctori[mask]
+                rezultate = search_doctori(df_doctori, search_term)
                 
                 if not rezultate.empty:
                     st.success(f"✅ Găsite {len(rezultate)} rezultate")
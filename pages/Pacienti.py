@@ -1,5 +1,11 @@
 import streamlit as st
 from database.connection import db
+from database.changes import execute_tracked, tracked_frame
+from database.shared_cache import cached
+from database.search import search
+from components.paged_table import paged_table
+from database.timeline import get_timeline_cache
+from database.dedup import check_new_patient, find_duplicates, PRAG
 import pandas as pd
 from datetime import datetime
 
@@ -40,41 +46,76 @@ def validate_cnp(cnp):
     return True, "Valid"
 
 
+PACIENTI_QUERY = """
+    SELECT 
+        p.id_pacient as ID,
+        p.nume as Nume,
+        p.prenume as Prenume,
+        p.CNP,
+        CONVERT(VARCHAR, p.data_nasterii, 103) as [Data Nașterii],
+        p.gen as Gen,
+        p.telefon as Telefon,
+        p.email as Email,
+        s.nume_sectie as Sectie,
+        CASE 
+            WHEN p.data_internare IS NOT NULL AND p.data_externare IS NULL 
+            THEN 'Internat' 
+            ELSE 'Extern' 
+        END as Status
+    FROM Pacient p
+    LEFT JOIN Sectie s ON p.id_sectie = s.id_sectie
+    {filtru}
+    ORDER BY p.id_pacient DESC
+"""
+
+
+def _pacienti_frame():
+    return tracked_frame(
+        "pacienti",
+        PACIENTI_QUERY,
+        {'Pacient': ('ID', 'p.id_pacient')},
+        sort_by='ID',
+        ascending=False,
+        reincarca_la=('Sectie',),
+        replica=True
+    )
+
+
+def search_pacienti(df_pacienti, search_term):
+    """Rândurile găsite în indexul comun de căutare (prefixe, fără diacritice), în ordinea relevanței"""
+    try:
+        ids = [r['id'] for r in search(search_term, tipuri=('pacient',), limit=None)]
+    except Exception as e:
+        st.error(f"Căutarea nu este disponibilă: {e}")
+        return df_pacienti.iloc[0:0]
+    ordine = {id_: i for i, id_ in enumerate(ids)}
+    rezultate = df_pacienti[df_pacienti['ID'].isin(ordine)]
+    return rezultate.sort_values('ID', key=lambda coloana: coloana.map(ordine))
+
+
 def get_all_pacienti():
-    """Obține toți pacienții din baza de date"""
+    """Obține toți pacienții (actualizați incremental din ChangeLog)"""
     try:
-        query = """
-            SELECT 
-                p.id_pacient as ID,
-                p.nume as Nume,
-                p.prenume as Prenume,
-                p.CNP,
-                CONVERT(VARCHAR, p.data_nasterii, 103) as [Data Nașterii],
-                p.gen as Gen,
-                p.telefon as Telefon,
-                p.email as Email,
-                s.nume_sectie as Sectie,
-                CASE 
-                    WHEN p.data_internare IS NOT NULL AND p.data_externare IS NULL 
-                    THEN 'Internat' 
-                    ELSE 'Extern' 
-                END as Status
-            FROM Pacient p
-            LEFT JOIN Sectie s ON p.id_sectie = s.id_sectie
-            ORDER BY p.id_pacient DESC
-        """
-        return db.fetch_dataframe(query)
+        return _pacienti_frame().get()
     except Exception as e:
         st.error(f"Eroare la citirea pacienților: {e}")
         return pd.DataFrame()
 
 
+def get_pacienti_window():
+    """TableWindow peste lista de pacienți (None dacă citirea eșuează)"""
+    try:
+        return _pacienti_frame().get_window()
+    except Exception as e:
+        st.error(f"Eroare la citirea pacienților: {e}")
+        return None
+
+
 def get_sectii():
     """Obține lista de secții pentru dropdown"""
     try:
         query = "SELECT id_sectie, nume_sectie FROM Sectie ORDER BY nume_sectie"
-        df = db.fetch_dataframe(query)
-        return df
+        return cached("sectii", lambda: db.fetch_dataframe(query), depinde_de=('Sectie',))
     except Exception as e:
         st.error(f"Eroare la citirea secțiilor: {e}")
         return pd.DataFrame()
@@ -83,15 +124,13 @@ def get_sectii():
 def add_pacient(nume, prenume, cnp, data_nasterii, gen, adresa, telefon, email, id_sectie):
     """Adaugă un pacient nou în baza de date"""
     try:
-        # Convertim id_sectie la int Python sau None
-        id_sectie_final = int(id_sectie) if id_sectie is not None else None
-        
         query = """
             INSERT INTO Pacient 
             (nume, prenume, CNP, data_nasterii, gen, adresa, telefon, email, id_sectie)
             VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)
         """
-        db.execute_query(query, (nume, prenume, cnp, data_nasterii, gen, adresa, telefon, email, id_sectie_final))
+        execute_tracked(query, (nume, prenume, cnp, data_nasterii, gen, adresa, telefon, email, id_sectie),
+                        'Pacient', 'I')
         return True, "✅ Pacient adăugat cu succes!"
     except Exception as e:
         return False, f"❌ Eroare: {str(e)}"
@@ -100,17 +139,14 @@ def add_pacient(nume, prenume, cnp, data_nasterii, gen, adresa, telefon, email,
 def update_pacient(id_pacient, nume, prenume, cnp, data_nasterii, gen, adresa, telefon, email, id_sectie):
     """Actualizează datele unui pacient"""
     try:
-        # Convertim id_sectie și id_pacient la int Python
-        id_sectie_final = int(id_sectie) if id_sectie is not None else None
-        id_pacient_final = int(id_pacient)
-        
         query = """
             UPDATE Pacient 
             SET nume=?, prenume=?, CNP=?, data_nasterii=?, gen=?, 
                 adresa=?, telefon=?, email=?, id_sectie=?
             WHERE id_pacient=?
         """
-        db.execute_query(query, (nume, prenume, cnp, data_nasterii, gen, adresa, telefon, email, id_sectie_final, id_pacient_final))
+        execute_tracked(query, (nume, prenume, cnp, data_nasterii, gen, adresa, telefon, email, id_sectie, id_pacient),
+                        'Pacient', 'U', id_pacient)
         return True, "✅ Pacient actualizat cu succes!"
     except Exception as e:
         return False, f"❌ Eroare: {str(e)}"
@@ -119,11 +155,8 @@ def update_pacient(id_pacient, nume, prenume, cnp, data_nasterii, gen, adresa, t
 def delete_pacient(id_pacient):
     """Șterge un pacient din baza de date"""
     try:
-        # Convertim la int Python
-        id_pacient_final = int(id_pacient)
-        
         query = "DELETE FROM Pacient WHERE id_pacient=?"
-        db.execute_query(query, (id_pacient_final,))
+        execute_tracked(query, (id_pacient,), 'Pacient', 'D', id_pacient)
         return True, "✅ Pacient șters cu succes!"
     except Exception as e:
         return False, f"❌ Eroare: {str(e)}"
@@ -144,6 +177,37 @@ def get_pacient_by_id(id_pacient):
         return None
 
 
+def get_istoric_pacient(id_pacient, pagini=1):
+    """Istoricul medical al pacientului (programări, diagnostice, internări).
+
+    Returnează (DataFrame, mai_are); mai_are spune dacă există evenimente mai vechi.
+    """
+    try:
+        return get_timeline_cache().get(id_pacient, pagini)
+    except Exception as e:
+        st.error(f"Eroare la citirea istoricului: {e}")
+        return pd.DataFrame(), False
+
+
+def get_posibile_duplicate(nume, prenume, cnp, data_nasterii, telefon):
+    """Pacienții existenți care par a fi aceeași persoană cu cel introdus"""
+    try:
+        return check_new_patient(nume, prenume, cnp, data_nasterii, telefon)
+    except Exception as e:
+        # Verificarea nu trebuie să blocheze adăugarea
+        st.warning(f"Verificarea duplicatelor a eșuat: {e}")
+        return pd.DataFrame()
+
+
+def get_raport_duplicate(prag):
+    """Toate perechile de posibile duplicate din baza de date"""
+    try:
+        return find_duplicates(prag)
+    except Exception as e:
+        st.error(f"Eroare la căutarea duplicatelor: {e}")
+        return pd.DataFrame()
+
+
 # ===== INTERFAȚA UTILIZATOR =====
 
 def main():
@@ -151,11 +215,13 @@ def main():
     st.markdown("---")
     
     # Tabs pentru diferite operații
-    tab1, tab2, tab3, tab4 = st.tabs([
+    tab1, tab2, tab3, tab4, tab5, tab6 = st.tabs([
         "📋 Lista Pacienți", 
         "➕ Adaugă Pacient", 
         "✏️ Modifică Pacient",
-        "🔍 Caută Pacient"
+        "🔍 Caută Pacient",
+        "🕒 Istoric Medical",
+        "👯 Posibile Duplicate"
     ])
     
     # ===== TAB 1: LISTA PACIENȚI =====
@@ -168,33 +234,24 @@ def main():
             if st.button("🔄 Reîmprospătează"):
                 st.rerun()
         
-        # Obține și afișează pacienții
-        df_pacienti = get_all_pacienti()
+        # Obține și afișează pacienții (doar pagina curentă ajunge în browser)
+        window = get_pacienti_window()
         
-        if not df_pacienti.empty:
-            st.info(f"📊 Total pacienți: **{len(df_pacienti)}**")
+        if window is not None and not window.df.empty:
+            st.info(f"📊 Total pacienți: **{len(window.df)}**")
             
-            # Afișează tabelul
-            st.dataframe(
-                df_pacienti,
-                use_container_width=True,
-                hide_index=True,
+            paged_table(
+                window,
+                key="tabel_pacienti",
+                cautare_in=['Nume', 'Prenume', 'CNP'],
                 column_config={
                     "ID": st.column_config.NumberColumn("ID", width="small"),
                     "Status": st.column_config.TextColumn(
                         "Status",
                         help="Internat sau Extern"
                     )
-                }
-            )
-            
-            # Opțiune de export
-            csv = df_pacienti.to_csv(index=False).encode('utf-8')
-            st.download_button(
-                label="📥 Descarcă CSV",
-                data=csv,
-                file_name=f"pacienti_{datetime.now().strftime('%Y%m%d')}.csv",
-                mime="text/csv"
+                },
+                export=f"pacienti_{datetime.now().strftime('%Y%m%d')}"
             )
         else:
             st.warning("📭 Nu există pacienți în baza de date")
@@ -244,8 +301,7 @@ def main():
                         if sectie_selectata != "Nicio secție":
                             id_sectie = df_sectii[df_sectii['nume_sectie'] == sectie_selectata]['id_sectie'].iloc[0]
                         
-                        # Adaugă în baza de date
-                        success, message = add_pacient(
+                        pacient_nou = (
                             nume, prenume, cnp, data_nasterii, gen,
                             adresa if adresa else None,
                             telefon if telefon else None,
@@ -253,10 +309,41 @@ def main():
                             id_sectie
                         )
                         
-                        if success:
-                            st.success(message)
+                        # Verificare duplicate înainte de adăugare
+                        duplicate = get_posibile_duplicate(nume, prenume, cnp, data_nasterii, telefon)
+                        if not duplicate.empty:
+                            st.session_state['pacient_in_asteptare'] = pacient_nou
+                            st.session_state['duplicate_gasite'] = duplicate
                         else:
-                            st.error(message)
+                            # Adaugă în baza de date
+                            success, message = add_pacient(*pacient_nou)
+                            
+                            if success:
+                                st.success(message)
+                            else:
+                                st.error(message)
+        
+        # Pacient care seamănă cu unul existent - așteaptă confirmarea
+        if 'pacient_in_asteptare' in st.session_state:
+            pacient_nou = st.session_state['pacient_in_asteptare']
+            st.warning(f"⚠️ {pacient_nou[0]} {pacient_nou[1]} seamănă cu pacienți existenți. Verificați înainte de adăugare:")
+            st.dataframe(st.session_state['duplicate_gasite'], use_container_width=True, hide_index=True)
+            
+            col_da, col_nu = st.columns(2)
+            with col_da:
+                if st.button("✅ Adaugă oricum"):
+                    success, message = add_pacient(*pacient_nou)
+                    del st.session_state['pacient_in_asteptare']
+                    del st.session_state['duplicate_gasite']
+                    if success:
+                        st.success(message)
+                    else:
+                        st.error(message)
+            with col_nu:
+                if st.button("❌ Renunță"):
+                    del st.session_state['pacient_in_asteptare']
+                    del st.session_state['duplicate_gasite']
+                    st.rerun()
     
     # ===== TAB 3: MODIFICĂ PACIENT =====
     with tab3:
@@ -355,13 +442,7 @@ def main():
             df_pacienti = get_all_pacienti()
             
             if not df_pacienti.empty:
-                # Filtrare
-                mask = (
-                    df_pacienti['Nume'].str.contains(search_term, case=False, na=False) |
-                    df_pacienti['Prenume'].str.contains(search_term, case=False, na=False) |
-                    df_pacienti['CNP'].str.contains(search_term, case=False, na=False)
-                )
-                rezultate = df_pacienti[mask]
+                rezultate = search_pacienti(df_pacienti, search_term)
                 
                 if not rezultate.empty:
                     st.success(f"✅ Găsite {len(rezultate)} rezultate")
@@ -370,6 +451,89 @@ def main():
                     st.warning("❌ Nu s-au găsit rezultate")
             else:
                 st.info("📭 Baza de date este goală")
+    
+    # ===== TAB 5: ISTORIC MEDICAL =====
+    with tab5:
+        st.markdown("### 🕒 Istoric Medical")
+        
+        df_pacienti = get_all_pacienti()
+        
+        if not df_pacienti.empty:
+            nume_pacienti = dict(zip(
+                df_pacienti['ID'],
+                df_pacienti['Nume'] + ' ' + df_pacienti['Prenume'] + ' (CNP: ' + df_pacienti['CNP'].fillna('') + ')'
+            ))
+            pacient_istoric = st.selectbox(
+                "Selectează Pacient",
+                options=df_pacienti['ID'].tolist(),
+                format_func=lambda x: f"ID {x} - {nume_pacienti[x]}",
+                key="pacient_istoric"
+            )
+            
+            # Numărul de pagini încărcate, reținut per pacient
+            cheie_pagini = f"istoric_pagini_{pacient_istoric}"
+            pagini = st.session_state.get(cheie_pagini, 1)
+            df_istoric, mai_are = get_istoric_pacient(pacient_istoric, pagini)
+            
+            if not df_istoric.empty:
+                col1, col2, col3 = st.columns(3)
+                with col1:
+                    st.metric("📅 Programări", int((df_istoric['Tip'] == 'Programare').sum()))
+                with col2:
+                    st.metric("🩺 Diagnostice", int((df_istoric['Tip'] == 'Diagnostic').sum()))
+                with col3:
+                    st.metric("🛏️ Internări", int((df_istoric['Tip'] == 'Internare').sum()))
+                
+                st.dataframe(
+                    df_istoric.drop(columns=['id', 'ordine']),
+                    use_container_width=True,
+                    hide_index=True,
+                    column_config={
+                        "Moment": st.column_config.DatetimeColumn("Data", format="DD/MM/YYYY HH:mm")
+                    }
+                )
+                
+                if mai_are:
+                    if st.button("⬇️ Încarcă evenimente mai vechi"):
+                        st.session_state[cheie_pagini] = pagini + 1
+                        st.rerun()
+                else:
+                    st.caption(f"Istoric complet: {len(df_istoric)} evenimente")
+            else:
+                st.info("📭 Pacientul nu are evenimente în istoric")
+        else:
+            st.warning("📭 Nu există pacienți în baza de date")
+    
+    # ===== TAB 6: POSIBILE DUPLICATE =====
+    with tab6:
+        st.markdown("### 👯 Posibile Duplicate")
+        st.caption("Perechi de pacienți cu aceeași dată de naștere, prefix CNP sau nume asemănător, ordonate după scor")
+        
+        prag = st.slider("Scor minim", min_value=0.5, max_value=1.0, value=PRAG, step=0.05)
+        
+        if st.button("🔎 Caută duplicate"):
+            df_duplicate = get_raport_duplicate(prag)
+            
+            if not df_duplicate.empty:
+                st.warning(f"⚠️ {len(df_duplicate)} perechi de posibile duplicate")
+                st.dataframe(
+                    df_duplicate,
+                    use_container_width=True,
+                    hide_index=True,
+                    column_config={
+                        "Scor": st.column_config.ProgressColumn("Scor", min_value=0.0, max_value=1.0, format="%.2f")
+                    }
+                )
+                
+                csv = df_duplicate.to_csv(index=False).encode('utf-8')
+                st.download_button(
+                    label="📥 Descarcă CSV",
+                    data=csv,
+                    file_name=f"duplicate_pacienti_{datetime.now().strftime('%Y%m%d')}.csv",
+                    mime="text/csv"
+                )
+            else:
+                st.success("✅ Nu s-au găsit posibile duplicate")
 
 
 if __name__ == "__main__":
@@ -1,5 +1,11 @@
 import streamlit as st
 from database.connection import db
+from database.changes import execute_tracked, tracked_frame
+from components.paged_table import paged_table
+from database.live_board import get_live_board, REFRESH_SECONDS
+from database import offline
+from database.shared_cache import cached
+from components.offline_banner import offline_banner
 import pandas as pd
 from datetime import datetime, time, timedelta
 
@@ -35,39 +41,87 @@ st.markdown("""
 
 # ===== FUNCȚII PENTRU OPERAȚII CRUD =====
 
+PROGRAMARI_QUERY = """
+    SELECT 
+        pr.id_programare as ID,
+        p.nume + ' ' + p.prenume as Pacient,
+        d.nume + ' ' + d.prenume as Doctor,
+        s.nume_sectie as Sectie,
+        CONVERT(VARCHAR, pr.data_programare, 103) as Data,
+        CONVERT(VARCHAR(5), pr.ora_programare, 108) as Ora,
+        pr.tip_programare as [Tip Programare],
+        pr.cauza as Cauza,
+        pr.id_pacient,
+        pr.id_doctor,
+        pr.id_sectie,
+        pr.data_programare as data_sort,
+        pr.ora_programare as ora_sort
+    FROM Programare pr
+    JOIN Pacient p ON pr.id_pacient = p.id_pacient
+    JOIN Doctor d ON pr.id_doctor = d.id_doctor
+    LEFT JOIN Sectie s ON pr.id_sectie = s.id_sectie
+    {filtru}
+    ORDER BY pr.data_programare DESC, pr.ora_programare DESC
+"""
+
+
+def _postprocess_programari(df):
+    df['ID'] = df['ID'].astype(int)
+    # Data se parsează o singură dată, la încărcare (folosită de FrameFilter)
+    df['data_sort'] = pd.to_datetime(df['data_sort'])
+    return df
+
+
+def _programari_frame():
+    return tracked_frame(
+        "programari",
+        PROGRAMARI_QUERY,
+        {
+            'Programare': ('ID', 'pr.id_programare'),
+            'Pacient': ('id_pacient', 'pr.id_pacient'),
+            'Doctor': ('id_doctor', 'pr.id_doctor'),
+            'Sectie': ('id_sectie', 'pr.id_sectie'),
+        },
+        sort_by=['data_sort', 'ora_sort'],
+        ascending=False,
+        postprocess=_postprocess_programari,
+        filter_on='data_sort',
+        replica=True
+    )
+
+
 def get_all_programari():
-    """Obține toate programările din baza de date"""
+    """Obține toate programările (actualizate incremental din ChangeLog)"""
     try:
-        query = """
-            SELECT 
-                pr.id_programare as ID,
-                p.nume + ' ' + p.prenume as Pacient,
-                d.nume + ' ' + d.prenume as Doctor,
-                s.nume_sectie as Sectie,
-                CONVERT(VARCHAR, pr.data_programare, 103) as Data,
-                CONVERT(VARCHAR(5), pr.ora_programare, 108) as Ora,
-                pr.tip_programare as [Tip Programare],
-                pr.cauza as Cauza,
-                pr.id_pacient,
-                pr.id_doctor,
-                pr.id_sectie,
-                pr.data_programare as data_sort,
-                pr.ora_programare as ora_sort
-            FROM Programare pr
-            JOIN Pacient p ON pr.id_pacient = p.id_pacient
-            JOIN Doctor d ON pr.id_doctor = d.id_doctor
-            LEFT JOIN Sectie s ON pr.id_sectie = s.id_sectie
-            ORDER BY pr.data_programare DESC, pr.ora_programare DESC
-        """
-        df = db.fetch_dataframe(query)
-        if not df.empty:
-            df['ID'] = df['ID'].astype(int)
-        return df
+        return _programari_frame().get()
     except Exception as e:
         st.error(f"Eroare la citirea programărilor: {e}")
         return pd.DataFrame()
 
 
+def get_programari_filter():
+    """FrameFilter peste lista de programări (None dacă citirea eșuează)"""
+    try:
+        return _programari_frame().get_filter()
+    except Exception as e:
+        st.error(f"Eroare la citirea programărilor: {e}")
+        return None
+
+
+def get_period_range(perioada):
+    """Intervalul de date (start, end) pentru opțiunile din filtrul de perioadă"""
+    today = pd.Timestamp.now().normalize()
+    if perioada == "Astăzi":
+        return today, today
+    if perioada == "Săptămâna aceasta":
+        return today, today + timedelta(days=7)
+    if perioada == "Luna aceasta":
+        return today, today + timedelta(days=30)
+    if perioada == "Viitoare":
+        return today, None
+    return None, None
+
+
 def get_pacienti():
     """Obține lista de pacienți pentru dropdown"""
     try:
@@ -78,7 +132,7 @@ def get_pacienti():
             FROM Pacient
             ORDER BY nume, prenume
         """
-        df = db.fetch_dataframe(query)
+        df = offline.read(lambda: db.fetch_dataframe(query), offline.LOCAL_PACIENTI)
         if not df.empty:
             df['id_pacient'] = df['id_pacient'].astype(int)
         return df
@@ -97,7 +151,10 @@ def get_doctori():
             FROM Doctor
             ORDER BY nume, prenume
         """
-        df = db.fetch_dataframe(query)
+        df = offline.read(
+            lambda: cached("doctori_dropdown", lambda: db.fetch_dataframe(query), depinde_de=('Doctor',)),
+            offline.LOCAL_DOCTORI
+        )
         if not df.empty:
             df['id_doctor'] = df['id_doctor'].astype(int)
         return df
@@ -110,7 +167,10 @@ def get_sectii():
     """Obține lista de secții pentru dropdown"""
     try:
         query = "SELECT id_sectie, nume_sectie FROM Sectie ORDER BY nume_sectie"
-        df = db.fetch_dataframe(query)
+        df = offline.read(
+            lambda: cached("sectii", lambda: db.fetch_dataframe(query), depinde_de=('Sectie',)),
+            offline.LOCAL_SECTII
+        )
         if not df.empty:
             df['id_sectie'] = df['id_sectie'].astype(int)
         return df
@@ -143,7 +203,7 @@ def check_doctor_availability(id_doctor, data_programare, ora_programare):
             AND data_programare = ?
             AND ora_programare = ?
         """
-        df = db.fetch_dataframe(query, params=(int(id_doctor), data_programare, ora_programare))
+        df = db.fetch_dataframe(query, params=(id_doctor, data_programare, ora_programare))
         count = int(df['count'].iloc[0]) if not df.empty else 0
         return count == 0
     except Exception as e:
@@ -165,26 +225,36 @@ def get_programari_doctor(id_doctor, data_programare):
             AND pr.data_programare = ?
             ORDER BY pr.ora_programare
         """
-        df = db.fetch_dataframe(query, params=(int(id_doctor), data_programare))
+        df = db.fetch_dataframe(query, params=(id_doctor, data_programare))
         return df
     except Exception as e:
         return pd.DataFrame()
 
 
+def add_programare_offline(id_pacient, id_doctor, id_sectie, data_programare, ora_programare, tip_programare, cauza):
+    """Pune programarea în coada locală (trimisă automat la revenirea conexiunii)"""
+    replica = offline.get_local_replica()
+    try:
+        if not replica.is_available(id_doctor, data_programare, ora_programare):
+            return False, "❌ Doctorul selectat are deja o programare la această dată și oră!"
+        replica.queue_booking(id_pacient, id_doctor, id_sectie, data_programare,
+                              ora_programare, tip_programare, cauza)
+        return True, "📥 Serverul nu răspunde: programarea a fost salvată local și va fi trimisă automat la revenirea conexiunii."
+    except Exception as e:
+        return False, f"❌ Eroare: {str(e)}"
+
+
 def add_programare(id_pacient, id_doctor, id_sectie, data_programare, ora_programare, tip_programare, cauza):
     """Adaugă o programare nouă"""
     try:
-        id_pacient_final = int(id_pacient)
-        id_doctor_final = int(id_doctor)
-        id_sectie_final = int(id_sectie) if id_sectie is not None else None
-        
         query = """
             INSERT INTO Programare 
             (id_pacient, id_doctor, id_sectie, data_programare, ora_programare, tip_programare, cauza)
             VALUES (?, ?, ?, ?, ?, ?, ?)
         """
-        db.execute_query(query, (id_pacient_final, id_doctor_final, id_sectie_final, 
-                                 data_programare, ora_programare, tip_programare, cauza))
+        execute_tracked(query, (id_pacient, id_doctor, id_sectie, 
+                                data_programare, ora_programare, tip_programare, cauza),
+                        'Programare', 'I')
         return True, "✅ Programare adăugată cu succes!"
     except Exception as e:
         return False, f"❌ Eroare: {str(e)}"
@@ -193,19 +263,15 @@ def add_programare(id_pacient, id_doctor, id_sectie, data_programare, ora_progra
 def update_programare(id_programare, id_pacient, id_doctor, id_sectie, data_programare, ora_programare, tip_programare, cauza):
     """Actualizează o programare existentă"""
     try:
-        id_programare_final = int(id_programare)
-        id_pacient_final = int(id_pacient)
-        id_doctor_final = int(id_doctor)
-        id_sectie_final = int(id_sectie) if id_sectie is not None else None
-        
         query = """
             UPDATE Programare
             SET id_pacient=?, id_doctor=?, id_sectie=?, data_programare=?, 
                 ora_programare=?, tip_programare=?, cauza=?
             WHERE id_programare=?
         """
-        db.execute_query(query, (id_pacient_final, id_doctor_final, id_sectie_final,
-                                 data_programare, ora_programare, tip_programare, cauza, id_programare_final))
+        execute_tracked(query, (id_pacient, id_doctor, id_sectie,
+                                data_programare, ora_programare, tip_programare, cauza, id_programare),
+                        'Programare', 'U', id_programare)
         return True, "✅ Programare actualizată cu succes!"
     except Exception as e:
         return False, f"❌ Eroare: {str(e)}"
@@ -214,9 +280,8 @@ def update_programare(id_programare, id_pacient, id_doctor, id_sectie, data_prog
 def delete_programare(id_programare):
     """Șterge o programare"""
     try:
-        id_programare_final = int(id_programare)
         query = "DELETE FROM Programare WHERE id_programare=?"
-        db.execute_query(query, (id_programare_final,))
+        execute_tracked(query, (id_programare,), 'Programare', 'D', id_programare)
         return True, "✅ Programare ștearsă cu succes!"
     except Exception as e:
         return False, f"❌ Eroare: {str(e)}"
@@ -226,7 +291,7 @@ def get_programare_by_id(id_programare):
     """Obține detaliile unei programări"""
     try:
         query = "SELECT * FROM Programare WHERE id_programare=?"
-        df = db.fetch_dataframe(query, params=(int(id_programare),))
+        df = db.fetch_dataframe(query, params=(id_programare,))
         if not df.empty:
             return df.iloc[0]
         return None
@@ -236,51 +301,94 @@ def get_programare_by_id(id_programare):
 
 
 def get_programari_today():
-    """Obține programările de astăzi"""
-    try:
-        query = """
-            SELECT 
-                CONVERT(VARCHAR(5), pr.ora_programare, 108) as Ora,
-                p.nume + ' ' + p.prenume as Pacient,
-                d.nume + ' ' + d.prenume as Doctor,
-                pr.tip_programare as Tip
-            FROM Programare pr
-            JOIN Pacient p ON pr.id_pacient = p.id_pacient
-            JOIN Doctor d ON pr.id_doctor = d.id_doctor
-            WHERE CAST(pr.data_programare AS DATE) = CAST(GETDATE() AS DATE)
-            ORDER BY pr.ora_programare
-        """
-        return db.fetch_dataframe(query)
-    except Exception as e:
-        return pd.DataFrame()
+    """Obține programările de astăzi (din snapshot-ul panoului live)"""
+    return get_live_board().snapshot()['today']
 
 
 def get_programari_viitoare():
-    """Obține programările viitoare (următoarele 7 zile)"""
-    try:
-        query = """
-            SELECT 
-                CONVERT(VARCHAR, pr.data_programare, 103) as Data,
-                CONVERT(VARCHAR(5), pr.ora_programare, 108) as Ora,
-                p.nume + ' ' + p.prenume as Pacient,
-                d.nume + ' ' + d.prenume as Doctor,
-                pr.tip_programare as Tip
-            FROM Programare pr
-            JOIN Pacient p ON pr.id_pacient = p.id_pacient
-            JOIN Doctor d ON pr.id_doctor = d.id_doctor
-            WHERE pr.data_programare BETWEEN CAST(GETDATE() AS DATE) 
-                  AND DATEADD(day, 7, CAST(GETDATE() AS DATE))
-            ORDER BY pr.data_programare, pr.ora_programare
-        """
-        return db.fetch_dataframe(query)
-    except Exception as e:
-        return pd.DataFrame()
+    """Obține programările viitoare (următoarele 7 zile, din snapshot-ul panoului live)"""
+    return get_live_board().snapshot()['viitoare']
+
+
+@st.fragment(run_every=REFRESH_SECONDS)
+def show_programari_astazi():
+    """Panou live: se redesenează singur la fiecare interval, fără rerun de pagină"""
+    snapshot = get_live_board().snapshot()
+    
+    if snapshot['eroare']:
+        st.warning(f"⚠️ Ultima actualizare a eșuat: {snapshot['eroare']}")
+    if snapshot['actualizat'] is not None:
+        st.caption(f"🔄 Actualizat la {snapshot['actualizat'].strftime('%H:%M:%S')} • reîmprospătare automată la {REFRESH_SECONDS}s")
+    
+    df_today = snapshot['today']
+    
+    if not df_today.empty:
+        st.success(f"📅 **{len(df_today)}** programări astăzi")
+        
+        st.dataframe(
+            df_today,
+            use_container_width=True,
+            hide_index=True
+        )
+        
+        st.markdown("---")
+        st.markdown("### 📆 Programări Următoarele 7 Zile")
+        
+        df_viitoare = snapshot['viitoare']
+        
+        if not df_viitoare.empty:
+            st.info(f"📊 **{len(df_viitoare)}** programări")
+            st.dataframe(df_viitoare, use_container_width=True, hide_index=True)
+        else:
+            st.info("📭 Nicio programare în următoarele 7 zile")
+    else:
+        st.info("📭 Nicio programare astăzi")
+
+
+def show_coada_offline():
+    """Programările făcute offline care așteaptă trimiterea sau au intrat în conflict"""
+    replica = offline.get_local_replica()
+    if replica is None:
+        return
+    df_coada = replica.queued()
+    df_coada = df_coada[df_coada['stare'] != 'trimis']
+    if df_coada.empty:
+        return
+    
+    st.markdown("---")
+    st.markdown("### 📥 Programări făcute offline")
+    df_pacienti = get_pacienti()
+    df_doctori = get_doctori()
+    df_afisat = pd.DataFrame({
+        'Nr': df_coada['id'],
+        'Pacient': df_coada['id_pacient'].map(df_pacienti.set_index('id_pacient')['nume_complet']) if not df_pacienti.empty else df_coada['id_pacient'],
+        'Doctor': df_coada['id_doctor'].map(df_doctori.set_index('id_doctor')['nume_complet']) if not df_doctori.empty else df_coada['id_doctor'],
+        'Data': pd.to_datetime(df_coada['data_programare']).dt.strftime('%d/%m/%Y'),
+        'Ora': df_coada['ora_programare'],
+        'Stare': df_coada['stare'].map({'asteptare': '⏳ În așteptare', 'trimitere': '📤 Se trimite',
+                                       'conflict': '❗ Conflict'}),
+        'Detalii': df_coada['mesaj'],
+    })
+    st.dataframe(df_afisat, use_container_width=True, hide_index=True)
+    
+    conflicte = df_coada[df_coada['stare'] == 'conflict']['id'].tolist()
+    if conflicte:
+        col1, col2 = st.columns([3, 1])
+        with col1:
+            id_coada = st.selectbox("Conflict rezolvat (reprogramat manual):", conflicte,
+                                    format_func=lambda x: f"Nr. {x}")
+        with col2:
+            st.write("")
+            if st.button("🗑️ Elimină din coadă"):
+                replica.dismiss(id_coada)
+                st.rerun()
 
 
 # ===== INTERFAȚA UTILIZATOR =====
 
 def main():
     st.title("📅 Gestionare Programări")
+    este_offline = offline_banner()
     st.markdown("---")
     
     tab1, tab2, tab3, tab4, tab5 = st.tabs([
@@ -300,7 +408,9 @@ def main():
             if st.button("🔄 Reîmprospătează"):
                 st.rerun()
         
-        df_programari = get_all_programari()
+        # Offline: copia locală are doar zilele următoare (tab-ul 🔔), nu tot istoricul
+        filtru = None if este_offline else get_programari_filter()
+        df_programari = filtru.df if filtru is not None else pd.DataFrame()
         
         if not df_programari.empty:
             st.info(f"📊 Total programări: **{len(df_programari)}**")
@@ -318,52 +428,32 @@ def main():
             with col_f3:
                 perioada = st.selectbox("Perioadă:", ["Toate", "Astăzi", "Săptămâna aceasta", "Luna aceasta", "Viitoare"])
             
-            df_filtrat = df_programari.copy()
-            
-            if filtru_doctor != "Toți":
-                df_filtrat = df_filtrat[df_filtrat['Doctor'] == filtru_doctor]
-            
-            if filtru_tip != "Toate":
-                df_filtrat = df_filtrat[df_filtrat['Tip Programare'] == filtru_tip]
-            
-            if perioada != "Toate":
-                today = pd.Timestamp.now().normalize()
-                if perioada == "Astăzi":
-                    df_filtrat = df_filtrat[pd.to_datetime(df_filtrat['data_sort']) == today]
-                elif perioada == "Săptămâna aceasta":
-                    week_end = today + timedelta(days=7)
-                    df_filtrat = df_filtrat[
-                        (pd.to_datetime(df_filtrat['data_sort']) >= today) & 
-                        (pd.to_datetime(df_filtrat['data_sort']) <= week_end)
-                    ]
-                elif perioada == "Luna aceasta":
-                    month_end = today + timedelta(days=30)
-                    df_filtrat = df_filtrat[
-                        (pd.to_datetime(df_filtrat['data_sort']) >= today) & 
-                        (pd.to_datetime(df_filtrat['data_sort']) <= month_end)
-                    ]
-                elif perioada == "Viitoare":
-                    df_filtrat = df_filtrat[pd.to_datetime(df_filtrat['data_sort']) >= today]
-            
-            df_display = df_filtrat[['ID', 'Pacient', 'Doctor', 'Sectie', 'Data', 'Ora', 'Tip Programare', 'Cauza']].copy()
+            # Toate filtrele într-o singură trecere; doar pagina curentă se copiază
+            start, end = get_period_range(perioada)
+            pozitii = filtru.indices(
+                egal={
+                    'Doctor': filtru_doctor if filtru_doctor != "Toți" else None,
+                    'Tip Programare': filtru_tip if filtru_tip != "Toate" else None
+                },
+                start=start,
+                end=end
+            )
             
-            st.dataframe(
-                df_display,
-                use_container_width=True,
-                hide_index=True,
+            paged_table(
+                filtru.window,
+                key="tabel_programari",
+                pozitii=pozitii,
+                columns=['ID', 'Pacient', 'Doctor', 'Sectie', 'Data', 'Ora', 'Tip Programare', 'Cauza'],
+                cautare_in=['Pacient', 'Cauza'],
+                sortare={'Data': 'data_sort', 'Ora': 'ora_sort'},
                 column_config={
                     "ID": st.column_config.NumberColumn("ID", width="small"),
                     "Cauza": st.column_config.TextColumn("Cauza", width="large")
-                }
-            )
-            
-            csv = df_display.to_csv(index=False).encode('utf-8')
-            st.download_button(
-                label="📥 Descarcă CSV",
-                data=csv,
-                file_name=f"programari_{datetime.now().strftime('%Y%m%d')}.csv",
-                mime="text/csv"
+                },
+                export=f"programari_{datetime.now().strftime('%Y%m%d')}"
             )
+        elif este_offline:
+            st.info("📴 Lista completă nu este disponibilă offline - programările din zilele următoare sunt în tab-ul 🔔 Programări Astăzi")
         else:
             st.warning("📭 Nu există programări în baza de date")
     
@@ -419,13 +509,23 @@ def main():
                 submitted = st.form_submit_button("✅ Adaugă Programare", use_container_width=True)
                 
                 if submitted:
-                    if not check_doctor_availability(doctor_selectat, data_programare, ora_programare):
+                    id_sectie = None
+                    if sectie_selectata != "Nicio secție":
+                        id_sectie = df_sectii[df_sectii['nume_sectie'] == sectie_selectata]['id_sectie'].iloc[0]
+                    
+                    if este_offline:
+                        success, message = add_programare_offline(
+                            pacient_selectat, doctor_selectat, id_sectie,
+                            data_programare, ora_programare, tip_programare,
+                            cauza if cauza else None
+                        )
+                        if success:
+                            st.warning(message)
+                        else:
+                            st.error(message)
+                    elif not check_doctor_availability(doctor_selectat, data_programare, ora_programare):
                         st.error("❌ Doctorul selectat are deja o programare la această dată și oră!")
                     else:
-                        id_sectie = None
-                        if sectie_selectata != "Nicio secție":
-                            id_sectie = df_sectii[df_sectii['nume_sectie'] == sectie_selectata]['id_sectie'].iloc[0]
-                        
                         success, message = add_programare(
                             pacient_selectat, doctor_selectat, id_sectie,
                             data_programare, ora_programare, tip_programare,
@@ -436,12 +536,14 @@ def main():
                             st.success(message)
                         else:
                             st.error(message)
+        
+        show_coada_offline()
     
     # ===== TAB 3: MODIFICĂ PROGRAMARE =====
     with tab3:
         st.markdown("### ✏️ Modifică Programare Existentă")
         
-        df_programari = get_all_programari()
+        df_programari = pd.DataFrame() if este_offline else get_all_programari()
         
         if not df_programari.empty:
             programare_ids = [int(x) for x in df_programari['ID'].tolist()]
@@ -553,6 +655,8 @@ def main():
                                 st.success(msg)
                             else:
                                 st.error(msg)
+        elif este_offline:
+            st.info("📴 Programările existente nu pot fi modificate offline")
         else:
             st.warning("📭 Nu există programări")
     
@@ -597,29 +701,7 @@ def main():
     with tab5:
         st.markdown("### 🔔 Programări Astăzi")
         
-        df_today = get_programari_today()
-        
-        if not df_today.empty:
-            st.success(f"📅 **{len(df_today)}** programări astăzi")
-            
-            st.dataframe(
-                df_today,
-                use_container_width=True,
-                hide_index=True
-            )
-            
-            st.markdown("---")
-            st.markdown("### 📆 Programări Următoarele 7 Zile")
-            
-            df_viitoare = get_programari_viitoare()
-            
-            if not df_viitoare.empty:
-                st.info(f"📊 **{len(df_viitoare)}** programări")
-                st.dataframe(df_viitoare, use_container_width=True, hide_index=True)
-            else:
-                st.info("📭 Nicio programare în următoarele 7 zile")
-        else:
-            st.info("📭 Nicio programare astăzi")
+        show_programari_astazi()
 
 
 if __name__ == "__main__":
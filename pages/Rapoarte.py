@@ -1,8 +1,11 @@
 import streamlit as st
-from database.connection import db
+from database.census import get_census
+from database.cube import get_cube
+from database.workload import get_workload, ZILE
+from database.epidemiology import get_outbreak_detector
+from database.snapshots import get_report, latest_manifest, compute_snapshot, start_scheduler
+from components.charts import chart, downsample, bucket_sum
 import pandas as pd
-import plotly.express as px
-import plotly.graph_objects as go
 from datetime import datetime, timedelta
 
 st.set_page_config(
@@ -41,203 +44,397 @@ st.markdown("""
 def get_statistics_overview():
     """Statistici generale"""
     try:
-        stats = {}
-        
-        # Total pacienți
-        query = "SELECT COUNT(*) as total FROM Pacient"
-        df = db.fetch_dataframe(query)
-        stats['total_pacienti'] = int(df['total'].iloc[0]) if not df.empty else 0
-        
-        # Total doctori
-        query = "SELECT COUNT(*) as total FROM Doctor"
-        df = db.fetch_dataframe(query)
-        stats['total_doctori'] = int(df['total'].iloc[0]) if not df.empty else 0
-        
-        # Total programări
-        query = "SELECT COUNT(*) as total FROM Programare"
-        df = db.fetch_dataframe(query)
-        stats['total_programari'] = int(df['total'].iloc[0]) if not df.empty else 0
-        
-        # Total diagnostice
-        query = "SELECT COUNT(*) as total FROM Diagnostic"
-        df = db.fetch_dataframe(query)
-        stats['total_diagnostice'] = int(df['total'].iloc[0]) if not df.empty else 0
-        
-        # Programări luna curentă
-        query = """
-            SELECT COUNT(*) as total 
-            FROM Programare 
-            WHERE MONTH(data_programare) = MONTH(GETDATE()) 
-            AND YEAR(data_programare) = YEAR(GETDATE())
-        """
-        df = db.fetch_dataframe(query)
-        stats['programari_luna'] = int(df['total'].iloc[0]) if not df.empty else 0
-        
-        # Pacienți internați
-        query = """
-            SELECT COUNT(*) as total 
-            FROM Pacient 
-            WHERE data_internare IS NOT NULL AND data_externare IS NULL
-        """
-        df = db.fetch_dataframe(query)
-        stats['pacienti_internati'] = int(df['total'].iloc[0]) if not df.empty else 0
-        
-        return stats
+        df = get_report('statistics_overview')
+        return {k: int(v) for k, v in df.iloc[0].items()}
     except Exception as e:
         st.error(f"Eroare la obținerea statisticilor: {e}")
         return {}
 
 
-def get_top_doctori():
+def get_top_doctori(start=None, end=None):
     """Top 10 doctori după număr de programări"""
     try:
-        query = """
-            SELECT TOP 10
-                d.nume + ' ' + d.prenume as Doctor,
-                d.specializare as Specializare,
-                COUNT(pr.id_programare) as [Număr Programări]
-            FROM Doctor d
-            LEFT JOIN Programare pr ON d.id_doctor = pr.id_doctor
-            GROUP BY d.nume, d.prenume, d.specializare
-            ORDER BY COUNT(pr.id_programare) DESC
-        """
-        return db.fetch_dataframe(query)
+        return get_report('top_doctori', start, end)
     except Exception as e:
         st.error(f"Eroare: {e}")
         return pd.DataFrame()
 
 
-def get_top_boli():
+def get_top_boli(start=None, end=None):
     """Top 10 cele mai frecvente boli"""
     try:
-        query = """
-            SELECT TOP 10
-                boala as Boala,
-                COUNT(*) as [Număr Cazuri],
-                SUM(CASE WHEN severitate = 'severa' THEN 1 ELSE 0 END) as [Cazuri Severe]
-            FROM Diagnostic
-            GROUP BY boala
-            ORDER BY COUNT(*) DESC
-        """
-        return db.fetch_dataframe(query)
+        return get_report('top_boli', start, end)
     except Exception as e:
         return pd.DataFrame()
 
 
-def get_programari_pe_luna():
-    """Programări pe ultimele 6 luni"""
+def get_programari_pe_luna(start=None, end=None):
+    """Programări pe luni în perioada selectată"""
     try:
-        query = """
-            SELECT 
-                FORMAT(data_programare, 'yyyy-MM') as Luna,
-                COUNT(*) as [Număr Programări]
-            FROM Programare
-            WHERE data_programare >= DATEADD(month, -6, GETDATE())
-            GROUP BY FORMAT(data_programare, 'yyyy-MM')
-            ORDER BY FORMAT(data_programare, 'yyyy-MM')
-        """
-        return db.fetch_dataframe(query)
+        return get_report('programari_pe_luna', start, end)
     except Exception as e:
         return pd.DataFrame()
 
 
-def get_distributie_gen():
+def get_distributie_gen(start=None, end=None):
     """Distribuție pacienți pe gen"""
     try:
-        query = """
-            SELECT 
-                gen as Gen,
-                COUNT(*) as Numar
-            FROM Pacient
-            GROUP BY gen
-        """
-        df = db.fetch_dataframe(query)
-        if not df.empty:
-            df['Gen'] = df['Gen'].map({'M': 'Masculin', 'F': 'Feminin'})
-        return df
+        return get_report('distributie_gen', start, end)
     except Exception as e:
         return pd.DataFrame()
 
 
-def get_pacienti_pe_sectie():
+def get_pacienti_pe_sectie(start=None, end=None):
     """Număr pacienți per secție"""
     try:
-        query = """
-            SELECT 
-                s.nume_sectie as Sectie,
-                COUNT(p.id_pacient) as [Număr Pacienți]
-            FROM Sectie s
-            LEFT JOIN Pacient p ON s.id_sectie = p.id_sectie
-            GROUP BY s.nume_sectie
-            ORDER BY COUNT(p.id_pacient) DESC
-        """
-        return db.fetch_dataframe(query)
+        return get_report('pacienti_pe_sectie', start, end)
     except Exception as e:
         return pd.DataFrame()
 
 
-def get_severitate_diagnostice():
+def get_severitate_diagnostice(start=None, end=None):
     """Distribuție diagnostice pe severitate"""
     try:
-        query = """
-            SELECT 
-                severitate as Severitate,
-                COUNT(*) as Numar
-            FROM Diagnostic
-            GROUP BY severitate
-        """
-        return db.fetch_dataframe(query)
+        return get_report('severitate_diagnostice', start, end)
     except Exception as e:
         return pd.DataFrame()
 
 
-def get_programari_per_tip():
+def get_programari_per_tip(start=None, end=None):
     """Programări pe tipuri"""
     try:
-        query = """
-            SELECT 
-                tip_programare as Tip,
-                COUNT(*) as Numar
-            FROM Programare
-            GROUP BY tip_programare
-            ORDER BY COUNT(*) DESC
-        """
-        return db.fetch_dataframe(query)
+        return get_report('programari_per_tip', start, end)
     except Exception as e:
         return pd.DataFrame()
 
 
-def get_activitate_doctori():
+def get_activitate_doctori(start=None, end=None):
     """Activitate doctori - programări și diagnostice"""
     try:
-        query = """
-            SELECT 
-                d.nume + ' ' + d.prenume as Doctor,
-                d.specializare as Specializare,
-                COUNT(DISTINCT pr.id_programare) as Programari,
-                COUNT(DISTINCT dg.id_diagnostic) as Diagnostice
-            FROM Doctor d
-            LEFT JOIN Programare pr ON d.id_doctor = pr.id_doctor
-            LEFT JOIN Diagnostic dg ON d.id_doctor = dg.id_doctor
-            GROUP BY d.nume, d.prenume, d.specializare
-            HAVING COUNT(DISTINCT pr.id_programare) > 0 OR COUNT(DISTINCT dg.id_diagnostic) > 0
-            ORDER BY COUNT(DISTINCT pr.id_programare) DESC
-        """
-        return db.fetch_dataframe(query)
+        return get_report('activitate_doctori', start, end)
     except Exception as e:
         return pd.DataFrame()
 
 
+def get_distributie_ore(start=None, end=None):
+    """Programări pe ora zilei"""
+    try:
+        return get_report('distributie_ore', start, end)
+    except Exception as e:
+        return pd.DataFrame()
+
+
+def get_statistici_programari(start=None, end=None):
+    """Total / viitoare / trecute / astăzi"""
+    try:
+        return get_report('statistici_programari', start, end)
+    except Exception as e:
+        return pd.DataFrame()
+
+
+def get_programari_recente(start=None, end=None):
+    """Ultimele 20 de programări"""
+    try:
+        return get_report('programari_recente', start, end)
+    except Exception as e:
+        return pd.DataFrame()
+
+
+def get_programari_detaliate(by, start=None, end=None, filtre=None):
+    """Programări grupate după o dimensiune, cu filtre de drill-down (din cubul de rapoarte)"""
+    try:
+        df = get_cube().aggregate('programari', [by], start, end, filtre)
+        if by == 'luna':
+            return df.sort_values('luna')
+        return df.sort_values('Numar', ascending=False)
+    except Exception as e:
+        return pd.DataFrame()
+
+
+def get_incarcare_doctori(start=None, end=None):
+    """Matricea doctor x zi x oră (None dacă nu poate fi calculată)"""
+    try:
+        return get_workload(start, end)
+    except Exception as e:
+        st.error(f"Eroare la calculul încărcării: {e}")
+        return None
+
+
+def get_detector_focare():
+    """Detectorul de creșteri bruște pe boală x secție (None dacă nu poate fi calculat)"""
+    try:
+        return get_outbreak_detector()
+    except Exception as e:
+        st.error(f"Eroare la detectarea focarelor: {e}")
+        return None
+
+
+def select_report_period():
+    """Interval de date comun pentru rapoarte (în sidebar).
+
+    Returnează (None, None) pentru intervalul complet implicit, ca rapoartele
+    să poată fi servite direct din ultimul snapshot.
+    """
+    manifest = latest_manifest()
+    if manifest is not None and manifest.get('prima_data'):
+        prima = datetime.fromisoformat(manifest['prima_data']).date()
+        ultima = datetime.fromisoformat(manifest['ultima_data']).date()
+    else:
+        try:
+            prima, ultima = get_cube().date_bounds()
+        except Exception as e:
+            prima, ultima = None, None
+    azi = datetime.now().date()
+    if prima is None:
+        prima = azi - timedelta(days=180)
+    ultima = max(ultima or azi, azi)
+    
+    with st.sidebar:
+        st.markdown("### 📅 Perioadă Rapoarte")
+        perioada = st.date_input(
+            "Interval",
+            value=(prima, ultima),
+            min_value=prima,
+            max_value=ultima,
+            key="perioada_rapoarte"
+        )
+    # Până la alegerea celei de-a doua date, date_input returnează o singură valoare
+    if isinstance(perioada, (list, tuple)):
+        start = perioada[0]
+        end = perioada[1] if len(perioada) == 2 else ultima
+    else:
+        start, end = perioada, ultima
+    if start == prima and end == ultima:
+        return None, None
+    return start, end
+
+
+def show_snapshot_status():
+    """Vârsta snapshot-ului curent și butonul de recalculare"""
+    manifest = latest_manifest()
+    col_info, col_btn = st.columns([4, 1])
+    
+    with col_info:
+        if manifest is not None:
+            creat = datetime.fromisoformat(manifest['creat'])
+            minute = int((datetime.now() - creat).total_seconds() // 60)
+            varsta = f"{minute} min" if minute < 60 else f"{minute // 60} h {minute % 60} min"
+            st.caption(f"📦 Rapoarte precalculate la {creat.strftime('%d.%m.%Y %H:%M')} (acum {varsta})")
+            if manifest.get('erori'):
+                st.warning(f"⚠️ Unele rapoarte nu au putut fi precalculate: {', '.join(manifest['erori'])}")
+        else:
+            st.caption("📦 Nu există încă rapoarte precalculate - datele se calculează acum")
+    
+    with col_btn:
+        if st.button("♻️ Recalculează acum"):
+            with st.spinner("Se recalculează rapoartele..."):
+                try:
+                    compute_snapshot()
+                except Exception as e:
+                    st.error(f"❌ Eroare la recalculare: {e}")
+            st.rerun()
+
+
+# ===== GRAFICE =====
+# Fiecare grafic se construiește dintr-o funcție a datelor, memoizată de
+# components.charts: la un rerun cu aceleași date figura nu se reconstruiește.
+# Plotly se importă doar când o figură chiar trebuie construită.
+
+def _grafic_gen(df):
+    import plotly.express as px
+    fig = px.pie(
+        df,
+        values='Numar',
+        names='Gen',
+        color_discrete_sequence=['#3498db', '#e74c3c'],
+        hole=0.4
+    )
+    fig.update_layout(height=400)
+    return fig
+
+
+def _grafic_sectii(df):
+    import plotly.express as px
+    fig = px.bar(
+        df,
+        x='Sectie',
+        y='Număr Pacienți',
+        color='Număr Pacienți',
+        color_continuous_scale='Blues'
+    )
+    fig.update_layout(height=400, xaxis_tickangle=-45)
+    return fig
+
+
+def _grafic_severitate(df):
+    import plotly.express as px
+    colors_map = {
+        'usoara': '#27ae60',
+        'medie': '#f39c12',
+        'severa': '#e74c3c'
+    }
+    fig = px.bar(
+        df,
+        x='Severitate',
+        y='Numar',
+        color='Severitate',
+        color_discrete_map=colors_map
+    )
+    fig.update_layout(height=400, showlegend=False)
+    return fig
+
+
+def _grafic_tipuri(df):
+    import plotly.express as px
+    fig = px.pie(
+        df,
+        values='Numar',
+        names='Tip',
+        color_discrete_sequence=px.colors.qualitative.Set3
+    )
+    fig.update_layout(height=400)
+    return fig
+
+
+def _grafic_luni(df):
+    import plotly.express as px
+    fig = px.line(
+        downsample(df, 'Număr Programări'),
+        x='Luna',
+        y='Număr Programări',
+        markers=True,
+        line_shape='spline'
+    )
+    fig.update_traces(line_color='#3498db', line_width=3)
+    fig.update_layout(height=400)
+    return fig
+
+
+def _grafic_top_doctori(df):
+    import plotly.express as px
+    fig = px.bar(
+        df,
+        x='Doctor',
+        y='Număr Programări',
+        color='Specializare',
+        text='Număr Programări'
+    )
+    fig.update_layout(height=500, xaxis_tickangle=-45)
+    fig.update_traces(textposition='outside')
+    return fig
+
+
+def _grafic_focar(df_serie):
+    import plotly.graph_objects as go
+    # Barele se însumează pe grupuri de zile (LTTB ar sări peste zile cu cazuri);
+    # nivelul obișnuit se însumează la fel, ca să rămână comparabil cu barele
+    zile = len(df_serie)
+    df_serie = bucket_sum(df_serie[['Cazuri', 'Medie']])
+    pas = -(-zile // len(df_serie)) if len(df_serie) else 1
+    fig = go.Figure()
+    fig.add_trace(go.Bar(x=df_serie.index, y=df_serie['Cazuri'], name='Cazuri', marker_color='#e74c3c'))
+    fig.add_trace(go.Scatter(x=df_serie.index, y=df_serie['Medie'], name='Nivel obișnuit',
+                             line={'color': '#2c3e50', 'dash': 'dash'}))
+    titlu = "Cazuri zilnice" if pas == 1 else f"Cazuri pe {pas} zile"
+    fig.update_layout(height=350, title=f"{titlu} vs nivel obișnuit")
+    return fig
+
+
+def _grafic_boli(df):
+    import plotly.graph_objects as go
+    fig = go.Figure()
+    fig.add_trace(go.Bar(
+        x=df['Boala'],
+        y=df['Număr Cazuri'],
+        name='Total Cazuri',
+        marker_color='#3498db'
+    ))
+    fig.add_trace(go.Bar(
+        x=df['Boala'],
+        y=df['Cazuri Severe'],
+        name='Cazuri Severe',
+        marker_color='#e74c3c'
+    ))
+    fig.update_layout(
+        barmode='group',
+        height=500,
+        xaxis_tickangle=-45,
+        title="Distribuție Boli - Total vs Severe"
+    )
+    return fig
+
+
+def _grafic_ore(df):
+    import plotly.express as px
+    fig = px.bar(
+        df,
+        x='Ora',
+        y='Numar',
+        labels={'Ora': 'Ora Zilei', 'Numar': 'Număr Programări'},
+        color='Numar',
+        color_continuous_scale='Viridis'
+    )
+    fig.update_layout(height=300)
+    return fig
+
+
+def _grafic_detaliere(df, axa, eticheta):
+    import plotly.express as px
+    fig = px.bar(
+        df,
+        x=axa,
+        y='Numar',
+        labels={axa: eticheta, 'Numar': 'Număr Programări'},
+        color_discrete_sequence=['#3498db']
+    )
+    fig.update_layout(height=400, xaxis_tickangle=-45)
+    return fig
+
+
+def _grafic_ocupatie(df):
+    import plotly.express as px
+    # Ariile sunt suprapuse: toate secțiile păstrează aceleași zile
+    fig = px.area(downsample(df), labels={'index': 'Data', 'value': 'Pacienți Internați', 'variable': 'Secție'})
+    fig.update_layout(height=450)
+    return fig
+
+
+def _grafic_flux(df):
+    import plotly.express as px
+    # Barele nu se pot eșantiona fără să piardă cazuri - zilele se însumează pe intervale
+    fig = px.bar(bucket_sum(df), barmode='group', labels={'index': 'Data', 'value': 'Număr', 'variable': ''},
+                 color_discrete_sequence=['#3498db', '#27ae60'])
+    fig.update_layout(height=350)
+    return fig
+
+
+def _grafic_incarcare(z, ore, titlu, scala):
+    import plotly.graph_objects as go
+    fig = go.Figure(go.Heatmap(
+        z=z[:, ore],
+        x=[f"{h:02d}:00" for h in ore],
+        y=ZILE,
+        colorscale=scala,
+        colorbar={'title': titlu},
+        hoverongaps=False
+    ))
+    fig.update_layout(height=400, yaxis={'autorange': 'reversed'})
+    return fig
+
+
 # ===== INTERFAȚA UTILIZATOR =====
 
 def main():
     st.title("📊 Rapoarte & Statistici")
+    start_scheduler()
+    show_snapshot_status()
     st.markdown("---")
     
     # ===== SECȚIUNEA 1: STATISTICI GENERALE =====
     st.markdown("## 📈 Statistici Generale")
     
     stats = get_statistics_overview()
+    start, end = select_report_period()
     
     if stats:
         col1, col2, col3, col4, col5, col6 = st.columns(6)
@@ -263,11 +460,13 @@ def main():
     st.markdown("---")
     
     # ===== TABS PENTRU RAPOARTE =====
-    tab1, tab2, tab3, tab4 = st.tabs([
+    tab1, tab2, tab3, tab4, tab5, tab6 = st.tabs([
         "📊 Grafice Generale",
         "👨‍⚕️ Raport Doctori",
         "🩺 Raport Diagnostic",
-        "📅 Raport Programări"
+        "📅 Raport Programări",
+        "🛏️ Internări",
+        "🗓️ Încărcare Doctori"
     ])
     
     # ===== TAB 1: GRAFICE GENERALE =====
@@ -281,15 +480,7 @@ def main():
             st.markdown("#### 👥 Distribuție Pacienți pe Gen")
             df_gen = get_distributie_gen()
             if not df_gen.empty:
-                fig = px.pie(
-                    df_gen,
-                    values='Numar',
-                    names='Gen',
-                    color_discrete_sequence=['#3498db', '#e74c3c'],
-                    hole=0.4
-                )
-                fig.update_layout(height=400)
-                st.plotly_chart(fig, use_container_width=True)
+                chart("distributie_gen", _grafic_gen, df_gen)
             else:
                 st.info("Nu există date")
             
@@ -297,73 +488,34 @@ def main():
             st.markdown("#### 🏥 Pacienți pe Secție")
             df_sectii = get_pacienti_pe_sectie()
             if not df_sectii.empty:
-                fig = px.bar(
-                    df_sectii,
-                    x='Sectie',
-                    y='Număr Pacienți',
-                    color='Număr Pacienți',
-                    color_continuous_scale='Blues'
-                )
-                fig.update_layout(height=400, xaxis_tickangle=-45)
-                st.plotly_chart(fig, use_container_width=True)
+                chart("pacienti_sectie", _grafic_sectii, df_sectii)
             else:
                 st.info("Nu există date")
         
         with col_right:
             # Grafic Severitate Diagnostice
             st.markdown("#### 🩺 Severitate Diagnostice")
-            df_sev = get_severitate_diagnostice()
+            df_sev = get_severitate_diagnostice(start, end)
             if not df_sev.empty:
-                colors_map = {
-                    'usoara': '#27ae60',
-                    'medie': '#f39c12',
-                    'severa': '#e74c3c'
-                }
-                df_sev['Color'] = df_sev['Severitate'].map(colors_map)
-                
-                fig = px.bar(
-                    df_sev,
-                    x='Severitate',
-                    y='Numar',
-                    color='Severitate',
-                    color_discrete_map=colors_map
-                )
-                fig.update_layout(height=400, showlegend=False)
-                st.plotly_chart(fig, use_container_width=True)
+                chart("severitate", _grafic_severitate, df_sev)
             else:
                 st.info("Nu există date")
             
             # Grafic Tipuri Programări
             st.markdown("#### 📅 Tipuri Programări")
-            df_tip = get_programari_per_tip()
+            df_tip = get_programari_per_tip(start, end)
             if not df_tip.empty:
-                fig = px.pie(
-                    df_tip,
-                    values='Numar',
-                    names='Tip',
-                    color_discrete_sequence=px.colors.qualitative.Set3
-                )
-                fig.update_layout(height=400)
-                st.plotly_chart(fig, use_container_width=True)
+                chart("tipuri_programari", _grafic_tipuri, df_tip)
             else:
                 st.info("Nu există date")
         
         # Grafic Programări în Timp (full width)
-        st.markdown("#### 📈 Evoluție Programări (Ultimele 6 Luni)")
-        df_luna = get_programari_pe_luna()
+        st.markdown("#### 📈 Evoluție Programări pe Luni")
+        df_luna = get_programari_pe_luna(start, end)
         if not df_luna.empty:
-            fig = px.line(
-                df_luna,
-                x='Luna',
-                y='Număr Programări',
-                markers=True,
-                line_shape='spline'
-            )
-            fig.update_traces(line_color='#3498db', line_width=3)
-            fig.update_layout(height=400)
-            st.plotly_chart(fig, use_container_width=True)
+            chart("programari_luni", _grafic_luni, df_luna)
         else:
-            st.info("Nu există date pentru ultimele 6 luni")
+            st.info("Nu există date pentru perioada selectată")
     
     # ===== TAB 2: RAPORT DOCTORI =====
     with tab2:
@@ -371,21 +523,12 @@ def main():
         
         # Top Doctori
         st.markdown("#### 🏆 Top 10 Doctori după Programări")
-        df_top_doc = get_top_doctori()
+        df_top_doc = get_top_doctori(start, end)
         if not df_top_doc.empty:
             st.dataframe(df_top_doc, use_container_width=True, hide_index=True)
             
             # Grafic
-            fig = px.bar(
-                df_top_doc,
-                x='Doctor',
-                y='Număr Programări',
-                color='Specializare',
-                text='Număr Programări'
-            )
-            fig.update_layout(height=500, xaxis_tickangle=-45)
-            fig.update_traces(textposition='outside')
-            st.plotly_chart(fig, use_container_width=True)
+            chart("top_doctori", _grafic_top_doctori, df_top_doc)
         else:
             st.info("Nu există date")
         
@@ -393,7 +536,7 @@ def main():
         
         # Activitate Completă Doctori
         st.markdown("#### 📊 Activitate Completă Doctori")
-        df_activitate = get_activitate_doctori()
+        df_activitate = get_activitate_doctori(start, end)
         if not df_activitate.empty:
             st.dataframe(df_activitate, use_container_width=True, hide_index=True)
             
@@ -412,33 +555,36 @@ def main():
     with tab3:
         st.markdown("### 🩺 Raport Diagnostice")
         
+        # Alerte: creșteri bruște de cazuri pe boală și secție
+        st.markdown("#### 🚨 Alerte Creșteri Neobișnuite")
+        detector = get_detector_focare()
+        if detector is not None:
+            df_alerte = detector.alerts()
+            if not df_alerte.empty:
+                st.error(f"🚨 {len(df_alerte)} creșteri neobișnuite de cazuri în ultimele zile")
+                st.dataframe(df_alerte, use_container_width=True, hide_index=True)
+                
+                alerta = st.selectbox(
+                    "Evoluție",
+                    options=range(len(df_alerte)),
+                    format_func=lambda i: f"{df_alerte['Boala'].iloc[i]} - {df_alerte['Secție'].iloc[i]}",
+                    key="alerta_focar"
+                )
+                df_serie = detector.serie(df_alerte['Boala'].iloc[alerta], df_alerte['Secție'].iloc[alerta])
+                chart("focar", _grafic_focar, df_serie)
+            else:
+                st.success("✅ Nicio creștere neobișnuită de cazuri")
+        
+        st.markdown("---")
+        
         # Top Boli
         st.markdown("#### 🦠 Top 10 Cele Mai Frecvente Boli")
-        df_boli = get_top_boli()
+        df_boli = get_top_boli(start, end)
         if not df_boli.empty:
             st.dataframe(df_boli, use_container_width=True, hide_index=True)
             
             # Grafic
-            fig = go.Figure()
-            fig.add_trace(go.Bar(
-                x=df_boli['Boala'],
-                y=df_boli['Număr Cazuri'],
-                name='Total Cazuri',
-                marker_color='#3498db'
-            ))
-            fig.add_trace(go.Bar(
-                x=df_boli['Boala'],
-                y=df_boli['Cazuri Severe'],
-                name='Cazuri Severe',
-                marker_color='#e74c3c'
-            ))
-            fig.update_layout(
-                barmode='group',
-                height=500,
-                xaxis_tickangle=-45,
-                title="Distribuție Boli - Total vs Severe"
-            )
-            st.plotly_chart(fig, use_container_width=True)
+            chart("top_boli", _grafic_boli, df_boli)
             
             # Export
             csv = df_boli.to_csv(index=False).encode('utf-8')
@@ -460,16 +606,7 @@ def main():
         with col1:
             st.markdown("#### 📊 Statistici Programări")
             
-            # Programări pe perioada
-            query_stats = """
-                SELECT 
-                    COUNT(*) as Total,
-                    SUM(CASE WHEN data_programare >= CAST(GETDATE() AS DATE) THEN 1 ELSE 0 END) as Viitoare,
-                    SUM(CASE WHEN data_programare < CAST(GETDATE() AS DATE) THEN 1 ELSE 0 END) as Trecute,
-                    SUM(CASE WHEN CAST(data_programare AS DATE) = CAST(GETDATE() AS DATE) THEN 1 ELSE 0 END) as Astazi
-                FROM Programare
-            """
-            df_stats = db.fetch_dataframe(query_stats)
+            df_stats = get_statistici_programari()
             
             if not df_stats.empty:
                 st.metric("📊 Total Programări", int(df_stats['Total'].iloc[0]))
@@ -480,48 +617,47 @@ def main():
         with col2:
             st.markdown("#### 🕐 Distribuție Ore Programări")
             
-            # Programări pe ore
-            query_ore = """
-                SELECT 
-                    DATEPART(HOUR, ora_programare) as Ora,
-                    COUNT(*) as Numar
-                FROM Programare
-                GROUP BY DATEPART(HOUR, ora_programare)
-                ORDER BY DATEPART(HOUR, ora_programare)
-            """
-            df_ore = db.fetch_dataframe(query_ore)
+            df_ore = get_distributie_ore(start, end)
             
             if not df_ore.empty:
-                fig = px.bar(
-                    df_ore,
-                    x='Ora',
-                    y='Numar',
-                    labels={'Ora': 'Ora Zilei', 'Numar': 'Număr Programări'},
-                    color='Numar',
-                    color_continuous_scale='Viridis'
-                )
-                fig.update_layout(height=300)
-                st.plotly_chart(fig, use_container_width=True)
+                chart("distributie_ore", _grafic_ore, df_ore)
             else:
                 st.info("Nu există date")
         
         st.markdown("---")
         
+        # Drill-down: secție → doctor → lună
+        st.markdown("#### 🔎 Detaliere Secție → Doctor → Lună")
+        df_drill_sectii = get_programari_detaliate('sectie', start, end)
+        
+        if not df_drill_sectii.empty:
+            col_s, col_d = st.columns(2)
+            with col_s:
+                sectie_drill = st.selectbox("Secție", ["Toate"] + df_drill_sectii['sectie'].tolist(), key="drill_sectie")
+            
+            filtre = {} if sectie_drill == "Toate" else {'sectie': sectie_drill}
+            df_drill_doctori = get_programari_detaliate('doctor', start, end, filtre)
+            
+            with col_d:
+                doctor_drill = st.selectbox("Doctor", ["Toți"] + df_drill_doctori['doctor'].tolist(), key="drill_doctor")
+            
+            if sectie_drill == "Toate":
+                df_drill, axa, eticheta = df_drill_sectii, 'sectie', 'Secție'
+            elif doctor_drill == "Toți":
+                df_drill, axa, eticheta = df_drill_doctori, 'doctor', 'Doctor'
+            else:
+                filtre['doctor'] = doctor_drill
+                df_drill, axa, eticheta = get_programari_detaliate('luna', start, end, filtre), 'luna', 'Luna'
+            
+            chart("detaliere", _grafic_detaliere, df_drill, axa, eticheta)
+        else:
+            st.info("Nu există programări în perioada selectată")
+        
+        st.markdown("---")
+        
         # Tabel complet programări
         st.markdown("#### 📋 Lista Completă Programări Recente")
-        query_recent = """
-            SELECT TOP 20
-                p.nume + ' ' + p.prenume as Pacient,
-                d.nume + ' ' + d.prenume as Doctor,
-                pr.tip_programare as Tip,
-                CONVERT(VARCHAR, pr.data_programare, 103) as Data,
-                CONVERT(VARCHAR(5), pr.ora_programare, 108) as Ora
-            FROM Programare pr
-            JOIN Pacient p ON pr.id_pacient = p.id_pacient
-            JOIN Doctor d ON pr.id_doctor = d.id_doctor
-            ORDER BY pr.data_programare DESC, pr.ora_programare DESC
-        """
-        df_recent = db.fetch_dataframe(query_recent)
+        df_recent = get_programari_recente()
         
         if not df_recent.empty:
             st.dataframe(df_recent, use_container_width=True, hide_index=True)
@@ -536,6 +672,81 @@ def main():
         else:
             st.info("Nu există programări")
     
+    # ===== TAB 5: INTERNĂRI (RECENSĂMÂNT PATURI) =====
+    with tab5:
+        st.markdown("### 🛏️ Ocupare Paturi și Internări")
+        
+        col1, col2 = st.columns(2)
+        with col1:
+            census_start = st.date_input("De la", value=datetime.now().date() - timedelta(days=365), key="census_start")
+        with col2:
+            census_end = st.date_input("Până la", value=datetime.now().date(), key="census_end")
+        
+        if census_start > census_end:
+            st.error("❌ Data de început trebuie să fie înaintea datei de sfârșit")
+        else:
+            try:
+                census = get_census()
+                df_ocupatie = census.occupancy(census_start, census_end)
+                
+                st.metric("🏥 Internați Acum", census.current_inpatients())
+                
+                st.markdown("#### 📈 Ocupare pe Secție")
+                if not df_ocupatie.empty and len(df_ocupatie.columns) > 0:
+                    chart("ocupatie", _grafic_ocupatie, df_ocupatie)
+                else:
+                    st.info("Nu există internări în perioada selectată")
+                
+                st.markdown("#### 🔁 Internări și Externări pe Zi")
+                df_flux = pd.DataFrame({
+                    'Internări': census.admissions(census_start, census_end).sum(axis=1),
+                    'Externări': census.discharges(census_start, census_end).sum(axis=1)
+                })
+                if df_flux.to_numpy().sum() > 0:
+                    chart("flux_internari", _grafic_flux, df_flux)
+                else:
+                    st.info("Nu există internări sau externări în perioada selectată")
+                
+                st.markdown("#### ⏱️ Durata Medie de Spitalizare")
+                df_alos = census.average_length_of_stay(census_start, census_end)
+                if not df_alos.empty:
+                    st.dataframe(df_alos, use_container_width=True, hide_index=True)
+                else:
+                    st.info("Nu există externări în perioada selectată")
+            except Exception as e:
+                st.error(f"Eroare la calculul recensământului: {e}")
+    
+    # ===== TAB 6: ÎNCĂRCARE DOCTORI =====
+    with tab6:
+        st.markdown("### 🗓️ Încărcare Doctori pe Zi și Oră")
+        
+        incarcare = get_incarcare_doctori(start, end)
+        
+        if incarcare is not None and incarcare.doctori:
+            col1, col2 = st.columns([2, 1])
+            with col1:
+                doctor_incarcare = st.selectbox("Doctor", ["Toți"] + incarcare.doctori, key="incarcare_doctor")
+            with col2:
+                vedere = st.radio("Afișare", ["Ocupare (%)", "Programări"], horizontal=True, key="incarcare_vedere")
+            
+            doctor = None if doctor_incarcare == "Toți" else doctor_incarcare
+            if vedere == "Ocupare (%)":
+                z = incarcare.utilizare(doctor) * 100
+                titlu, scala = "Ocupare (%)", 'RdYlGn_r'
+            else:
+                z = incarcare.programari(doctor)
+                titlu, scala = "Programări", 'Blues'
+            
+            # Doar orele în care există program sau programări
+            active = (incarcare.capacitate + incarcare.numar).sum(axis=(0, 1)) > 0
+            ore = [h for h in range(24) if active[h]]
+            chart("incarcare", _grafic_incarcare, z, ore, titlu, scala)
+            
+            st.markdown("#### 📋 Ocupare per Doctor")
+            st.dataframe(incarcare.rezumat(), use_container_width=True, hide_index=True)
+        else:
+            st.info("Nu există programări în perioada selectată")
+    
     # Footer
     st.markdown("---")
     st.markdown("""
@@ -0,0 +1,95 @@
+"""Compară citirea rezultatelor mari: pd.read_sql vs. calea pe coloane.
+
+Rulează aceleași interogări (programările și pacienții, încărcate complet)
+prin pd.read_sql pe o conexiune pyodbc, prin citirea pe loturi în array-uri
+NumPy și, dacă e instalat, prin arrow-odbc. Pentru fiecare se raportează
+timpul median și vârful de memorie Python (tracemalloc):
+
+    python scripts/benchmark_fetch.py
+    python scripts/benchmark_fetch.py --repetari 5 --lot 20000
+"""
+import os
+import sys
+import time
+import argparse
+import statistics
+import tracemalloc
+import warnings
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import pandas as pd
+from database.connection import db, PRIMARY
+from database import columnar
+from database.cube import PROGRAMARI_FACT_QUERY
+from database.dedup import PACIENTI_DEDUP_QUERY
+
+INTEROGARI = {
+    'programari': PROGRAMARI_FACT_QUERY.format(tabela='Programare', filtru=''),
+    'pacienti': PACIENTI_DEDUP_QUERY.format(filtru=''),
+}
+
+
+def _read_sql(query, lot):
+    conn = db.get_connection(PRIMARY)
+    try:
+        with warnings.catch_warnings():
+            # pandas avertizează pentru conexiuni DBAPI care nu sunt SQLAlchemy
+            warnings.simplefilter('ignore', UserWarning)
+            return pd.read_sql(query, conn)
+    finally:
+        conn.close()
+
+
+def _numpy(query, lot):
+    conn = db.get_connection(PRIMARY)
+    try:
+        cursor = conn.cursor()
+        cursor.execute(query)
+        return columnar.frame_from_cursor(cursor, lot)
+    finally:
+        conn.close()
+
+
+def _arrow(query, lot):
+    return columnar.frame_from_arrow(query, db.connection_string(PRIMARY), batch_size=lot)
+
+
+def masoara(functie, query, repetari, lot):
+    """(timp median, vârf de memorie în MB, rânduri)"""
+    durate, varfuri = [], []
+    for _ in range(repetari):
+        tracemalloc.start()
+        inceput = time.perf_counter()
+        df = functie(query, lot)
+        durate.append(time.perf_counter() - inceput)
+        varfuri.append(tracemalloc.get_traced_memory()[1] / 2**20)
+        tracemalloc.stop()
+    return statistics.median(durate), max(varfuri), len(df)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--repetari', type=int, default=3)
+    parser.add_argument('--lot', type=int, default=columnar.BATCH_SIZE)
+    args = parser.parse_args()
+
+    metode = {'pd.read_sql': _read_sql, 'numpy': _numpy}
+    if columnar.read_arrow_batches_from_odbc is not None:
+        metode['arrow-odbc'] = _arrow
+    else:
+        print("arrow-odbc nu este instalat - se compară doar read_sql și numpy")
+
+    for nume, query in INTEROGARI.items():
+        print(f"\n{nume}")
+        baza = None
+        for metoda, functie in metode.items():
+            durata, memorie, randuri = masoara(functie, query, args.repetari, args.lot)
+            baza = baza or durata
+            print(f"  {metoda:12} {durata:7.3f}s  x{baza / durata:4.1f}  "
+                  f"vârf {memorie:8.1f} MB  {randuri} rânduri")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
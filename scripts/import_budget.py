@@ -0,0 +1,109 @@
+"""Bugetul de timp la pornire (cold start) pentru fiecare pagină.
+
+Fiecare pagină se încarcă într-un proces Python nou (fără să ruleze main()),
+se măsoară timpul și se verifică modulele grele care nu au ce căuta acolo.
+Modulele din BAZA se importă înainte de măsurare: în serverul Streamlit
+sunt deja încărcate, deci nu fac parte din costul paginii.
+Iese cu cod 1 dacă o pagină depășește bugetul (același control rulează și în
+tests/test_import_budget.py):
+
+    python scripts/import_budget.py
+    python scripts/import_budget.py --detaliat      # cele mai lente importuri
+
+IMPORT_BUDGET_FACTOR înmulțește toate bugetele (ex: 2 pe mașini mai lente).
+"""
+import os
+import sys
+import json
+import subprocess
+
+RADACINA = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# Buget (secunde) și module care nu trebuie importate la pornirea paginii
+BUGETE = {
+    'app.py': (1.0, ['plotly', 'pyodbc', 'pyarrow']),
+    'pages/Doctori.py': (1.0, ['plotly', 'pyodbc', 'pyarrow']),
+    'pages/Pacienti.py': (1.0, ['plotly', 'pyodbc', 'pyarrow']),
+    'pages/Programari.py': (1.0, ['plotly', 'pyodbc', 'pyarrow']),
+    # Rapoarte desenează grafice, dar Plotly se importă abia la construirea unei figuri
+    'pages/Rapoarte.py': (1.0, ['plotly', 'pyodbc']),
+}
+
+FACTOR = float(os.getenv('IMPORT_BUDGET_FACTOR', '1'))
+
+# Încărcate înaintea paginii: streamlit (procesul serverului; importă el însuși
+# plotly, dacă e instalat) și pandas, pe care paginile îl țin intenționat la
+# nivel de modul (pandas importă pyarrow, dacă e instalat)
+BAZA = ['streamlit', 'pandas']
+
+# Rulat în procesul nou: încarcă pagina fără main() și raportează rezultatul
+_SONDA = """
+import importlib, json, runpy, sys, time
+for modul in sys.argv[2:]:
+    importlib.import_module(modul)
+inainte = set(sys.modules)
+inceput = time.perf_counter()
+runpy.run_path(sys.argv[1], run_name='import_budget')
+durata = time.perf_counter() - inceput
+print(json.dumps({'durata': durata, 'module': sorted(set(sys.modules) - inainte)}))
+"""
+
+
+def masoara(pagina, detaliat=False):
+    """(durata, module încărcate de pagină, stderr) pentru o pagină, într-un proces nou"""
+    comanda = [sys.executable]
+    if detaliat:
+        comanda += ['-X', 'importtime']
+    comanda += ['-c', _SONDA, os.path.join(RADACINA, pagina)] + BAZA
+    # Păstrăm PYTHONPATH-ul existent (ex: pachete instalate în afara mediului)
+    cale = os.pathsep.join(p for p in (RADACINA, os.environ.get('PYTHONPATH')) if p)
+    env = dict(os.environ, PYTHONPATH=cale)
+    rezultat = subprocess.run(comanda, cwd=RADACINA, env=env, capture_output=True, text=True)
+    if rezultat.returncode != 0:
+        raise RuntimeError(rezultat.stderr.strip().splitlines()[-1] if rezultat.stderr else 'eroare')
+    date = json.loads(rezultat.stdout.strip().splitlines()[-1])
+    return date['durata'], set(date['module']), rezultat.stderr
+
+
+def interzise_importate(module, interzise):
+    """Pachetele interzise din care pagina a importat ceva (inclusiv submodule)"""
+    return [p for p in interzise if any(m == p or m.startswith(p + '.') for m in module)]
+
+
+def _cele_mai_lente(stderr, n=10):
+    # Liniile -X importtime: "import time: self [us] | cumulative | imported package"
+    randuri = []
+    for linie in stderr.splitlines():
+        if not linie.startswith('import time:') or 'cumulative' in linie:
+            continue
+        _, cumulat, modul = linie[len('import time:'):].split('|')
+        randuri.append((int(cumulat), modul.rstrip()))
+    return sorted(randuri, reverse=True)[:n]
+
+
+def main():
+    detaliat = '--detaliat' in sys.argv
+    esecuri = 0
+    for pagina, (buget, interzise) in BUGETE.items():
+        buget *= FACTOR
+        try:
+            durata, module, stderr = masoara(pagina, detaliat)
+        except Exception as e:
+            print(f"✗ {pagina}: nu s-a putut încărca ({e})")
+            esecuri += 1
+            continue
+
+        incarcate = interzise_importate(module, interzise)
+        ok = durata <= buget and not incarcate
+        print(f"{'✓' if ok else '✗'} {pagina}: {durata:.2f}s (buget {buget:.2f}s)")
+        if incarcate:
+            print(f"    module grele importate la pornire: {', '.join(incarcate)}")
+        if detaliat:
+            for cumulat, modul in _cele_mai_lente(stderr):
+                print(f"    {cumulat / 1e6:6.3f}s {modul}")
+        esecuri += not ok
+    return 1 if esecuri else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,102 @@
+"""Pornește N procese Streamlit (worker-i) pe porturi consecutive.
+
+Fiecare worker e un proces separat, deci sesiunile se împart pe mai multe
+nuclee. Worker-ii folosesc același cache comun (CACHE_BACKEND, implicit
+'sqlite' aici): statisticile, listele de referință și snapshot-urile de
+rapoarte se calculează o singură dată pe cluster, iar o scriere făcută
+într-un worker invalidează valorile și în ceilalți.
+
+    python scripts/run_cluster.py                 # 4 worker-i, porturile 8501-8504
+    python scripts/run_cluster.py -n 8 --port 9000
+    python scripts/run_cluster.py --nginx          # doar configurația proxy-ului
+
+În fața lor se pune un reverse proxy local (vezi --nginx). Streamlit
+ține sesiunea pe un websocket, deci proxy-ul trebuie să trimită un
+client mereu la același worker (ip_hash). Un worker căzut e repornit.
+"""
+import os
+import sys
+import time
+import argparse
+import subprocess
+
+RADACINA = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+NGINX = """upstream spital {{
+    ip_hash;  # sesiunile Streamlit rămân pe același worker
+{servere}
+}}
+
+server {{
+    listen {port_public};
+
+    location / {{
+        proxy_pass http://spital;
+        proxy_http_version 1.1;
+        proxy_set_header Upgrade $http_upgrade;
+        proxy_set_header Connection "upgrade";
+        proxy_set_header Host $host;
+        proxy_read_timeout 86400;
+    }}
+}}
+"""
+
+
+def nginx_config(porturi, port_public=80):
+    servere = '\n'.join(f"    server 127.0.0.1:{p};" for p in porturi)
+    return NGINX.format(servere=servere, port_public=port_public)
+
+
+def start_worker(port):
+    comanda = [
+        sys.executable, '-m', 'streamlit', 'run', os.path.join(RADACINA, 'app.py'),
+        '--server.port', str(port),
+        '--server.address', '127.0.0.1',
+        '--server.headless', 'true',
+    ]
+    return subprocess.Popen(comanda, cwd=RADACINA, env=os.environ.copy())
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('-n', '--workers', type=int, default=int(os.getenv('CLUSTER_WORKERS', '4')))
+    parser.add_argument('--port', type=int, default=int(os.getenv('CLUSTER_BASE_PORT', '8501')))
+    parser.add_argument('--nginx', action='store_true', help="afișează configurația nginx și iese")
+    args = parser.parse_args()
+
+    porturi = [args.port + i for i in range(args.workers)]
+    if args.nginx:
+        print(nginx_config(porturi))
+        return 0
+
+    # Cache-ul comun trebuie să fie vizibil tuturor proceselor
+    os.environ.setdefault('CACHE_BACKEND', 'sqlite')
+    if os.environ['CACHE_BACKEND'] == 'local':
+        print("CACHE_BACKEND=local nu e partajat între worker-i - folosește 'sqlite' sau redis://")
+        return 1
+
+    workeri = {port: start_worker(port) for port in porturi}
+    print(f"{len(workeri)} worker-i pe porturile {porturi[0]}-{porturi[-1]} "
+          f"(cache: {os.environ['CACHE_BACKEND']})")
+    try:
+        while True:
+            time.sleep(2)
+            for port, proces in workeri.items():
+                if proces.poll() is not None:
+                    print(f"Worker-ul de pe portul {port} s-a oprit (cod {proces.returncode}) - repornesc")
+                    workeri[port] = start_worker(port)
+    except KeyboardInterrupt:
+        pass
+    finally:
+        for proces in workeri.values():
+            proces.terminate()
+        for proces in workeri.values():
+            try:
+                proces.wait(timeout=10)
+            except subprocess.TimeoutExpired:
+                proces.kill()
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,23 @@
+"""Pornirea fiecărei pagini rămâne în bugetul din scripts/import_budget.py.
+
+    python -m pytest tests/test_import_budget.py
+"""
+import os
+import sys
+import pytest
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'scripts'))
+import import_budget  # noqa: E402
+
+# Paginile importă streamlit la nivel de modul; fără el nu se poate măsura nimic
+pytest.importorskip('streamlit')
+
+
+@pytest.mark.parametrize('pagina', sorted(import_budget.BUGETE))
+def test_pagina_in_buget(pagina):
+    buget, interzise = import_budget.BUGETE[pagina]
+    buget *= import_budget.FACTOR
+    durata, module, _ = import_budget.masoara(pagina)
+    incarcate = import_budget.interzise_importate(module, interzise)
+    assert not incarcate, f"{pagina} importă la pornire: {', '.join(incarcate)}"
+    assert durata <= buget, f"{pagina}: {durata:.2f}s (buget {buget:.2f}s)"